@@ -3,14 +3,23 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Generator
 from datetime import datetime
+import logging
 
 from app.core.database import SessionLocal
 from app.core.security import decode_access_token
 from app.models.usuario import Usuario
+from app.services.principales import cache_principales
+
+logger = logging.getLogger(__name__)
 
 # Security scheme
 security = HTTPBearer()
 
+# Las dependencias y los endpoints se declaran con def (no async def): la
+# sesión de BD es síncrona y FastAPI los ejecuta en su threadpool, así una
+# consulta lenta no detiene el event loop para las demás peticiones. Login y
+# registro (bcrypt) van en su propio pool acotado, ver auth_service.pool_login.
+
 def get_db() -> Generator:
     """Dependency para obtener sesión de BD"""
     db = SessionLocal()
@@ -19,16 +28,20 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-async def get_current_user(
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> Usuario:
     """Obtener usuario actual desde token JWT"""
+    return usuario_desde_token(credentials.credentials, db)
+
+def usuario_desde_token(token: str, db: Session) -> Usuario:
+    """
+    Validar un token JWT y devolver su usuario
     
-    # Debug: ver qué llega
-    print(f"🔍 [AUTH] Credentials recibidas: {credentials}")
-    print(f"🔍 [AUTH] Scheme: {credentials.scheme}")
-    print(f"🔍 [AUTH] Token: {credentials.credentials[:30]}..." if credentials.credentials else "❌ NO HAY TOKEN")
+    El usuario se toma del cache de principales; solo se consulta la BD si
+    no está o ya venció. También lo usan los websockets (token en la URL).
+    """
     
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,26 +49,30 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
     payload = decode_access_token(token)
     
     if payload is None:
-        print("❌ [AUTH] Token inválido o expirado")
+        logger.debug("Token inválido o expirado")
         raise credentials_exception
     
     username: str = payload.get("sub")
     if username is None:
-        print("❌ [AUTH] No 'sub' en payload")
+        logger.debug("Token sin 'sub'")
         raise credentials_exception
     
-    print(f"✅ [AUTH] Username extraído: {username}")
-    
-    # Buscar usuario en BD
-    user = db.query(Usuario).filter(Usuario.username == username).first()
+    user = cache_principales.obtener(username)
     
     if user is None:
-        print(f"❌ [AUTH] Usuario '{username}' no encontrado")
-        raise credentials_exception
+        # Buscar usuario en BD
+        user = db.query(Usuario).filter(Usuario.username == username).first()
+        
+        if user is None:
+            logger.debug("Usuario '%s' no encontrado", username)
+            raise credentials_exception
+        
+        # Desprender de la sesión para compartirlo entre peticiones
+        db.expunge(user)
+        cache_principales.guardar(user)
     
     if not user.is_active:
         raise HTTPException(
@@ -76,10 +93,10 @@ async def get_current_user(
             detail=f"Usuario bloqueado hasta {user.bloqueado_hasta}"
         )
     
-    print(f"✅ [AUTH] Usuario autenticado: {username}")
+    logger.debug("Usuario autenticado: %s", username)
     return user
 
-async def get_current_active_user(
+def get_current_active_user(
     current_user: Usuario = Depends(get_current_user)
 ) -> Usuario:
     """Verificar que el usuario esté activo"""
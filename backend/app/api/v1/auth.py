@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
+import asyncio
 
 from app.api.deps import get_db, get_current_active_user
 from app.schemas.auth import LoginRequest, TokenResponse, UserResponse, UserCreate
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, pool_login
 from app.models.usuario import Usuario
 from app.services.bitacora_service import BitacoraService
 
@@ -24,10 +25,12 @@ async def login(
     - Registra en bitácora
     """
     ip_address = request.client.host
-    return AuthService.authenticate_user(db, login_data, ip_address)
+    return await asyncio.get_running_loop().run_in_executor(
+        pool_login, AuthService.authenticate_user, db, login_data, ip_address
+    )
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(
+def get_me(
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
@@ -47,10 +50,12 @@ async def register(
     - Hashea la contraseña
     - Crea el usuario
     """
-    return AuthService.create_user(db, user_data)
+    return await asyncio.get_running_loop().run_in_executor(
+        pool_login, AuthService.create_user, db, user_data
+    )
 
 @router.post("/logout")
-async def logout(
+def logout(
     request: Request,
     current_user: Usuario = Depends(get_current_active_user),
     db: Session = Depends(get_db)
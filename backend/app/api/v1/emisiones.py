@@ -0,0 +1,180 @@
+from fastapi import APIRouter, Depends, status, Request, UploadFile, File, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import uuid
+
+from app.api.deps import get_db, get_current_active_user
+from app.schemas.emision import EmisionCreate, SesionEmisionResponse, RutaCargaResponse, VolumenResponse
+from app.services.descarga_service import DescargaService, respuesta_archivo, zip_en_streaming
+from app.services.emision_service import EmisionService
+from app.services.planificador import planificador_emision
+from app.models.usuario import Usuario
+
+router = APIRouter()
+
+@router.post("/", response_model=SesionEmisionResponse, status_code=status.HTTP_201_CREATED)
+def crear_emision(
+    emision_data: EmisionCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Crear una sesión de emisión
+    
+    - El proyecto queda bloqueado mientras la sesión esté en cola o procesando
+    - prioridad opcional (0 = más urgente); sin ella, las rutas chicas van primero
+    - Opcionalmente se carga la ruta en POST /emisiones/{uuid_sesion}/ruta
+    - El renderizado empieza con POST /emisiones/{uuid_sesion}/iniciar
+    """
+    return EmisionService.crear_sesion(
+        db=db,
+        emision_data=emision_data,
+        usuario=current_user,
+        ip_address=request.client.host
+    )
+
+@router.post("/{uuid_sesion}/ruta", response_model=RutaCargaResponse)
+def cargar_ruta(
+    uuid_sesion: uuid.UUID,
+    request: Request,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Cargar el CSV de cuentas en orden de ruta
+    
+    - Columnas: cuenta, orden_ruta (opcional) y observaciones (opcional)
+    - Sin ruta se emite todo el padrón del proyecto
+    - Reporta cuentas duplicadas y no encontradas en el padrón
+    """
+    return EmisionService.cargar_ruta(
+        db=db,
+        uuid_sesion=uuid_sesion,
+        file=file,
+        usuario=current_user,
+        ip_address=request.client.host
+    )
+
+@router.post("/{uuid_sesion}/iniciar", response_model=SesionEmisionResponse, status_code=status.HTTP_202_ACCEPTED)
+def iniciar_emision(
+    uuid_sesion: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Encolar el renderizado de una sesión
+    
+    - Queda EN_COLA; el planificador genera los PDFs en segundo plano
+      según prioridad, capacidad y cuota del proyecto
+    - El avance se consulta en GET /emisiones/{uuid_sesion}
+    """
+    sesion = EmisionService.iniciar_sesion(db, uuid_sesion)
+    planificador_emision.despertar()
+    return sesion
+
+@router.post("/{uuid_sesion}/cancelar", response_model=SesionEmisionResponse)
+def cancelar_emision(
+    uuid_sesion: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Cancelar una sesión de emisión
+    
+    - Si está procesando, se detiene en el siguiente checkpoint
+    - Los documentos ya guardados se conservan
+    """
+    return EmisionService.cancelar_sesion(
+        db=db,
+        uuid_sesion=uuid_sesion,
+        usuario=current_user,
+        ip_address=request.client.host
+    )
+
+@router.post("/{uuid_sesion}/reanudar", response_model=SesionEmisionResponse, status_code=status.HTTP_202_ACCEPTED)
+def reanudar_emision(
+    uuid_sesion: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Reanudar una sesión cancelada o con error
+    
+    - Vuelve a la cola y continúa desde el último checkpoint, sin repetir documentos
+    - Los registros que fallaron se vuelven a intentar
+    """
+    sesion = EmisionService.reanudar_sesion(
+        db=db,
+        uuid_sesion=uuid_sesion,
+        usuario=current_user,
+        ip_address=request.client.host
+    )
+    planificador_emision.despertar()
+    return sesion
+
+@router.get("/{uuid_sesion}", response_model=SesionEmisionResponse)
+def get_sesion(
+    uuid_sesion: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Obtener estado y avance de una sesión de emisión
+    """
+    return EmisionService.get_sesion(db, uuid_sesion)
+
+@router.get("/{uuid_sesion}/descarga")
+def descargar_zip(
+    uuid_sesion: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Descargar en un ZIP los PDFs generados de la sesión
+    
+    - Se arma mientras se envía, en orden de impresión
+    - Para reanudar descargas grandes conviene usar los volúmenes
+    """
+    archivos = DescargaService.archivos_sesion(db, uuid_sesion)
+    return StreamingResponse(
+        zip_en_streaming(archivos),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="emision_{uuid_sesion}.zip"'}
+    )
+
+@router.get("/{uuid_sesion}/volumenes", response_model=List[VolumenResponse])
+def get_volumenes(
+    uuid_sesion: uuid.UUID,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Volúmenes de impresión de la sesión (se generan al completarla)
+    
+    - El manifiesto (codebar -> volumen y página) está en
+      /emisiones/{uuid_sesion}/volumenes/manifiesto.csv
+    """
+    return DescargaService.volumenes(db, uuid_sesion)
+
+@router.get("/{uuid_sesion}/volumenes/{archivo}")
+def descargar_volumen(
+    uuid_sesion: uuid.UUID,
+    archivo: str,
+    range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Descargar un volumen o el manifiesto
+    
+    - Soporta Range (un rango) e If-Range para reanudar descargas
+    """
+    ruta = DescargaService.ruta_volumen(db, uuid_sesion, archivo)
+    media_type = "text/csv" if archivo.endswith(".csv") else "application/pdf"
+    return respuesta_archivo(ruta, media_type, archivo, range, if_range)
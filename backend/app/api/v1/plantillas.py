@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import uuid
 
 from app.api.deps import get_db, get_current_active_user
@@ -14,7 +14,7 @@ from app.models.usuario import Usuario
 router = APIRouter()
 
 @router.get("/proyecto/{proyecto_uuid}", response_model=List[PlantillaResponse])
-async def get_plantillas_by_proyecto(
+def get_plantillas_by_proyecto(
     proyecto_uuid: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
@@ -25,7 +25,7 @@ async def get_plantillas_by_proyecto(
     return PlantillaService.get_all_by_proyecto(db, proyecto_uuid)
 
 @router.get("/{plantilla_uuid}", response_model=PlantillaResponse)
-async def get_plantilla(
+def get_plantilla(
     plantilla_uuid: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
@@ -36,7 +36,7 @@ async def get_plantilla(
     return PlantillaService.get_by_uuid(db, plantilla_uuid)
 
 @router.post("/", response_model=PlantillaResponse, status_code=status.HTTP_201_CREATED)
-async def create_plantilla(
+def create_plantilla(
     plantilla_data: PlantillaCreate,
     request: Request,
     db: Session = Depends(get_db),
@@ -53,7 +53,7 @@ async def create_plantilla(
     )
 
 @router.put("/{plantilla_uuid}", response_model=PlantillaResponse)
-async def update_plantilla(
+def update_plantilla(
     plantilla_uuid: uuid.UUID,
     plantilla_data: PlantillaUpdate,
     request: Request,
@@ -72,7 +72,7 @@ async def update_plantilla(
     )
 
 @router.delete("/{plantilla_uuid}")
-async def delete_plantilla(
+def delete_plantilla(
     plantilla_uuid: uuid.UUID,
     request: Request,
     db: Session = Depends(get_db),
@@ -89,7 +89,7 @@ async def delete_plantilla(
     )
 
 @router.get("/padron/{nombre_padron}/columnas", response_model=List[CamposPadronResponse])
-async def get_campos_padron(
+def get_campos_padron(
     nombre_padron: str,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
@@ -107,12 +107,45 @@ async def get_campos_padron(
     return PlantillaService.get_campos_padron(db, nombre_padron)
 
 @router.get("/{plantilla_uuid}/preview", response_model=PreviewDataResponse)
-async def get_preview_data(
+def get_preview_data(
     plantilla_uuid: uuid.UUID,
+    cuenta: Optional[str] = None,
+    desde: Optional[uuid.UUID] = None,
+    direccion: str = Query("siguiente", pattern="^(siguiente|anterior)$"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
     """
-    Obtener datos aleatorios del padrón para preview
+    Obtener datos del padrón para preview
+    
+    - Sin parámetros: un registro al azar
+    - desde=<uuid_padron del registro actual>&direccion=siguiente|anterior: navegar
+    - cuenta: un registro específico
+    """
+    return PlantillaService.get_preview_data(db, plantilla_uuid, cuenta, desde, direccion)
+
+@router.get("/{plantilla_uuid}/render")
+def render_preview(
+    plantilla_uuid: uuid.UUID,
+    cuenta: Optional[str] = None,
+    formato: str = Query("pdf", pattern="^(pdf|png)$"),
+    ancho: int = Query(800, ge=100, le=3000),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
     """
-    return PlantillaService.get_preview_data(db, plantilla_uuid)
\ No newline at end of file
+    Renderizar un registro con la plantilla (PDF o PNG)
+    
+    - cuenta: el registro a renderizar (sin cuenta, uno al azar)
+    - formato: pdf | png
+    - ancho: ancho en pixeles del PNG
+    """
+    contenido, media_type = PlantillaService.render_preview(db, plantilla_uuid, cuenta, formato, ancho)
+    return Response(
+        content=contenido,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'inline; filename="{plantilla_uuid}.{formato}"',
+            "Cache-Control": "no-store"
+        }
+    )
@@ -4,14 +4,15 @@ from typing import List
 import uuid
 
 from app.api.deps import get_db, get_current_active_user
-from app.schemas.proyecto import ProyectoCreate, ProyectoUpdate, ProyectoResponse, PadronResponse
+from app.schemas.proyecto import ProyectoCreate, ProyectoUpdate, ProyectoResponse, PadronResponse, PadronCargaResponse
 from app.services.proyecto_service import ProyectoService
+from app.services.padron_service import PadronService
 from app.models.usuario import Usuario
 
 router = APIRouter()
 
 @router.get("/padrones", response_model=List[PadronResponse])
-async def get_padrones(
+def get_padrones(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
@@ -21,7 +22,7 @@ async def get_padrones(
     return ProyectoService.get_all_padrones(db)
 
 @router.get("/", response_model=List[ProyectoResponse])
-async def get_proyectos(
+def get_proyectos(
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
 ):
@@ -31,7 +32,7 @@ async def get_proyectos(
     return ProyectoService.get_all_proyectos(db, current_user.uuid_usuario)
 
 @router.get("/{proyecto_uuid}", response_model=ProyectoResponse)
-async def get_proyecto(
+def get_proyecto(
     proyecto_uuid: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_active_user)
@@ -42,7 +43,7 @@ async def get_proyecto(
     return ProyectoService.get_proyecto_by_uuid(db, proyecto_uuid)
 
 @router.post("/", response_model=ProyectoResponse, status_code=status.HTTP_201_CREATED)
-async def create_proyecto(
+def create_proyecto(
     proyecto_data: ProyectoCreate,
     request: Request,
     db: Session = Depends(get_db),
@@ -59,7 +60,7 @@ async def create_proyecto(
     )
 
 @router.put("/{proyecto_uuid}", response_model=ProyectoResponse)
-async def update_proyecto(
+def update_proyecto(
     proyecto_uuid: uuid.UUID,
     proyecto_data: ProyectoUpdate,
     request: Request,
@@ -78,7 +79,7 @@ async def update_proyecto(
     )
 
 @router.delete("/{proyecto_uuid}")
-async def delete_proyecto(
+def delete_proyecto(
     proyecto_uuid: uuid.UUID,
     request: Request,
     db: Session = Depends(get_db),
@@ -95,7 +96,7 @@ async def delete_proyecto(
     )
 
 @router.post("/{proyecto_uuid}/logo", response_model=ProyectoResponse)
-async def upload_logo(
+def upload_logo(
     proyecto_uuid: uuid.UUID,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -107,9 +108,32 @@ async def upload_logo(
     - Formatos permitidos: JPG, PNG
     - Tamaño máximo: 2MB
     """
-    return await ProyectoService.upload_logo(
+    return ProyectoService.upload_logo(
         db=db,
         proyecto_uuid=proyecto_uuid,
         file=file,
         usuario=current_user
+    )
+
+@router.post("/{proyecto_uuid}/padron", response_model=PadronCargaResponse)
+def cargar_padron(
+    proyecto_uuid: uuid.UUID,
+    request: Request,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_active_user)
+):
+    """
+    Cargar el padrón del proyecto desde CSV o XLSX
+    
+    - Las columnas se emparejan por nombre con la tabla del padrón
+    - Los registros existentes (misma llave) se actualizan
+    - Las filas sin llave se descartan
+    """
+    return PadronService.cargar_archivo(
+        db=db,
+        proyecto_uuid=proyecto_uuid,
+        file=file,
+        usuario=current_user,
+        ip_address=request.client.host
     )
\ No newline at end of file
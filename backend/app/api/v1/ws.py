@@ -0,0 +1,90 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import uuid
+
+from app.api.deps import usuario_desde_token
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.schemas.emision import ProgresoEmision
+from app.services.emision_service import EmisionService
+from app.services.progreso import canal_progreso, ESTADOS_FINALES
+
+router = APIRouter()
+
+async def _esperar_desconexion(websocket: WebSocket) -> None:
+    """Leer (y descartar) lo que mande el cliente hasta que se desconecte"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+async def _siguiente_aviso(aviso: asyncio.Event) -> None:
+    """A lo más un evento por intervalo: esperar el intervalo y luego la siguiente publicación"""
+    await asyncio.sleep(settings.PROGRESO_INTERVALO_SEG)
+    await aviso.wait()
+    aviso.clear()
+
+def _estado_inicial(token: str, uuid_sesion: uuid.UUID) -> dict:
+    """
+    Validar el token y obtener el estado actual de la sesión
+    
+    Si la emisión corre en este proceso se toma del canal; si no, se lee una
+    vez de la BD (sesión aún no iniciada o ya terminada).
+    """
+    db = SessionLocal()
+    try:
+        usuario_desde_token(token, db)
+        evento = canal_progreso.ultimo(uuid_sesion)
+        if evento:
+            return evento
+        sesion = EmisionService.get_sesion(db, uuid_sesion)
+        return ProgresoEmision.model_validate(sesion).model_dump(mode="json")
+    finally:
+        db.close()
+
+@router.websocket("/ws/emisiones/{uuid_sesion}")
+async def progreso_emision(
+    websocket: WebSocket,
+    uuid_sesion: uuid.UUID,
+    token: str = Query(...)
+):
+    """
+    Avance de una sesión de emisión
+    
+    - Autenticación: ?token=<jwt>
+    - Envía el estado al conectar y después a lo más un evento por
+      PROGRESO_INTERVALO_SEG, siempre el más reciente
+    - Cada evento trae registros_por_segundo (promedio exponencial) y eta_segundos
+    - Se cierra al terminar la sesión (COMPLETADA / ERROR / CANCELADA)
+    - Si el cliente se desconecta se deja de esperar y se libera la suscripción
+    """
+    # Suscribirse antes de leer el estado, para no perder publicaciones intermedias
+    aviso = canal_progreso.suscribir(uuid_sesion)
+    try:
+        try:
+            evento = await run_in_threadpool(_estado_inicial, token, uuid_sesion)
+        except HTTPException as e:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+            return
+
+        await websocket.accept()
+        await websocket.send_json(evento)
+
+        desconexion = asyncio.ensure_future(_esperar_desconexion(websocket))
+        try:
+            while evento["estado"] not in ESTADOS_FINALES:
+                # Una sesión sin avance no debe retener un socket muerto
+                espera = asyncio.ensure_future(_siguiente_aviso(aviso))
+                listos, _ = await asyncio.wait({desconexion, espera}, return_when=asyncio.FIRST_COMPLETED)
+                if desconexion in listos:
+                    espera.cancel()
+                    return
+                evento = canal_progreso.ultimo(uuid_sesion) or evento
+                await websocket.send_json(evento)
+        finally:
+            desconexion.cancel()
+
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        canal_progreso.desuscribir(uuid_sesion, aviso)
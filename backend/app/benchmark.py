@@ -0,0 +1,99 @@
+"""
+Prueba de concurrencia contra la API en marcha
+
+Lanza peticiones GET en paralelo y reporta peticiones por segundo y
+latencias. Sirve para comparar antes / después de un cambio (p. ej. una
+consulta lenta en un endpoint no debe frenar a los demás):
+
+    python -m app.benchmark http://localhost:8000/api/v1/proyectos/ \\
+        --token <jwt> --concurrencia 32 --peticiones 2000
+
+Con --lenta se mandan además, en paralelo, peticiones a esa URL en ciclo
+(p. ej. un preview pesado) para medir cuánto afecta al resto. Con
+--cuerpo-lenta van como POST JSON y --hilos-lenta simula una ráfaga, p. ej.
+los logins al inicio de un turno:
+
+    python -m app.benchmark http://localhost:8000/api/v1/proyectos/ --token <jwt> \
+        --lenta http://localhost:8000/api/v1/auth/login --hilos-lenta 50 \
+        --cuerpo-lenta '{"username": "prueba", "password": "incorrecta"}'
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def _pedir(url: str, encabezados: Dict[str, str], cuerpo: Optional[bytes] = None) -> float:
+    inicio = time.perf_counter()
+    if cuerpo is not None:
+        encabezados = {**encabezados, "Content-Type": "application/json"}
+    peticion = urllib.request.Request(url, data=cuerpo, headers=encabezados)
+    try:
+        with urllib.request.urlopen(peticion) as respuesta:
+            respuesta.read()
+    except urllib.error.HTTPError as e:
+        e.read()
+    return time.perf_counter() - inicio
+
+
+def medir(
+    url: str,
+    token: Optional[str],
+    concurrencia: int,
+    peticiones: int,
+    lenta: Optional[str] = None,
+    cuerpo_lenta: Optional[str] = None,
+    hilos_lenta: int = 1
+) -> Dict[str, float]:
+    encabezados = {"Authorization": f"Bearer {token}"} if token else {}
+    detener = threading.Event()
+
+    cuerpo = cuerpo_lenta.encode() if cuerpo_lenta else None
+
+    def _ciclo_lento():
+        while not detener.is_set():
+            _pedir(lenta, encabezados, cuerpo)
+
+    if lenta:
+        for _ in range(hilos_lenta):
+            threading.Thread(target=_ciclo_lento, daemon=True).start()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        tiempos: List[float] = list(pool.map(lambda _: _pedir(url, encabezados), range(peticiones)))
+    segundos = time.perf_counter() - inicio
+    detener.set()
+
+    tiempos.sort()
+    return {
+        "peticiones_por_segundo": peticiones / segundos,
+        "p50_ms": statistics.median(tiempos) * 1000,
+        "p95_ms": tiempos[int(len(tiempos) * 0.95) - 1] * 1000,
+        "max_ms": tiempos[-1] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url")
+    parser.add_argument("--token")
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--peticiones", type=int, default=1000)
+    parser.add_argument("--lenta")
+    parser.add_argument("--cuerpo-lenta")
+    parser.add_argument("--hilos-lenta", type=int, default=1)
+    argumentos = parser.parse_args()
+
+    resultado = medir(
+        argumentos.url, argumentos.token, argumentos.concurrencia,
+        argumentos.peticiones, argumentos.lenta, argumentos.cuerpo_lenta, argumentos.hilos_lenta
+    )
+    print(
+        f"{resultado['peticiones_por_segundo']:,.0f} pet/s  "
+        f"p50 {resultado['p50_ms']:.1f} ms  p95 {resultado['p95_ms']:.1f} ms  "
+        f"max {resultado['max_ms']:.1f} ms"
+    )
@@ -9,6 +9,9 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
+    PRINCIPALES_CACHE_TTL_SEG: float = 30.0  # usuario autenticado en memoria, por proceso
+    PRINCIPALES_CACHE_MAX: int = 1000
+    LOGIN_HILOS: int = 4  # logins (bcrypt) simultáneos; el resto espera sin ocupar el threadpool
     
     # Application
     APP_NAME: str = "Sistema de Emisiones"
@@ -19,6 +22,45 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "./uploads"
     OUTPUT_DIR: str = "./output"
     
+    # Emisión
+    EMISION_WORKERS: Optional[int] = None  # None = núcleos disponibles
+    EMISION_LOTE_PROGRESO: int = 500
+    EMISION_LOTE_LECTURA: int = 2000  # filas por fetch del cursor del padrón
+    EMISION_COLA_LOTES: int = 4  # lotes leídos por adelantado (backpressure)
+    EMISION_TAREAS_POR_ENVIO: int = 50
+    FOLIOS_BLOQUE: int = 1000  # folios reservados por viaje a la secuencia
+    EMISION_WORKERS_EXTERNOS: bool = False  # True = renderizan los procesos de app.workers.emision
+    EMISION_BLOQUE_WORKER: int = 200  # registros que un worker reclama por transacción
+    EMISION_WORKER_ESPERA_SEG: float = 2.0  # pausa de un worker sin trabajo
+    EMISION_CAPACIDAD: int = 2  # sesiones que renderiza a la vez cada proceso de la API
+    EMISION_CUPO_PRIORITARIO: int = 1  # lugares extra solo para sesiones de prioridad alta
+    EMISION_CUOTA_PROYECTO: int = 1  # sesiones simultáneas por proyecto
+    EMISION_TRABAJO_CHICO: int = 1000  # rutas de hasta este tamaño van con prioridad alta
+    EMISION_LEASE_SEG: float = 60.0  # sin latido en este tiempo, otro proceso retoma la sesión
+    EMISION_PLANIFICADOR_SEG: float = 2.0  # revisión de la cola
+    VOLUMEN_MAX_PAGINAS: int = 5000  # páginas por volumen de impresión
+    VOLUMEN_MAX_MB: int = 200  # tamaño (estimado) por volumen de impresión
+    PROGRESO_INTERVALO_SEG: float = 1.0  # máximo un mensaje por websocket en este intervalo
+    PROGRESO_VIDA_MEDIA_SEG: float = 10.0  # promedio exponencial de registros/s
+    PLANES_CACHE_MAX: int = 32
+    IMAGEN_DPI: int = 300
+    IMAGENES_CACHE_MB: int = 128
+    FUENTES_DIR: str = "./fuentes"  # TTF de las familias del editor (Familia-Bold.ttf, ...)
+    FUENTES_CACHE_MEDIDAS: int = 65536  # anchos de texto memorizados por proceso
+    FUENTES_CACHE_LINEAS: int = 16384  # textos partidos en líneas memorizados por proceso
+    
+    # Miniaturas de plantillas
+    MINIATURA_ANCHO_PX: int = 300
+    MINIATURA_ESPERA_SEG: float = 2.0  # guardados seguidos se juntan en una miniatura
+    
+    # Bitácora (escritura en lote)
+    BITACORA_LOTE: int = 200
+    BITACORA_INTERVALO_SEG: float = 1.0
+    BITACORA_MAX_PENDIENTES: int = 10000
+    
+    # Carga de padrones
+    PADRON_CHUNK_FILAS: int = 50000
+    
     # CORS
     BACKEND_CORS_ORIGINS: list = ["http://localhost:5173", "http://localhost:3000"]
     
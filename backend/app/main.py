@@ -32,16 +32,57 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+# Arranque: bitácora en lote (se vacía al apagar) y registro de padrones
+from app.services.bitacora_service import escritor_bitacora
+from app.services.padron_registry import padron_registry
+
+@app.on_event("startup")
+def iniciar_bitacora():
+    escritor_bitacora.iniciar()
+
+@app.on_event("startup")
+def cargar_padrones():
+    padron_registry.precargar()
+
+@app.on_event("shutdown")
+def detener_bitacora():
+    escritor_bitacora.detener()
+
+# Planificador de emisiones (cola con leases)
+from app.services.planificador import planificador_emision
+
+@app.on_event("startup")
+def iniciar_planificador():
+    planificador_emision.iniciar()
+
+@app.on_event("shutdown")
+def detener_planificador():
+    planificador_emision.detener()
+
+# Avance de las emisiones que corren en otros procesos (LISTEN/NOTIFY)
+from app.services.progreso import escucha_progreso
+
+@app.on_event("startup")
+def iniciar_escucha_progreso():
+    escucha_progreso.iniciar()
+
+@app.on_event("shutdown")
+def detener_escucha_progreso():
+    escucha_progreso.detener()
+
 # Crear directorios si no existen
 os.makedirs("./uploads/proyectos", exist_ok=True)
 os.makedirs("./uploads/plantillas", exist_ok=True)
+os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 
 # Servir archivos estáticos
 app.mount("/uploads", StaticFiles(directory="./uploads"), name="uploads")
 
 # Importar routers
-from app.api.v1 import auth, proyectos, plantillas
+from app.api.v1 import auth, proyectos, plantillas, emisiones, ws
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Autenticación"])
 app.include_router(proyectos.router, prefix="/api/v1/proyectos", tags=["Proyectos"])
-app.include_router(plantillas.router, prefix="/api/v1/plantillas", tags=["Plantillas"])
\ No newline at end of file
+app.include_router(plantillas.router, prefix="/api/v1/plantillas", tags=["Plantillas"])
+app.include_router(emisiones.router, prefix="/api/v1/emisiones", tags=["Emisiones"])
+app.include_router(ws.router, tags=["WebSocket"])
\ No newline at end of file
@@ -3,5 +3,9 @@ from app.models.proyecto import Proyecto
 from app.models.plantilla import Plantilla
 from app.models.padron import IdentificadorPadron
 from app.models.bitacora import Bitacora
+from app.models.emision import SesionEmision, EmisionTemp, EmisionFinal, EmisionAcumulada
 
-__all__ = ["Usuario", "Proyecto", "Plantilla", "IdentificadorPadron", "Bitacora"]
\ No newline at end of file
+__all__ = [
+    "Usuario", "Proyecto", "Plantilla", "IdentificadorPadron", "Bitacora",
+    "SesionEmision", "EmisionTemp", "EmisionFinal", "EmisionAcumulada"
+]
\ No newline at end of file
@@ -0,0 +1,215 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, Boolean, DateTime, Date, ForeignKey, Text, Numeric, func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+from app.core.database import Base
+
+class SesionEmision(Base):
+    __tablename__ = "sesiones_emision"
+
+    id_sesion = Column(Integer, primary_key=True, index=True)
+    uuid_sesion = Column(UUID(as_uuid=True), default=uuid.uuid4, unique=True, nullable=False, index=True)
+    uuid_proyecto = Column(UUID(as_uuid=True), ForeignKey("proyectos.uuid_proyecto"), nullable=False)
+    uuid_plantilla = Column(UUID(as_uuid=True), ForeignKey("plantillas.uuid_plantilla"), nullable=False)
+    uuid_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.uuid_usuario"), nullable=False)
+
+    # Configuración de emisión
+    pmo_inicial = Column(Integer, nullable=False)
+    visita_inicial = Column(Integer, nullable=False)
+    fecha_emision = Column(Date, nullable=False)
+    tipo_documento = Column(String(5), nullable=False)
+    ruta_salida = Column(String(500), nullable=False)
+
+    # Estado y métricas
+    estado = Column(String(20), default="INICIADA", index=True)
+    total_registros = Column(Integer, nullable=True)
+    registros_procesados = Column(Integer, default=0)
+    registros_exitosos = Column(Integer, default=0)
+    registros_con_error = Column(Integer, default=0)
+
+    # Tiempos
+    tiempo_inicio = Column(DateTime(timezone=True), server_default=func.now())
+    tiempo_fin = Column(DateTime(timezone=True), nullable=True)
+    duracion_segundos = Column(Integer, nullable=True)
+
+    # Planificación (ver app.services.planificador)
+    prioridad = Column(SmallInteger, nullable=True)
+    lease_owner = Column(String(100), nullable=True)
+    lease_expira = Column(DateTime(timezone=True), nullable=True)
+
+    created_on = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<SesionEmision {self.uuid_sesion} - {self.estado}>"
+
+class EmisionTemp(Base):
+    __tablename__ = "emision_temp"
+
+    id_temp = Column(Integer, primary_key=True, index=True)
+    uuid_sesion = Column(UUID(as_uuid=True), ForeignKey("sesiones_emision.uuid_sesion", ondelete="CASCADE"), nullable=False, index=True)
+    uuid_padron = Column(UUID(as_uuid=True), nullable=False)
+    uuid_plantilla = Column(UUID(as_uuid=True), ForeignKey("plantillas.uuid_plantilla"), nullable=False)
+    uuid_proyecto = Column(UUID(as_uuid=True), ForeignKey("proyectos.uuid_proyecto"), nullable=False)
+
+    # Datos del CSV
+    cuenta = Column(String(50), nullable=False, index=True)
+    observaciones = Column(Text, nullable=True)
+    orden_ruta = Column(Integer, nullable=False)
+
+    # Datos mapeados del padrón
+    datos_padron = Column(JSONB, nullable=True)
+
+    # Asignados en bloque al iniciar la emisión
+    pmo = Column(Integer, nullable=True)
+    visita = Column(Integer, nullable=True)
+    folio = Column(String(100), nullable=True)
+    codebar = Column(String(255), nullable=True)
+    orden_impresion = Column(Integer, nullable=True)
+
+    # Control de procesamiento
+    procesado = Column(Boolean, default=False, index=True)
+    tiene_error = Column(Boolean, default=False)
+    mensaje_error = Column(Text, nullable=True)
+
+    created_on = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<EmisionTemp {self.cuenta} - {self.orden_ruta}>"
+
+class DatosEmisionMixin:
+    """Columnas compartidas entre emision_final y emision_acumulada"""
+
+    # Identificadores
+    folio = Column(String(100), nullable=True)
+
+    # Referencias
+    uuid_padron = Column(UUID(as_uuid=True), nullable=False)
+
+    # Tipo de documento
+    tipo_documento = Column(String(5), nullable=False)
+
+    # Datos generales
+    superficie_terreno = Column(Numeric(12, 2), nullable=True)
+    superficie_construccion = Column(Numeric(12, 2), nullable=True)
+    recaudadora = Column(String(50), nullable=True)
+    tipo = Column(String(50), nullable=True)
+    cuenta = Column(String(50), nullable=False, index=True)
+    clave_cuenta = Column(String(50), nullable=True)
+    clave_catastral = Column(String(50), nullable=True)
+    fecha_emision = Column(Date, nullable=False)
+    zona = Column(String(50), nullable=True)
+    subzona = Column(String(50), nullable=True)
+    manzana = Column(String(50), nullable=True)
+    nombre_contribuyente = Column(String(255), nullable=True)
+    domicilio_contribuyente = Column(String(500), nullable=True)
+    ubicacion_predio = Column(String(500), nullable=True)
+    observaciones = Column(Text, nullable=True)
+
+    # Montos fiscales
+    impuesto = Column(Numeric(12, 2), nullable=True)
+    recargos = Column(Numeric(12, 2), nullable=True)
+    actualizacion = Column(Numeric(12, 2), nullable=True)
+    multa = Column(Numeric(12, 2), nullable=True)
+    gastos_notificacion = Column(Numeric(12, 2), nullable=True)
+    total_credito_fiscal = Column(Numeric(12, 2), nullable=True)
+
+    # Detalles
+    anio = Column(String(4), nullable=True)
+    adeudo = Column(String(50), nullable=True)
+    bimestre = Column(String(2), nullable=True)
+    valor_fiscal = Column(Numeric(15, 2), nullable=True)
+    tasa = Column(Numeric(8, 4), nullable=True)
+
+    # Control
+    pmo = Column(Integer, nullable=False)
+    visita = Column(Integer, nullable=False)
+    iniciales_notificador = Column(String(10), nullable=True)
+    estatus_captura = Column(String(50), nullable=True)
+
+    # PENSIONES
+    numero_afiliado = Column(String(50), nullable=True)
+    cp = Column(String(10), nullable=True)
+    telefono = Column(String(20), nullable=True)
+    celular = Column(String(20), nullable=True)
+    tipo_prestamo = Column(String(100), nullable=True)
+    tipo_cobranza = Column(String(50), nullable=True)
+    nombre_aval = Column(String(255), nullable=True)
+    telefono_aval = Column(String(20), nullable=True)
+    celular_aval = Column(String(20), nullable=True)
+    domicilio_aval = Column(String(300), nullable=True)
+    colonia_aval = Column(String(100), nullable=True)
+    municipio_aval = Column(String(100), nullable=True)
+    domicilio_garantia = Column(String(300), nullable=True)
+    colonia_garantia = Column(String(100), nullable=True)
+    poblacion_garantia = Column(String(100), nullable=True)
+    municipio_garantia = Column(String(100), nullable=True)
+    ultimo_abono = Column(Date, nullable=True)
+    monto_vencido = Column(Numeric(12, 2), nullable=True)
+    saldo_por_vencer = Column(Numeric(12, 2), nullable=True)
+    int_moratorio = Column(Numeric(12, 2), nullable=True)
+    total = Column(Numeric(12, 2), nullable=True)
+
+    # LICENCIAS
+    giro = Column(String(200), nullable=True)
+    anuncios_anexos = Column(String(200), nullable=True)
+    anio_inicio = Column(String(4), nullable=True)
+    anio_fin = Column(String(4), nullable=True)
+    derechos_licencia_municipal = Column(Numeric(12, 2), nullable=True)
+    derechos_conservacion = Column(Numeric(12, 2), nullable=True)
+    derechos_anuncios = Column(Numeric(12, 2), nullable=True)
+    derechos_mejoramiento = Column(Numeric(12, 2), nullable=True)
+    productos_impresos = Column(Numeric(12, 2), nullable=True)
+    holograma_por_giro = Column(Numeric(12, 2), nullable=True)
+    solicitud_giro = Column(Numeric(12, 2), nullable=True)
+    total_adeudo = Column(Numeric(12, 2), nullable=True)
+
+    # Adicionales
+    cartografia = Column(String(255), nullable=True)
+    prescrito = Column(String(2), nullable=True)
+    fecha_corte = Column(Date, nullable=True)
+    domicilio_fiscal = Column(String(500), nullable=True)
+
+    # APA
+    id_apa = Column(String(50), nullable=True)
+    cpv = Column(String(10), nullable=True)
+    agua_alcantarillado = Column(Numeric(12, 2), nullable=True)
+    colectores = Column(Numeric(12, 2), nullable=True)
+    infraestructura = Column(Numeric(12, 2), nullable=True)
+    conexiones = Column(Numeric(12, 2), nullable=True)
+    saldo = Column(Numeric(12, 2), nullable=True)
+
+    created_on = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmisionFinal(DatosEmisionMixin, Base):
+    __tablename__ = "emision_final"
+
+    id_emision = Column(Integer, primary_key=True, index=True)
+    uuid_sesion = Column(UUID(as_uuid=True), ForeignKey("sesiones_emision.uuid_sesion", ondelete="CASCADE"), nullable=False, index=True)
+    codebar = Column(String(255), unique=True, nullable=False, index=True)
+    uuid_plantilla = Column(UUID(as_uuid=True), ForeignKey("plantillas.uuid_plantilla"), nullable=False)
+    uuid_proyecto = Column(UUID(as_uuid=True), ForeignKey("proyectos.uuid_proyecto"), nullable=False)
+    orden_impresion = Column(Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<EmisionFinal {self.codebar}>"
+
+class EmisionAcumulada(DatosEmisionMixin, Base):
+    __tablename__ = "emision_acumulada"
+
+    id_acumulada = Column(Integer, primary_key=True, index=True)
+    uuid_sesion = Column(UUID(as_uuid=True), nullable=False, index=True)
+    codebar = Column(String(255), unique=True, nullable=False)
+    uuid_plantilla = Column(UUID(as_uuid=True), nullable=False)
+    uuid_proyecto = Column(UUID(as_uuid=True), nullable=False, index=True)
+    uuid_usuario = Column(UUID(as_uuid=True), ForeignKey("usuarios.uuid_usuario"), nullable=False, index=True)
+    orden_impresion = Column(Integer, nullable=True)
+
+    # Archivo generado
+    ruta_pdf = Column(String(500), nullable=True)
+    nombre_archivo_pdf = Column(String(255), nullable=True)
+
+    # Metadatos
+    fecha_generacion = Column(DateTime(timezone=True), nullable=False)
+    tiempo_procesamiento_ms = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<EmisionAcumulada {self.codebar}>"
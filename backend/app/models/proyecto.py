@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, func, and_, or_, exists, table, column
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, column_property
 import uuid
 from app.core.database import Base
 
+# Columnas de sesiones_emision que usa en_emision (el modelo, en app.models.emision, no se importa aquí)
+_sesiones_emision = table("sesiones_emision", column("uuid_proyecto"), column("estado"), column("lease_expira"))
+
 class Proyecto(Base):
     __tablename__ = "proyectos"
     
@@ -14,10 +17,23 @@ class Proyecto(Base):
     logo_proyecto = Column(String(500), nullable=True)
     uuid_padron = Column(UUID(as_uuid=True), ForeignKey("identificador_padron.uuid_padron"), nullable=False)
     usuario_creador = Column(UUID(as_uuid=True), ForeignKey("usuarios.uuid_usuario"), nullable=False)
-    en_emision = Column(Boolean, default=False)
     created_on = Column(DateTime(timezone=True), server_default=func.now())
     updated_on = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     is_deleted = Column(Boolean, default=False)
+
+    # En emisión mientras tenga una sesión en cola o con lease vigente; si el
+    # proceso que la renderiza muere, el lease vence y el proyecto se libera solo
+    en_emision = column_property(
+        exists().where(
+            and_(
+                _sesiones_emision.c.uuid_proyecto == uuid_proyecto,
+                or_(
+                    _sesiones_emision.c.estado == "EN_COLA",
+                    _sesiones_emision.c.lease_expira > func.now()
+                )
+            )
+        )
+    )
     
     def __repr__(self):
         return f"<Proyecto {self.nombre_proyecto}>"
\ No newline at end of file
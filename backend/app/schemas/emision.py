@@ -0,0 +1,75 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime, date
+import uuid
+
+class EmisionCreate(BaseModel):
+    uuid_plantilla: uuid.UUID
+    pmo_inicial: int = Field(..., ge=1)
+    visita_inicial: int = Field(..., ge=1)
+    fecha_emision: date
+    tipo_documento: str = Field(..., pattern="^(CI|N|A|E)$")
+    prioridad: Optional[int] = Field(None, ge=0, le=9)  # 0 = más urgente; sin valor se calcula al iniciar
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "uuid_plantilla": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                "pmo_inicial": 1,
+                "visita_inicial": 1,
+                "fecha_emision": "2025-01-15",
+                "tipo_documento": "N"
+            }
+        }
+
+class SesionEmisionResponse(BaseModel):
+    uuid_sesion: uuid.UUID
+    uuid_proyecto: uuid.UUID
+    uuid_plantilla: uuid.UUID
+    uuid_usuario: uuid.UUID
+    pmo_inicial: int
+    visita_inicial: int
+    fecha_emision: date
+    tipo_documento: str
+    ruta_salida: str
+    estado: str
+    total_registros: Optional[int] = None
+    registros_procesados: int = 0
+    registros_exitosos: int = 0
+    registros_con_error: int = 0
+    tiempo_inicio: Optional[datetime] = None
+    tiempo_fin: Optional[datetime] = None
+    duracion_segundos: Optional[int] = None
+    prioridad: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class VolumenResponse(BaseModel):
+    archivo: str
+    bytes: int
+
+
+class RutaCargaResponse(BaseModel):
+    cuentas_leidas: int
+    registros_preparados: int
+    cuentas_no_encontradas: int
+    cuentas_duplicadas: int
+    muestra_no_encontradas: List[str] = []
+    muestra_duplicadas: List[str] = []
+
+class ProgresoEmision(BaseModel):
+    """Evento del websocket /ws/emisiones/{uuid_sesion}"""
+    uuid_sesion: uuid.UUID
+    estado: str
+    total_registros: Optional[int] = None
+    registros_procesados: int = 0
+    registros_exitosos: int = 0
+    registros_con_error: int = 0
+    registros_por_segundo: Optional[float] = None
+    eta_segundos: Optional[int] = None
+    momento: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
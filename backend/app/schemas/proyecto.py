@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 import uuid
 
@@ -39,4 +39,12 @@ class PadronResponse(BaseModel):
     descripcion: Optional[str] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PadronCargaResponse(BaseModel):
+    nombre_padron: str
+    registros_leidos: int
+    registros_insertados: int
+    registros_actualizados: int
+    registros_descartados: int
+    columnas_ignoradas: List[str] = []
\ No newline at end of file
@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import text
 from fastapi import HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -8,6 +10,12 @@ from app.core.security import verify_password, get_password_hash, create_access_
 from app.schemas.auth import LoginRequest, TokenResponse, UserCreate, UserResponse
 from app.core.config import settings
 from app.services.bitacora_service import BitacoraService
+from app.services.principales import cache_principales
+
+# Hilos para login y registro (consulta + bcrypt, ~100-300 ms de CPU). Acotados
+# para que una ráfaga de logins no ocupe el threadpool de los demás endpoints:
+# las peticiones que no caben esperan en el event loop.
+pool_login = ThreadPoolExecutor(max_workers=settings.LOGIN_HILOS, thread_name_prefix="login")
 
 class AuthService:
     
@@ -38,6 +46,10 @@ class AuthService:
                 detail="Credenciales incorrectas"
             )
         
+        # Los cambios al usuario van por SQL; desprenderlo evita que cada
+        # commit lo vuelva a leer de la BD
+        db.expunge(user)
+        
         # Verificar si está bloqueado
         if user.bloqueado_hasta and user.bloqueado_hasta > datetime.utcnow():
             tiempo_restante = (user.bloqueado_hasta - datetime.utcnow()).seconds // 60
@@ -48,7 +60,7 @@ class AuthService:
         
         # Verificar contraseña
         if not verify_password(login_data.password, user.contrasena):
-            AuthService._manejar_intento_fallido(db, user)
+            AuthService._manejar_intento_fallido(db, user.username)
             
             # Registrar en bitácora
             BitacoraService.registrar(
@@ -74,11 +86,14 @@ class AuthService:
                 detail="Usuario inactivo o eliminado"
             )
         
-        # Resetear intentos fallidos
-        user.intentos_login_fallidos = 0
-        user.bloqueado_hasta = None
-        user.last_login = datetime.utcnow()
+        # Resetear intentos fallidos (un solo UPDATE en la BD)
+        user_response = UserResponse.model_validate(user)
+        user_response.last_login = db.execute(
+            text("SELECT resetear_intentos_login(:username)"),
+            {"username": user.username}
+        ).scalar()
         db.commit()
+        cache_principales.invalidar(user.username)
         
         # Crear token JWT
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -101,20 +116,23 @@ class AuthService:
         return TokenResponse(
             access_token=access_token,
             token_type="bearer",
-            user=UserResponse.model_validate(user)
+            user=user_response
         )
     
     @staticmethod
-    def _manejar_intento_fallido(db: Session, user: Usuario):
-        """Manejar intento de login fallido"""
-        user.intentos_login_fallidos += 1
-        user.ultimo_intento_login = datetime.utcnow()
-        
-        # Bloquear después de 5 intentos
-        if user.intentos_login_fallidos >= 5:
-            user.bloqueado_hasta = datetime.utcnow() + timedelta(minutes=15)
-        
+    def _manejar_intento_fallido(db: Session, username: str):
+        """
+        Manejar intento de login fallido
+        
+        El contador y el bloqueo (15 minutos a partir de 5 intentos) se
+        actualizan en un solo UPDATE, así intentos simultáneos no se pierden.
+        """
+        db.execute(
+            text("SELECT manejar_intento_login_fallido(:username)"),
+            {"username": username}
+        )
         db.commit()
+        cache_principales.invalidar(username)
     
     @staticmethod
     def get_current_user_info(user: Usuario) -> UserResponse:
@@ -1,9 +1,130 @@
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy import insert
+from typing import Optional, List, Dict, Any
+import logging
+import queue
+import threading
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.models.bitacora import Bitacora
+from app.core.database import SessionLocal
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EscritorBitacora:
+    """
+    Escritura diferida de la bitácora
+
+    Las entradas se encolan en memoria y un hilo las inserta en lotes
+    (INSERT multi-fila) al juntar BITACORA_LOTE o cada BITACORA_INTERVALO_SEG.
+    Si el escritor no está iniciado o la cola está llena, encolar() devuelve
+    False y el llamador escribe de forma síncrona.
+    """
+
+    def __init__(self, tamano_lote: int, intervalo_segundos: float, max_pendientes: int):
+        self.tamano_lote = tamano_lote
+        self.intervalo_segundos = intervalo_segundos
+        self._cola: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_pendientes)
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def activo(self) -> bool:
+        return self._hilo is not None and not self._detener.is_set()
+
+    def iniciar(self) -> None:
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name="escritor-bitacora", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Detener el hilo y escribir todo lo pendiente"""
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+        self._vaciar()
+
+    def encolar(self, entrada: Dict[str, Any]) -> bool:
+        if not self.activo:
+            return False
+        try:
+            self._cola.put_nowait(entrada)
+            return True
+        except queue.Full:
+            return False
+
+    def _ciclo(self) -> None:
+        while not self._detener.is_set():
+            lote = self._tomar_lote()
+            if lote:
+                self._escribir(lote)
+
+    def _tomar_lote(self) -> List[Dict[str, Any]]:
+        """Esperar la primera entrada hasta el intervalo y juntar las demás sin bloquear"""
+        try:
+            lote = [self._cola.get(timeout=self.intervalo_segundos)]
+        except queue.Empty:
+            return []
+        while len(lote) < self.tamano_lote:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _vaciar(self) -> None:
+        while True:
+            lote = []
+            while len(lote) < self.tamano_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return
+            self._escribir(lote)
+
+    def _escribir(self, lote: List[Dict[str, Any]]) -> None:
+        """Insertar el lote; si falla, se reintenta entrada por entrada para no perder las buenas"""
+        db = SessionLocal()
+        try:
+            try:
+                db.execute(insert(Bitacora), lote)
+                db.commit()
+                return
+            except Exception:
+                db.rollback()
+                logger.warning(
+                    "Falló el lote de %d entradas de bitácora; se escriben una por una", len(lote), exc_info=True
+                )
+
+            for entrada in lote:
+                try:
+                    db.execute(insert(Bitacora), [entrada])
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception(
+                        "No se pudo escribir la entrada de bitácora %s %s %s",
+                        entrada.get("accion"), entrada.get("entidad"), entrada.get("entidad_id")
+                    )
+        finally:
+            db.close()
+
+
+escritor_bitacora = EscritorBitacora(
+    settings.BITACORA_LOTE,
+    settings.BITACORA_INTERVALO_SEG,
+    settings.BITACORA_MAX_PENDIENTES
+)
+
 
 class BitacoraService:
 
@@ -34,24 +155,36 @@ class BitacoraService:
         user_agent: Optional[str] = None,
         fue_exitoso: bool = True,
         mensaje_error: Optional[str] = None
-    ) -> Bitacora:
+    ) -> Optional[Bitacora]:
+        """
+        Registrar una acción en la bitácora
+
+        Normalmente se encola para el escritor en lote (devuelve None); si no
+        está activo o su cola está llena, se escribe aquí mismo.
+        """
         
         # Convertir UUIDs a strings en los detalles
         if detalles:
             detalles = BitacoraService._convert_uuids_to_strings(detalles)
         
-        registro = Bitacora(
-            uuid_usuario=uuid_usuario,
-            accion=accion,
-            entidad=entidad,
-            entidad_id=entidad_id,
-            detalles=detalles,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            fue_exitoso=fue_exitoso,
-            mensaje_error=mensaje_error
-        )
+        entrada = {
+            "uuid_usuario": uuid_usuario,
+            "accion": accion,
+            "entidad": entidad,
+            "entidad_id": entidad_id,
+            "detalles": detalles,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "fue_exitoso": fue_exitoso,
+            "mensaje_error": mensaje_error,
+            # Hora del evento, no la de la escritura del lote
+            "created_on": datetime.now(timezone.utc)
+        }
+        
+        if escritor_bitacora.encolar(entrada):
+            return None
         
+        registro = Bitacora(**entrada)
         db.add(registro)
         db.commit()
         
@@ -0,0 +1,181 @@
+"""
+Códigos de barras CODE128 dibujados como trazos vectoriales PDF
+
+Sustituye el camino python-barcode + Pillow (imagen raster por documento)
+para el formato CODE128. Los demás formatos siguen usando python-barcode.
+
+Micro-benchmark contra el camino de imagen:
+
+    python -m app.services.codigo_barras
+"""
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from typing import List, Tuple
+
+# Anchos barra/espacio de cada símbolo (0-102 datos, 103-105 start A/B/C, 106 stop)
+PATRONES_CODE128 = (
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312",
+    "132212", "221213", "221312", "231212", "112232", "122132", "122231", "113222",
+    "123122", "123221", "223211", "221132", "221231", "213212", "223112", "312131",
+    "311222", "321122", "321221", "312212", "322112", "322211", "212123", "212321",
+    "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121",
+    "313121", "211331", "231131", "213113", "213311", "213131", "311123", "311321",
+    "331121", "312113", "312311", "332111", "314111", "221411", "431111", "111224",
+    "111422", "121124", "121421", "141122", "141221", "112214", "112412", "122114",
+    "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112",
+    "421211", "212141", "214121", "412121", "111143", "111341", "131141", "114113",
+    "114311", "411113", "411311", "113141", "114131", "311141", "411131", "211412",
+    "211214", "211232", "2331112",
+)
+
+CODE_C = 99
+CODE_B = 100
+START_B = 104
+START_C = 105
+STOP = 106
+
+# Zona de silencio a cada lado, en módulos
+ZONA_SILENCIO = 5
+
+
+def _barras_de_patron(patron: str) -> Tuple[Tuple[int, int], ...]:
+    """(desplazamiento, ancho) en módulos de cada barra negra del patrón"""
+    barras = []
+    posicion = 0
+    for indice, ancho in enumerate(int(w) for w in patron):
+        if indice % 2 == 0:
+            barras.append((posicion, ancho))
+        posicion += ancho
+    return tuple(barras)
+
+
+# Tablas precalculadas una vez por proceso
+BARRAS_SIMBOLO = tuple(_barras_de_patron(p) for p in PATRONES_CODE128)
+ANCHO_SIMBOLO = tuple(sum(int(w) for w in p) for p in PATRONES_CODE128)
+
+
+def _digitos_desde(valor: str, inicio: int) -> int:
+    fin = inicio
+    while fin < len(valor) and valor[fin].isdigit():
+        fin += 1
+    return fin - inicio
+
+
+def codificar_code128(valor: str) -> List[int]:
+    """
+    Codificar un valor en símbolos CODE128 (start, datos, checksum, stop)
+
+    Usa el set C para corridas de dígitos y el set B para el resto.
+    """
+    for caracter in valor:
+        if not 32 <= ord(caracter) <= 126:
+            raise ValueError(f"Carácter no soportado en CODE128: {caracter!r}")
+
+    simbolos: List[int] = []
+    conjunto = None
+    i = 0
+    n = len(valor)
+
+    while i < n:
+        digitos = _digitos_desde(valor, i)
+        minimo = 4 if (i == 0 or i + digitos == n) else 6
+
+        if digitos >= minimo or (i == 0 and digitos == n and digitos % 2 == 0):
+            if conjunto != "C":
+                simbolos.append(START_C if conjunto is None else CODE_C)
+                conjunto = "C"
+            pares = digitos - digitos % 2
+            for j in range(i, i + pares, 2):
+                simbolos.append(int(valor[j:j + 2]))
+            i += pares
+        else:
+            if conjunto != "B":
+                simbolos.append(START_B if conjunto is None else CODE_B)
+                conjunto = "B"
+            simbolos.append(ord(valor[i]) - 32)
+            i += 1
+
+    checksum = simbolos[0] + sum(posicion * s for posicion, s in enumerate(simbolos[1:], start=1))
+    simbolos.append(checksum % 103)
+    simbolos.append(STOP)
+    return simbolos
+
+
+def dibujar_code128(
+    c: canvas.Canvas,
+    valor: str,
+    x: float,
+    y: float,
+    ancho: float,
+    alto: float,
+    mostrar_texto: bool = True,
+    tamano_texto: float = 10,
+    fuente_texto: str = "Helvetica"
+) -> None:
+    """Dibujar un CODE128 como un único path relleno dentro de la caja indicada"""
+    if not valor:
+        return
+
+    simbolos = codificar_code128(valor)
+    total_modulos = sum(ANCHO_SIMBOLO[s] for s in simbolos) + 2 * ZONA_SILENCIO
+    modulo = ancho / total_modulos
+
+    alto_barras = alto
+    if mostrar_texto:
+        alto_barras = max(alto - tamano_texto * 1.2, alto / 2)
+
+    path = c.beginPath()
+    posicion = ZONA_SILENCIO
+    y_barras = y + alto - alto_barras
+    for simbolo in simbolos:
+        for desplazamiento, ancho_barra in BARRAS_SIMBOLO[simbolo]:
+            path.rect(x + (posicion + desplazamiento) * modulo, y_barras, ancho_barra * modulo, alto_barras)
+        posicion += ANCHO_SIMBOLO[simbolo]
+
+    c.saveState()
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(path, stroke=0, fill=1)
+
+    if mostrar_texto:
+        c.setFont(fuente_texto, tamano_texto)
+        linea_base = y - pdfmetrics.getDescent(fuente_texto, tamano_texto)
+        c.drawCentredString(x + ancho / 2, linea_base, valor)
+    c.restoreState()
+
+
+if __name__ == "__main__":
+    import io
+    import timeit
+    from reportlab.lib.units import cm
+    from reportlab.lib.utils import ImageReader
+    from barcode import Code128
+    from barcode.writer import ImageWriter
+
+    repeticiones = 500
+    valores = [f"*{100000 + i}1700000000N1*" for i in range(repeticiones)]
+
+    def _con_imagen() -> int:
+        salida = io.BytesIO()
+        c = canvas.Canvas(salida)
+        for valor in valores:
+            imagen = Code128(valor, writer=ImageWriter()).render({"write_text": True, "font_size": 10, "quiet_zone": 1})
+            c.drawImage(ImageReader(imagen), 2 * cm, 2 * cm, width=10 * cm, height=2 * cm)
+            c.showPage()
+        c.save()
+        return len(salida.getvalue())
+
+    def _vectorial() -> int:
+        salida = io.BytesIO()
+        c = canvas.Canvas(salida)
+        for valor in valores:
+            dibujar_code128(c, valor, 2 * cm, 2 * cm, 10 * cm, 2 * cm, True, 10)
+            c.showPage()
+        c.save()
+        return len(salida.getvalue())
+
+    for nombre, funcion in (("imagen (python-barcode)", _con_imagen), ("vectorial", _vectorial)):
+        segundos = timeit.timeit(funcion, number=1)
+        tamano = funcion()
+        print(f"{nombre:>24}: {segundos * 1000 / repeticiones:7.3f} ms/código  {tamano / repeticiones / 1024:7.2f} KB/página")
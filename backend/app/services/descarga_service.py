@@ -0,0 +1,209 @@
+"""
+Descarga de la salida de una sesión de emisión
+
+El ZIP con los PDFs de la sesión se arma mientras se envía (sin archivo
+temporal ni el ZIP completo en memoria): los PDFs ya vienen comprimidos, así
+que van sin compresión (ZIP_STORED) y el costo es solo copiar bytes. Los
+volúmenes y el manifiesto se sirven con soporte de Range para poder
+reanudar descargas grandes en enlaces inestables.
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from fastapi import HTTPException, status
+from fastapi.responses import Response, StreamingResponse
+from email.utils import formatdate
+from typing import Iterable, Iterator, List, Optional, Tuple
+import glob
+import os
+import re
+import uuid
+import zipfile
+
+from app.models.emision import SesionEmision
+from app.schemas.emision import VolumenResponse
+from app.services.volumenes import ARCHIVO_MANIFIESTO, directorio_volumenes
+
+# Bytes por lectura al copiar archivos hacia la respuesta
+TAMANO_BLOQUE = 256 * 1024
+
+_RANGO = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class _SalidaZip:
+    """Destino sin seek para ZipFile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_en_streaming(archivos: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Generar un ZIP por partes a partir de (ruta, nombre dentro del ZIP)
+
+    Sin seek, ZipFile escribe cada tamaño en un data descriptor después
+    del contenido; con más de 4 GB usa ZIP64.
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED) as archivo_zip:
+        for ruta, nombre in archivos:
+            if not os.path.isfile(ruta):
+                continue
+            info = zipfile.ZipInfo.from_file(ruta, nombre)
+            with open(ruta, "rb") as origen, archivo_zip.open(info, "w") as destino:
+                while True:
+                    bloque = origen.read(TAMANO_BLOQUE)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+                    yield salida.vaciar()
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def _leer_archivo(ruta: str, inicio: int, fin: int) -> Iterator[bytes]:
+    with open(ruta, "rb") as origen:
+        origen.seek(inicio)
+        restante = fin - inicio + 1
+        while restante > 0:
+            bloque = origen.read(min(TAMANO_BLOQUE, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+
+
+def respuesta_archivo(
+    ruta: str,
+    media_type: str,
+    nombre: str,
+    rango: Optional[str] = None,
+    if_range: Optional[str] = None
+) -> Response:
+    """
+    Servir un archivo completo (200) o un rango de bytes (206)
+
+    Un solo rango por petición (bytes=inicio-fin, inicio- o -sufijo);
+    varios rangos o una cabecera inválida (p. ej. bytes=5-3) se ignoran y
+    se envía todo. Un rango válido que empieza fuera del archivo responde
+    416. Con If-Range solo se respeta el rango si el ETag sigue igual, así
+    nunca se pega un pedazo de una versión nueva a una descarga vieja.
+    """
+    estado = os.stat(ruta)
+    tamano = estado.st_size
+    etag = f'"{estado.st_mtime_ns:x}-{tamano:x}"'
+    encabezados = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(estado.st_mtime, usegmt=True),
+        "Content-Disposition": f'attachment; filename="{nombre}"'
+    }
+
+    inicio, fin = 0, tamano - 1
+    codigo = status.HTTP_200_OK
+    coincide = _RANGO.fullmatch(rango.strip()) if rango else None
+    valido = coincide is not None and (coincide[1] or coincide[2]) and not (
+        coincide[1] and coincide[2] and int(coincide[2]) < int(coincide[1])
+    )
+
+    if valido and (if_range is None or if_range == etag):
+        if coincide[1]:
+            inicio = int(coincide[1])
+            fin = min(int(coincide[2]), tamano - 1) if coincide[2] else tamano - 1
+        else:
+            # Los últimos N bytes; con -0 (o un archivo vacío) no hay nada que enviar
+            inicio = tamano - min(int(coincide[2]), tamano)
+
+        if inicio >= tamano:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{tamano}", "Accept-Ranges": "bytes"}
+            )
+        codigo = status.HTTP_206_PARTIAL_CONTENT
+        encabezados["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+
+    encabezados["Content-Length"] = str(max(fin - inicio + 1, 0))
+    return StreamingResponse(
+        _leer_archivo(ruta, inicio, fin),
+        status_code=codigo,
+        media_type=media_type,
+        headers=encabezados
+    )
+
+
+class DescargaService:
+
+    @staticmethod
+    def _sesion(db: Session, uuid_sesion: uuid.UUID) -> SesionEmision:
+        sesion = db.query(SesionEmision).filter(
+            SesionEmision.uuid_sesion == uuid_sesion
+        ).first()
+
+        if not sesion:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión de emisión no encontrada"
+            )
+
+        return sesion
+
+    @staticmethod
+    def archivos_sesion(db: Session, uuid_sesion: uuid.UUID) -> List[Tuple[str, str]]:
+        """
+        PDFs generados de la sesión en orden de impresión, como (ruta, nombre)
+
+        Se leen antes de empezar a enviar: la respuesta sigue después de que
+        se cierra la sesión de BD de la petición.
+        """
+        DescargaService._sesion(db, uuid_sesion)
+
+        rutas = db.execute(
+            text("""
+                SELECT ruta_pdf FROM emision_acumulada
+                WHERE uuid_sesion = :uuid_sesion
+                ORDER BY orden_impresion
+            """),
+            {"uuid_sesion": str(uuid_sesion)}
+        ).scalars().all()
+
+        return [(ruta, os.path.basename(ruta)) for ruta in rutas]
+
+    @staticmethod
+    def volumenes(db: Session, uuid_sesion: uuid.UUID) -> List[VolumenResponse]:
+        """Volúmenes de impresión de la sesión (vacío si aún no se generan)"""
+        sesion = DescargaService._sesion(db, uuid_sesion)
+        directorio = directorio_volumenes(sesion.ruta_salida)
+
+        return [
+            VolumenResponse(archivo=os.path.basename(ruta), bytes=os.path.getsize(ruta))
+            for ruta in sorted(glob.glob(os.path.join(directorio, "volumen_*.pdf")))
+        ]
+
+    @staticmethod
+    def ruta_volumen(db: Session, uuid_sesion: uuid.UUID, archivo: str) -> str:
+        """Ruta de un volumen o del manifiesto; solo nombres que existan en el directorio de volúmenes"""
+        sesion = DescargaService._sesion(db, uuid_sesion)
+        directorio = directorio_volumenes(sesion.ruta_salida)
+
+        validos = {os.path.basename(ruta) for ruta in glob.glob(os.path.join(directorio, "volumen_*.pdf"))}
+        validos.add(ARCHIVO_MANIFIESTO)
+        ruta = os.path.join(directorio, archivo)
+
+        if archivo not in validos or not os.path.isfile(ruta):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archivo no encontrado"
+            )
+
+        return ruta
@@ -0,0 +1,1243 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import Integer, and_, cast, or_, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi import HTTPException, status, UploadFile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Any, Tuple
+import pandas as pd
+import csv
+import logging
+import multiprocessing
+import uuid
+import io
+import os
+import re
+from datetime import datetime, timedelta
+
+from app.models.emision import SesionEmision, EmisionTemp, EmisionFinal, EmisionAcumulada
+from app.models.plantilla import Plantilla
+from app.models.proyecto import Proyecto
+from app.models.padron import IdentificadorPadron
+from app.models.usuario import Usuario
+from app.schemas.emision import EmisionCreate, SesionEmisionResponse, RutaCargaResponse, ProgresoEmision
+from app.services.bitacora_service import BitacoraService
+from app.services.padron_service import PadronService
+from app.services import render_service
+from app.services.padron_lector import LectorPadron
+from app.services.padron_registry import padron_registry, DefinicionPadron
+from app.services.folios import asignador_folios, formatear_folio, formatear_codebar
+from app.services.progreso import canal_progreso, CANAL_NOTIFY
+from app.services.plantilla_compiler import plan_de_plantilla
+from app.services.volumenes import generar_volumenes
+from app.core.database import SessionLocal
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class EmisionCancelada(Exception):
+    """La sesión se canceló mientras se procesaba"""
+
+class LeasePerdido(Exception):
+    """El lease de la sesión venció y otro proceso la retomó"""
+
+class EmisionService:
+
+    # Máximo de cuentas que se devuelven como muestra en el reporte de la ruta
+    MUESTRA_REPORTE = 1000
+
+    # Prioridad en la cola del planificador (menor = antes)
+    PRIORIDAD_ALTA = 0
+    PRIORIDAD_NORMAL = 5
+
+    # Dueño del lease mientras renderizan los workers externos (app.workers.emision)
+    PROPIETARIO_WORKERS = "workers"
+
+    @staticmethod
+    def crear_sesion(
+        db: Session,
+        emision_data: EmisionCreate,
+        usuario: Usuario,
+        ip_address: Optional[str] = None
+    ) -> SesionEmisionResponse:
+        """Crear sesión de emisión (el proyecto se bloquea al encolarla)"""
+
+        plantilla = db.query(Plantilla).filter(
+            and_(
+                Plantilla.uuid_plantilla == emision_data.uuid_plantilla,
+                Plantilla.is_deleted == False
+            )
+        ).first()
+
+        if not plantilla:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Plantilla no encontrada"
+            )
+
+        proyecto = db.query(Proyecto).filter(
+            and_(
+                Proyecto.uuid_proyecto == plantilla.uuid_proyecto,
+                Proyecto.is_deleted == False
+            )
+        ).first()
+
+        if not proyecto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Proyecto no encontrado"
+            )
+
+        uuid_sesion = uuid.uuid4()
+        sesion = SesionEmision(
+            uuid_sesion=uuid_sesion,
+            uuid_proyecto=proyecto.uuid_proyecto,
+            uuid_plantilla=plantilla.uuid_plantilla,
+            uuid_usuario=usuario.uuid_usuario,
+            pmo_inicial=emision_data.pmo_inicial,
+            visita_inicial=emision_data.visita_inicial,
+            fecha_emision=emision_data.fecha_emision,
+            tipo_documento=emision_data.tipo_documento,
+            ruta_salida=os.path.join(settings.OUTPUT_DIR, str(uuid_sesion)),
+            estado="INICIADA",
+            prioridad=emision_data.prioridad
+        )
+
+        db.add(sesion)
+        db.commit()
+        db.refresh(sesion)
+
+        # Registrar en bitácora
+        BitacoraService.registrar(
+            db=db,
+            uuid_usuario=usuario.uuid_usuario,
+            accion="INICIAR_EMISION",
+            entidad="SESION_EMISION",
+            entidad_id=str(sesion.uuid_sesion),
+            detalles={
+                "proyecto": proyecto.nombre_proyecto,
+                "plantilla": plantilla.nombre_plantilla,
+                "tipo_documento": sesion.tipo_documento
+            },
+            ip_address=ip_address
+        )
+
+        return SesionEmisionResponse.model_validate(sesion)
+
+    @staticmethod
+    def get_sesion(db: Session, uuid_sesion: uuid.UUID) -> SesionEmisionResponse:
+        """Obtener estado y contadores de una sesión"""
+
+        sesion = db.query(SesionEmision).filter(
+            SesionEmision.uuid_sesion == uuid_sesion
+        ).first()
+
+        if not sesion:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión de emisión no encontrada"
+            )
+
+        return SesionEmisionResponse.model_validate(sesion)
+
+    @staticmethod
+    def cargar_ruta(
+        db: Session,
+        uuid_sesion: uuid.UUID,
+        file: UploadFile,
+        usuario: Usuario,
+        ip_address: Optional[str] = None
+    ) -> RutaCargaResponse:
+        """
+        Cargar el CSV de cuentas en orden de ruta a emision_temp
+
+        El CSV (columnas cuenta y opcionalmente orden_ruta y observaciones) se
+        envía con COPY a una tabla temporal y se cruza con el padrón en una sola
+        sentencia: se llena datos_padron (con el detalle, si el padrón lo tiene)
+        y en la misma pasada se cuentan las cuentas duplicadas y no encontradas.
+        Volver a cargar reemplaza la ruta anterior de la sesión.
+        """
+
+        sesion = db.query(SesionEmision).filter(
+            SesionEmision.uuid_sesion == uuid_sesion
+        ).first()
+
+        if not sesion:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión de emisión no encontrada"
+            )
+
+        if sesion.estado != "INICIADA":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Solo se puede cargar la ruta de una sesión que no ha iniciado"
+            )
+
+        if os.path.splitext(file.filename or "")[1].lower() != ".csv":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La ruta debe ser un archivo CSV"
+            )
+
+        plantilla = db.query(Plantilla).filter(
+            Plantilla.uuid_plantilla == sesion.uuid_plantilla
+        ).first()
+        padron = db.query(IdentificadorPadron).filter(
+            IdentificadorPadron.uuid_padron == plantilla.uuid_padron
+        ).first()
+
+        definicion = EmisionService._definicion(padron)
+        tabla_nombre, columna_cuenta = definicion.tabla, definicion.columna_cuenta
+
+        leidas = 0
+        cursor = db.connection().connection.cursor()
+
+        try:
+            cursor.execute("""
+                CREATE TEMP TABLE ruta_emision (
+                    orden_ruta INTEGER NOT NULL,
+                    cuenta VARCHAR(50) NOT NULL,
+                    observaciones TEXT
+                ) ON COMMIT DROP
+            """)
+
+            for bloque in PadronService._leer_csv(file.file):
+                if "cuenta" not in bloque.columns:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="El archivo no contiene la columna cuenta"
+                    )
+
+                cuentas = bloque["cuenta"].str.strip()
+                if "orden_ruta" in bloque.columns:
+                    orden = pd.to_numeric(bloque["orden_ruta"], errors="coerce")
+                else:
+                    orden = pd.Series(range(leidas + 1, leidas + len(bloque) + 1), index=bloque.index)
+                leidas += len(bloque)
+
+                ruta = pd.DataFrame({
+                    "orden_ruta": orden.astype("Int64"),
+                    "cuenta": cuentas.str.slice(0, 50),
+                    "observaciones": bloque["observaciones"].mask(bloque["observaciones"].str.strip() == "")
+                    if "observaciones" in bloque.columns else None
+                })
+                ruta = ruta[ruta["cuenta"].ne("") & ruta["orden_ruta"].notna()]
+
+                buffer = io.StringIO()
+                ruta.to_csv(buffer, index=False, header=False, na_rep="\\N")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY ruta_emision (orden_ruta, cuenta, observaciones) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buffer
+                )
+
+            cursor.execute("ANALYZE ruta_emision")
+
+            db.execute(
+                text("DELETE FROM emision_temp WHERE uuid_sesion = :uuid_sesion"),
+                {"uuid_sesion": str(sesion.uuid_sesion)}
+            )
+
+            datos_padron = EmisionService._expresion_datos_padron(definicion)
+
+            # Primera aparición de cada cuenta (por orden de ruta); las repetidas
+            # se reportan. El INSERT y el reporte salen de la misma sentencia.
+            reporte = db.execute(
+                text(f"""
+                    WITH duplicadas AS (
+                        SELECT cuenta
+                        FROM ruta_emision
+                        GROUP BY cuenta
+                        HAVING COUNT(*) > 1
+                    ),
+                    ruta AS (
+                        SELECT DISTINCT ON (cuenta) orden_ruta, cuenta, observaciones
+                        FROM ruta_emision
+                        ORDER BY cuenta, orden_ruta
+                    ),
+                    cruce AS (
+                        SELECT r.orden_ruta, r.cuenta, r.observaciones, p.uuid_padron AS encontrada,
+                               CASE WHEN p.uuid_padron IS NOT NULL THEN {datos_padron} END AS datos_padron
+                        FROM ruta r
+                        LEFT JOIN {tabla_nombre} p
+                            ON p.uuid_proyecto = :uuid_proyecto
+                            AND p.{columna_cuenta} = r.cuenta
+                    ),
+                    insertados AS (
+                        INSERT INTO emision_temp (
+                            uuid_sesion, uuid_padron, uuid_plantilla, uuid_proyecto,
+                            cuenta, observaciones, orden_ruta, datos_padron
+                        )
+                        SELECT CAST(:uuid_sesion AS UUID), CAST(:uuid_padron AS UUID),
+                               CAST(:uuid_plantilla AS UUID), CAST(:uuid_proyecto AS UUID),
+                               cuenta, observaciones, orden_ruta, datos_padron
+                        FROM cruce
+                        WHERE encontrada IS NOT NULL
+                        RETURNING 1
+                    )
+                    SELECT
+                        (SELECT COUNT(*) FROM insertados),
+                        (SELECT COUNT(*) FROM cruce WHERE encontrada IS NULL),
+                        (SELECT COUNT(*) FROM duplicadas),
+                        ARRAY(SELECT cuenta FROM cruce WHERE encontrada IS NULL ORDER BY orden_ruta LIMIT :muestra),
+                        ARRAY(SELECT cuenta FROM duplicadas ORDER BY cuenta LIMIT :muestra)
+                """),
+                {
+                    "uuid_sesion": str(sesion.uuid_sesion),
+                    "uuid_padron": str(plantilla.uuid_padron),
+                    "uuid_plantilla": str(plantilla.uuid_plantilla),
+                    "uuid_proyecto": str(sesion.uuid_proyecto),
+                    "muestra": EmisionService.MUESTRA_REPORTE
+                }
+            ).fetchone()
+
+            sesion.total_registros = int(reporte[0])
+            db.commit()
+
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al cargar la ruta: {e}"
+            )
+        finally:
+            cursor.close()
+
+        respuesta = RutaCargaResponse(
+            cuentas_leidas=leidas,
+            registros_preparados=int(reporte[0]),
+            cuentas_no_encontradas=int(reporte[1]),
+            cuentas_duplicadas=int(reporte[2]),
+            muestra_no_encontradas=list(reporte[3]),
+            muestra_duplicadas=list(reporte[4])
+        )
+
+        # Registrar en bitácora
+        BitacoraService.registrar(
+            db=db,
+            uuid_usuario=usuario.uuid_usuario,
+            accion="CARGAR_RUTA",
+            entidad="SESION_EMISION",
+            entidad_id=str(sesion.uuid_sesion),
+            detalles={
+                "archivo": file.filename,
+                "leidas": respuesta.cuentas_leidas,
+                "preparados": respuesta.registros_preparados,
+                "no_encontradas": respuesta.cuentas_no_encontradas,
+                "duplicadas": respuesta.cuentas_duplicadas
+            },
+            ip_address=ip_address
+        )
+
+        return respuesta
+
+    @staticmethod
+    def iniciar_sesion(db: Session, uuid_sesion: uuid.UUID) -> SesionEmisionResponse:
+        """
+        Encolar la sesión (una sola vez) para que el planificador la renderice
+
+        Sin prioridad explícita, una ruta chica (reimpresiones, hasta
+        EMISION_TRABAJO_CHICO cuentas) va con prioridad alta para no esperar
+        detrás de una emisión grande.
+        """
+
+        actualizadas = db.query(SesionEmision).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                SesionEmision.estado == "INICIADA"
+            )
+        ).update({
+            SesionEmision.estado: "EN_COLA",
+            SesionEmision.prioridad: func.coalesce(
+                SesionEmision.prioridad,
+                EmisionService._prioridad_automatica(db, uuid_sesion)
+            )
+        }, synchronize_session=False)
+        if actualizadas:
+            EmisionService._notificar_progreso(db, uuid_sesion)
+        db.commit()
+
+        if not actualizadas:
+            sesion = EmisionService.get_sesion(db, uuid_sesion)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La sesión ya fue iniciada (estado: {sesion.estado})"
+            )
+
+        return EmisionService.get_sesion(db, uuid_sesion)
+
+    @staticmethod
+    def _prioridad_automatica(db: Session, uuid_sesion: uuid.UUID) -> int:
+        """Alta si la sesión tiene una ruta chica; normal con ruta grande o padrón completo"""
+        cuentas = db.execute(
+            text("""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM emision_temp WHERE uuid_sesion = :uuid_sesion LIMIT :limite
+                ) ruta
+            """),
+            {"uuid_sesion": str(uuid_sesion), "limite": settings.EMISION_TRABAJO_CHICO + 1}
+        ).scalar()
+        if 0 < cuentas <= settings.EMISION_TRABAJO_CHICO:
+            return EmisionService.PRIORIDAD_ALTA
+        return EmisionService.PRIORIDAD_NORMAL
+
+    @staticmethod
+    def cancelar_sesion(
+        db: Session,
+        uuid_sesion: uuid.UUID,
+        usuario: Usuario,
+        ip_address: Optional[str] = None
+    ) -> SesionEmisionResponse:
+        """
+        Cancelar una sesión
+
+        Si está en cola, aún no se iniciaba o nadie la renderiza (lease
+        vencido) se cierra de inmediato; si está procesando, el renderizado se
+        detiene en el siguiente checkpoint y libera el proyecto. Con workers
+        externos se cierra cuando terminan los bloques que ya tenían
+        reclamados (_completar_si_terminada). Lo ya guardado se conserva y
+        la sesión se puede reanudar.
+        """
+
+        inmediata = db.query(SesionEmision).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                or_(
+                    SesionEmision.estado.in_(("INICIADA", "EN_COLA")),
+                    and_(
+                        SesionEmision.estado == "PROCESANDO",
+                        or_(
+                            SesionEmision.lease_expira.is_(None),
+                            SesionEmision.lease_expira <= func.now()
+                        )
+                    )
+                )
+            )
+        ).update({SesionEmision.estado: "CANCELADA"}, synchronize_session=False)
+        procesando = 0 if inmediata else db.query(SesionEmision).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                SesionEmision.estado == "PROCESANDO"
+            )
+        ).update({SesionEmision.estado: "CANCELADA"}, synchronize_session=False)
+        if inmediata or procesando:
+            EmisionService._notificar_progreso(db, uuid_sesion)
+        db.commit()
+
+        if not inmediata and not procesando:
+            # Cancelada antes por un proceso que murió sin cerrarla: se cierra ahora
+            EmisionService._cerrar_canceladas(db, uuid_sesion)
+            sesion = EmisionService.get_sesion(db, uuid_sesion)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La sesión no se puede cancelar (estado: {sesion.estado})"
+            )
+
+        if settings.EMISION_WORKERS_EXTERNOS:
+            # Si ningún worker tiene un bloque en curso se cierra ya; si no, la cierra el último
+            EmisionService._completar_si_terminada(db, uuid_sesion)
+        elif inmediata:
+            sesion = db.query(SesionEmision).filter(
+                SesionEmision.uuid_sesion == uuid_sesion
+            ).first()
+            EmisionService._finalizar_sesion(db, sesion, "CANCELADA", desde=("CANCELADA",))
+
+        BitacoraService.registrar(
+            db=db,
+            uuid_usuario=usuario.uuid_usuario,
+            accion="CANCELAR_EMISION",
+            entidad="SESION_EMISION",
+            entidad_id=str(uuid_sesion),
+            ip_address=ip_address
+        )
+
+        return EmisionService.get_sesion(db, uuid_sesion)
+
+    @staticmethod
+    def reanudar_sesion(
+        db: Session,
+        uuid_sesion: uuid.UUID,
+        usuario: Usuario,
+        ip_address: Optional[str] = None
+    ) -> SesionEmisionResponse:
+        """
+        Volver a encolar una sesión cancelada o con error
+
+        Solo cuando el renderizado anterior ya terminó (tiempo_fin). Los
+        registros que fallaron vuelven a quedar pendientes; los que llegaron
+        a un checkpoint no se vuelven a generar. El planificador la retoma
+        respetando la cuota de sesiones simultáneas del proyecto.
+
+        tiempo_inicio se reinicia y duracion_segundos conserva lo acumulado
+        en las corridas anteriores, así el tiempo en pausa no se cuenta.
+
+        Si se canceló y el proceso que la renderizaba murió antes de cerrarla
+        (lease vencido), primero se cierra.
+        """
+
+        EmisionService._cerrar_canceladas(db, uuid_sesion)
+        sesion = db.query(SesionEmision).filter(
+            SesionEmision.uuid_sesion == uuid_sesion
+        ).first()
+
+        if not sesion:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Sesión de emisión no encontrada"
+            )
+
+        actualizadas = db.query(SesionEmision).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                SesionEmision.estado.in_(("ERROR", "CANCELADA")),
+                SesionEmision.tiempo_fin.isnot(None)
+            )
+        ).update({
+            SesionEmision.estado: "EN_COLA",
+            SesionEmision.tiempo_inicio: func.now(),
+            SesionEmision.tiempo_fin: None
+        }, synchronize_session=False)
+
+        if not actualizadas:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La sesión no se puede reanudar (estado: {sesion.estado})"
+            )
+
+        # Los registros con error se vuelven a intentar
+        reintentos = db.execute(
+            text("""
+                UPDATE emision_temp
+                SET procesado = FALSE, tiene_error = FALSE, mensaje_error = NULL
+                WHERE uuid_sesion = :uuid_sesion AND tiene_error
+            """),
+            {"uuid_sesion": str(uuid_sesion)}
+        ).rowcount
+        if reintentos:
+            db.query(SesionEmision).filter(
+                SesionEmision.uuid_sesion == uuid_sesion
+            ).update({
+                SesionEmision.registros_procesados: SesionEmision.registros_procesados - reintentos,
+                SesionEmision.registros_con_error: SesionEmision.registros_con_error - reintentos
+            }, synchronize_session=False)
+
+        EmisionService._notificar_progreso(db, uuid_sesion)
+        db.commit()
+
+        # El último evento del canal sería el de la cancelación; la velocidad se vuelve a medir
+        db.refresh(sesion)
+        EmisionService._publicar_progreso(sesion)
+
+        BitacoraService.registrar(
+            db=db,
+            uuid_usuario=usuario.uuid_usuario,
+            accion="REANUDAR_EMISION",
+            entidad="SESION_EMISION",
+            entidad_id=str(uuid_sesion),
+            detalles={"reintentos": reintentos},
+            ip_address=ip_address
+        )
+
+        return EmisionService.get_sesion(db, uuid_sesion)
+
+    @staticmethod
+    def procesar_sesion(uuid_sesion: uuid.UUID, propietario: Optional[str] = None) -> None:
+        """
+        Renderizar todos los registros pendientes de la sesión
+
+        La lanza el planificador (app.services.planificador) después de
+        tomar el lease de la sesión a nombre de `propietario`; si en un
+        checkpoint el lease ya es de otro proceso, se detiene sin cerrarla.
+
+        Se ejecuta en segundo plano con su propia sesión de BD. Si la sesión
+        tiene ruta cargada (emision_temp) se emiten esas cuentas en orden de
+        ruta; si no, primero se pasa todo el padrón del proyecto a emision_temp.
+        Después se asignan pmo, visita, codebar y orden de impresión en bloque
+        y los registros se leen en streaming con un cursor del servidor y se
+        entregan al pool de procesos con un número acotado de envíos en
+        vuelo, así la memoria no crece con el tamaño del padrón.
+
+        Cada EMISION_LOTE_PROGRESO registros se hace un checkpoint: documentos,
+        marcas de procesado en emision_temp y contadores en un solo commit. Al
+        reanudar (reanudar_sesion) solo se leen los registros sin checkpoint,
+        con el mismo codebar, orden y archivo. Si la sesión se cancela, se
+        detiene en el siguiente checkpoint. Al terminar se arman los
+        volúmenes de impresión (app.services.volumenes).
+
+        Con EMISION_WORKERS_EXTERNOS solo se prepara la sesión y el lease se
+        pasa a PROPIETARIO_WORKERS; el renderizado lo hacen los procesos de
+        app.workers.emision, que renuevan el lease mientras estén vivos.
+        """
+        db = SessionLocal()
+        try:
+            contexto = EmisionService._contexto(db, uuid_sesion)
+            if not contexto:
+                return
+            sesion, plantilla, definicion = contexto
+            tabla_nombre, columna_cuenta = definicion.tabla, definicion.columna_cuenta
+
+            EmisionService._publicar_progreso(sesion)
+
+            con_ruta = db.query(EmisionTemp.id_temp).filter(
+                EmisionTemp.uuid_sesion == sesion.uuid_sesion
+            ).first() is not None
+            if not con_ruta:
+                EmisionService._preparar_padron_completo(db, sesion, plantilla, definicion)
+
+            if EmisionService._sin_asignar(db, sesion.uuid_sesion):
+                # Al reanudar ya están asignados (se guardan en una sola transacción)
+                sesion.total_registros = EmisionService._asignar_visitas(db, sesion)
+                EmisionService._notificar_progreso(db, sesion.uuid_sesion)
+                db.commit()
+            EmisionService._publicar_progreso(sesion)
+
+            if settings.EMISION_WORKERS_EXTERNOS:
+                # La sesión queda lista; los workers (app.workers.emision) la renderizan
+                filtro = [SesionEmision.uuid_sesion == sesion.uuid_sesion]
+                if propietario:
+                    filtro.append(SesionEmision.lease_owner == propietario)
+                entregada = db.query(SesionEmision).filter(and_(*filtro)).update({
+                    SesionEmision.lease_owner: EmisionService.PROPIETARIO_WORKERS,
+                    SesionEmision.lease_expira: func.now() + timedelta(seconds=settings.EMISION_LEASE_SEG)
+                }, synchronize_session=False)
+                db.commit()
+                if not entregada:
+                    raise LeasePerdido()
+                return
+
+            os.makedirs(sesion.ruta_salida, exist_ok=True)
+
+            workers = settings.EMISION_WORKERS or os.cpu_count()
+            max_en_vuelo = workers * 2
+            por_envio = settings.EMISION_TAREAS_POR_ENVIO
+            en_vuelo = set()
+            pendientes: List[Dict[str, Any]] = []
+
+            def _recoger(terminados) -> None:
+                nonlocal pendientes
+                for futuro in terminados:
+                    pendientes.extend(futuro.result())
+                if len(pendientes) >= settings.EMISION_LOTE_PROGRESO:
+                    EmisionService._guardar_resultados(db, sesion, plantilla, pendientes, propietario)
+                    EmisionService._publicar_progreso(sesion)
+                    pendientes = []
+                    if sesion.estado == "CANCELADA":
+                        raise EmisionCancelada()
+
+            lector = LectorPadron(
+                tabla_nombre,
+                sesion.uuid_sesion,
+                tamano_lote=settings.EMISION_LOTE_LECTURA
+            )
+
+            with lector:
+                # spawn: no heredar el estado del proceso de la API (hilos, conexiones abiertas)
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=render_service.inicializar_worker,
+                    initargs=(
+                        str(plantilla.uuid_plantilla),
+                        plantilla.version,
+                        plantilla.canvas_config,
+                        float(plantilla.ancho_canvas),
+                        float(plantilla.alto_canvas),
+                        lector.columnas,
+                        EmisionService._constantes(sesion)
+                    )
+                ) as pool:
+                    posiciones = EmisionService._posiciones(lector.indice, columna_cuenta)
+
+                    for lote in lector.lotes_anticipados(settings.EMISION_COLA_LOTES):
+                        tareas = [
+                            EmisionService._crear_tarea(sesion, fila, posiciones)
+                            for fila in lote
+                        ]
+
+                        for inicio in range(0, len(tareas), por_envio):
+                            # Backpressure: no enviar más hasta que termine algún envío
+                            while len(en_vuelo) >= max_en_vuelo:
+                                terminados, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                                _recoger(terminados)
+
+                            en_vuelo.add(pool.submit(
+                                render_service.renderizar_lote,
+                                tareas[inicio:inicio + por_envio]
+                            ))
+
+                    while en_vuelo:
+                        terminados, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                        _recoger(terminados)
+
+            EmisionService._guardar_resultados(db, sesion, plantilla, pendientes, propietario)
+
+            # Cancelada después del último checkpoint (o sesión más chica que un lote): sin volúmenes
+            db.refresh(sesion)
+            if sesion.estado == "CANCELADA":
+                raise EmisionCancelada()
+            EmisionService._generar_volumenes(sesion, plantilla, definicion)
+            if not EmisionService._finalizar_sesion(db, sesion, "COMPLETADA", propietario=propietario):
+                # Se canceló mientras se armaban los volúmenes (o se perdió el lease)
+                raise EmisionCancelada()
+
+        except EmisionCancelada:
+            if not EmisionService._finalizar_sesion(
+                db, sesion, "CANCELADA", desde=("CANCELADA",), propietario=propietario
+            ):
+                canal_progreso.olvidar(uuid_sesion)
+
+        except LeasePerdido:
+            # La sesión sigue en manos del proceso que la retomó; su avance ya no se mide aquí
+            canal_progreso.olvidar(uuid_sesion)
+
+        except Exception:
+            db.rollback()
+            sesion = db.query(SesionEmision).filter(
+                SesionEmision.uuid_sesion == uuid_sesion
+            ).first()
+            if sesion and not EmisionService._finalizar_sesion(
+                db, sesion, "ERROR", desde=("PROCESANDO", "CANCELADA"), propietario=propietario
+            ):
+                # Como LeasePerdido: otro proceso ya la retomó, no se le marca el error
+                canal_progreso.olvidar(uuid_sesion)
+                logger.warning(
+                    "Error al procesar la sesión %s después de perder su lease", uuid_sesion, exc_info=True
+                )
+                return
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _contexto(
+        db: Session,
+        uuid_sesion: uuid.UUID
+    ) -> Optional[Tuple[SesionEmision, Plantilla, DefinicionPadron]]:
+        """Sesión, plantilla y definición del padrón (None si la sesión no existe)"""
+        sesion = db.query(SesionEmision).filter(
+            SesionEmision.uuid_sesion == uuid_sesion
+        ).first()
+        if not sesion:
+            return None
+
+        plantilla = db.query(Plantilla).filter(
+            Plantilla.uuid_plantilla == sesion.uuid_plantilla
+        ).first()
+        padron = db.query(IdentificadorPadron).filter(
+            IdentificadorPadron.uuid_padron == plantilla.uuid_padron
+        ).first()
+
+        return sesion, plantilla, EmisionService._definicion(padron)
+
+    @staticmethod
+    def _constantes(sesion: SesionEmision) -> Dict[str, Any]:
+        """Campos de control iguales para toda la sesión"""
+        return {
+            "pmo": sesion.pmo_inicial,
+            "fecha_emision": sesion.fecha_emision,
+            "tipo_documento": sesion.tipo_documento
+        }
+
+    @staticmethod
+    def _posiciones(indice: Dict[str, int], columna_cuenta: str) -> Tuple[int, int, int, int, int]:
+        """Posiciones en la fila leída de cuenta, codebar, visita, folio y orden (para _crear_tarea)"""
+        return (
+            indice[columna_cuenta],
+            indice["codebar_asignado"],
+            indice["visita_asignada"],
+            indice["folio_asignado"],
+            indice["orden_impresion"]
+        )
+
+    @staticmethod
+    def _definicion(padron: Optional[IdentificadorPadron]) -> DefinicionPadron:
+        """Definición del padrón desde el registro"""
+        definicion = padron_registry.obtener(padron.nombre_padron) if padron else None
+        if not definicion:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al mapear padrón"
+            )
+        return definicion
+
+    @staticmethod
+    def _expresion_datos_padron(definicion: DefinicionPadron) -> str:
+        """Expresión SQL que arma datos_padron de la fila p (con su detalle, si el padrón lo tiene)"""
+        detalle = definicion.detalle
+        if not detalle:
+            return "to_jsonb(p) - 'uuid_proyecto'"
+
+        orden_detalle = ", ".join(detalle.orden) or "id_detalle"
+        return f"""
+            to_jsonb(p) - 'uuid_proyecto' || jsonb_build_object('detalle', COALESCE((
+                SELECT jsonb_agg(to_jsonb(d) - 'uuid_padron' - 'id_detalle' ORDER BY {orden_detalle})
+                FROM {detalle.tabla} d
+                WHERE d.uuid_padron = p.uuid_padron
+            ), '[]'::jsonb))
+        """
+
+    @staticmethod
+    def _preparar_padron_completo(
+        db: Session,
+        sesion: SesionEmision,
+        plantilla: Plantilla,
+        definicion: DefinicionPadron
+    ) -> None:
+        """Sesión sin ruta: pasar todo el padrón del proyecto a emision_temp, ordenado por cuenta"""
+        tabla_nombre, columna_cuenta = definicion.tabla, definicion.columna_cuenta
+        datos_padron = EmisionService._expresion_datos_padron(definicion)
+
+        db.execute(
+            text(f"""
+                INSERT INTO emision_temp (
+                    uuid_sesion, uuid_padron, uuid_plantilla, uuid_proyecto,
+                    cuenta, orden_ruta, datos_padron
+                )
+                SELECT CAST(:uuid_sesion AS UUID), CAST(:uuid_padron AS UUID),
+                       CAST(:uuid_plantilla AS UUID), p.uuid_proyecto,
+                       p.{columna_cuenta},
+                       ROW_NUMBER() OVER (ORDER BY p.{columna_cuenta}),
+                       {datos_padron}
+                FROM {tabla_nombre} p
+                WHERE p.uuid_proyecto = :uuid_proyecto
+            """),
+            {
+                "uuid_sesion": str(sesion.uuid_sesion),
+                "uuid_padron": str(plantilla.uuid_padron),
+                "uuid_plantilla": str(plantilla.uuid_plantilla),
+                "uuid_proyecto": str(sesion.uuid_proyecto)
+            }
+        )
+        db.commit()
+
+    @staticmethod
+    def _sin_asignar(db: Session, uuid_sesion: uuid.UUID) -> bool:
+        """
+        Si la sesión tiene registros sin codebar (falta _asignar_visitas)
+
+        No se decide por total_registros: cargar_ruta ya lo llena antes de
+        asignar visitas y folios.
+        """
+        return db.execute(
+            text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM emision_temp
+                    WHERE uuid_sesion = :uuid_sesion AND codebar IS NULL
+                )
+            """),
+            {"uuid_sesion": str(uuid_sesion)}
+        ).scalar()
+
+    @staticmethod
+    def _asignar_visitas(db: Session, sesion: SesionEmision) -> int:
+        """
+        Asignar pmo, visita, folio, codebar y orden de impresión a todas las cuentas de la sesión
+
+        Sustituye llamar calcular_siguiente_visita / generar_codebar por cuenta:
+        la última visita de todas las cuentas sale de una sola consulta
+        agrupada (índice uuid_proyecto, cuenta, visita), los folios se reservan
+        por bloques de la secuencia, y todo se escribe con COPY + un solo
+        UPDATE. La visita nunca es menor que visita_inicial. Devuelve el
+        número de registros.
+        """
+        parametros = {
+            "uuid_sesion": str(sesion.uuid_sesion),
+            "uuid_proyecto": str(sesion.uuid_proyecto)
+        }
+
+        ultimas = dict(db.execute(
+            text("""
+                SELECT ea.cuenta, MAX(ea.visita)
+                FROM emision_acumulada ea
+                WHERE ea.uuid_proyecto = :uuid_proyecto
+                AND ea.cuenta IN (
+                    SELECT cuenta FROM emision_temp WHERE uuid_sesion = :uuid_sesion
+                )
+                GROUP BY ea.cuenta
+            """),
+            parametros
+        ).fetchall())
+
+        total = 0
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.execute("""
+                CREATE TEMP TABLE asignacion_emision (
+                    id_temp INTEGER PRIMARY KEY,
+                    orden_impresion INTEGER NOT NULL,
+                    visita INTEGER NOT NULL,
+                    folio VARCHAR(100) NOT NULL,
+                    codebar VARCHAR(255) NOT NULL
+                ) ON COMMIT DROP
+            """)
+
+            registros = db.connection().execution_options(stream_results=True).execute(
+                text("""
+                    SELECT id_temp, cuenta FROM emision_temp
+                    WHERE uuid_sesion = :uuid_sesion
+                    ORDER BY orden_ruta, id_temp
+                """),
+                parametros
+            )
+            for particion in registros.partitions(settings.EMISION_LOTE_LECTURA):
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer)
+                folios = asignador_folios.tomar(len(particion))
+                for (id_temp, cuenta), folio in zip(particion, folios):
+                    visita = max((ultimas.get(cuenta) or 0) + 1, sesion.visita_inicial)
+                    total += 1
+                    escritor.writerow((
+                        id_temp,
+                        total,
+                        visita,
+                        formatear_folio(folio),
+                        formatear_codebar(cuenta, folio, sesion.tipo_documento, visita)
+                    ))
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY asignacion_emision (id_temp, orden_impresion, visita, folio, codebar) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        finally:
+            cursor.close()
+
+        db.execute(
+            text("""
+                UPDATE emision_temp t
+                SET pmo = :pmo, visita = a.visita, folio = a.folio, codebar = a.codebar,
+                    orden_impresion = a.orden_impresion
+                FROM asignacion_emision a
+                WHERE t.id_temp = a.id_temp
+            """),
+            {"pmo": sesion.pmo_inicial}
+        )
+
+        return total
+
+    @staticmethod
+    def _crear_tarea(sesion: SesionEmision, fila: tuple, posiciones: Tuple[int, int, int, int, int]) -> tuple:
+        """
+        Preparar la tarea compacta de un registro para el worker
+
+        (orden_impresion, cuenta, codebar, visita, folio, ruta_pdf, fila); el
+        worker resuelve los nombres de columna con el índice recibido en su
+        inicializador. Todo sale de la fila, así una sesión reanudada genera
+        el mismo archivo para el mismo registro.
+        """
+        posicion_cuenta, posicion_codebar, posicion_visita, posicion_folio, posicion_orden = posiciones
+        cuenta = str(fila[posicion_cuenta])
+        orden = fila[posicion_orden]
+
+        cuenta_archivo = re.sub(r"[^\w.-]", "_", cuenta)
+        nombre_archivo = f"{orden:06d}_{cuenta_archivo}.pdf"
+
+        return (
+            orden,
+            cuenta,
+            fila[posicion_codebar],
+            fila[posicion_visita],
+            fila[posicion_folio],
+            os.path.join(sesion.ruta_salida, nombre_archivo),
+            fila
+        )
+
+    @staticmethod
+    def _guardar_resultados(
+        db: Session,
+        sesion: SesionEmision,
+        plantilla: Plantilla,
+        resultados: List[Dict[str, Any]],
+        propietario: Optional[str] = None
+    ) -> None:
+        """
+        Checkpoint de un lote: documentos, marcas en emision_temp y contadores
+
+        Todo va en un solo commit. Los documentos se insertan con ON CONFLICT
+        (codebar) DO NOTHING, así repetir un lote (p. ej. renderizado de nuevo
+        tras una caída antes del commit) nunca duplica registros.
+
+        Con `propietario`, si el lease ya es de otro se deshace el lote y se
+        lanza LeasePerdido.
+        """
+        if not resultados:
+            return
+
+        fecha_generacion = datetime.utcnow()
+        exitosos = [r for r in resultados if r["exitoso"]]
+
+        if exitosos:
+            finales, acumulados = [], []
+            for r in exitosos:
+                comunes = {
+                    "uuid_sesion": sesion.uuid_sesion,
+                    "codebar": r["codebar"],
+                    "folio": r["folio"],
+                    "uuid_padron": plantilla.uuid_padron,
+                    "uuid_plantilla": plantilla.uuid_plantilla,
+                    "uuid_proyecto": sesion.uuid_proyecto,
+                    "tipo_documento": sesion.tipo_documento,
+                    "cuenta": r["cuenta"],
+                    "fecha_emision": sesion.fecha_emision,
+                    "pmo": sesion.pmo_inicial,
+                    "visita": r["visita"],
+                    "orden_impresion": r["orden_impresion"]
+                }
+                finales.append(comunes)
+                acumulados.append({
+                    **comunes,
+                    "uuid_usuario": sesion.uuid_usuario,
+                    "ruta_pdf": r["ruta_pdf"],
+                    "nombre_archivo_pdf": os.path.basename(r["ruta_pdf"]),
+                    "fecha_generacion": fecha_generacion,
+                    "tiempo_procesamiento_ms": r["tiempo_ms"]
+                })
+
+            db.execute(
+                pg_insert(EmisionFinal).on_conflict_do_nothing(index_elements=["codebar"]),
+                finales
+            )
+            db.execute(
+                pg_insert(EmisionAcumulada).on_conflict_do_nothing(index_elements=["codebar"]),
+                acumulados
+            )
+
+        db.execute(
+            text("""
+                UPDATE emision_temp t
+                SET procesado = TRUE, tiene_error = NOT r.exitoso, mensaje_error = r.mensaje
+                FROM unnest(
+                    CAST(:codebars AS VARCHAR[]),
+                    CAST(:exitosos AS BOOLEAN[]),
+                    CAST(:mensajes AS TEXT[])
+                ) AS r(codebar, exitoso, mensaje)
+                WHERE t.uuid_sesion = :uuid_sesion
+                AND t.codebar = r.codebar
+            """),
+            {
+                "uuid_sesion": str(sesion.uuid_sesion),
+                "codebars": [r["codebar"] for r in resultados],
+                "exitosos": [r["exitoso"] for r in resultados],
+                "mensajes": [r["mensaje_error"] for r in resultados]
+            }
+        )
+
+        # Incrementos en SQL: varios workers guardan lotes de la misma sesión.
+        # Cada checkpoint renueva además el lease (latido).
+        filtro = [SesionEmision.uuid_sesion == sesion.uuid_sesion]
+        if propietario:
+            filtro.append(SesionEmision.lease_owner == propietario)
+        actualizada = db.query(SesionEmision).filter(and_(*filtro)).update({
+            SesionEmision.lease_expira: func.now() + timedelta(seconds=settings.EMISION_LEASE_SEG),
+            SesionEmision.registros_procesados: SesionEmision.registros_procesados + len(resultados),
+            SesionEmision.registros_exitosos: SesionEmision.registros_exitosos + len(exitosos),
+            SesionEmision.registros_con_error: (
+                SesionEmision.registros_con_error + len(resultados) - len(exitosos)
+            )
+        }, synchronize_session=False)
+        if not actualizada:
+            db.rollback()
+            raise LeasePerdido()
+        EmisionService._notificar_progreso(db, sesion.uuid_sesion)
+        db.commit()
+
+    @staticmethod
+    def _generar_volumenes(sesion: SesionEmision, plantilla: Plantilla, definicion: DefinicionPadron) -> None:
+        """
+        Volúmenes de impresión en orden de ruta (app.services.volumenes)
+
+        Un error aquí no invalida los documentos ya generados: se registra
+        en el log y la sesión se completa igual.
+        """
+        try:
+            volumenes = generar_volumenes(
+                sesion.uuid_sesion,
+                sesion.ruta_salida,
+                plan_de_plantilla(plantilla),
+                definicion.tabla,
+                definicion.columna_cuenta,
+                EmisionService._constantes(sesion)
+            )
+            logger.info("Sesión %s: %d volúmenes de impresión", sesion.uuid_sesion, len(volumenes))
+        except Exception:
+            logger.exception("No se pudieron generar los volúmenes de la sesión %s", sesion.uuid_sesion)
+
+    @staticmethod
+    def _finalizar_sesion(
+        db: Session,
+        sesion: SesionEmision,
+        estado: str,
+        desde: Tuple[str, ...] = ("PROCESANDO",),
+        propietario: Optional[str] = None
+    ) -> bool:
+        """
+        Cerrar la sesión y liberar el proyecto (se suelta el lease)
+
+        El cambio es condicional: solo si sigue en uno de los estados `desde`,
+        sin tiempo_fin y, con `propietario`, con el lease a su nombre; así
+        nunca pisa una cancelación ni el cierre de otro proceso. Devuelve si
+        la cerró.
+
+        La duración se suma a la de las corridas anteriores (reanudar_sesion
+        reinicia tiempo_inicio).
+        """
+        valores = {
+            SesionEmision.estado: estado,
+            SesionEmision.tiempo_fin: func.now(),
+            SesionEmision.lease_owner: None,
+            SesionEmision.lease_expira: None
+        }
+        if sesion.tiempo_inicio:
+            # En SQL: now() - tiempo_inicio no depende de la zona horaria de la conexión
+            valores[SesionEmision.duracion_segundos] = func.coalesce(SesionEmision.duracion_segundos, 0) + cast(
+                func.extract("epoch", func.now() - SesionEmision.tiempo_inicio), Integer
+            )
+
+        filtro = [
+            SesionEmision.uuid_sesion == sesion.uuid_sesion,
+            SesionEmision.estado.in_(desde),
+            SesionEmision.tiempo_fin.is_(None)
+        ]
+        if propietario:
+            filtro.append(SesionEmision.lease_owner == propietario)
+        cerrada = db.query(SesionEmision).filter(and_(*filtro)).update(valores, synchronize_session=False)
+        if cerrada:
+            EmisionService._notificar_progreso(db, sesion.uuid_sesion)
+        db.commit()
+
+        if not cerrada:
+            return False
+        db.refresh(sesion)
+        EmisionService._publicar_progreso(sesion)
+        return True
+
+    @staticmethod
+    def _publicar_progreso(sesion: SesionEmision) -> None:
+        """Avisar el avance a los websockets de este proceso suscritos a la sesión"""
+        canal_progreso.publicar(
+            sesion.uuid_sesion,
+            ProgresoEmision.model_validate(sesion).model_dump(
+                mode="json", exclude={"registros_por_segundo", "eta_segundos", "momento"}
+            )
+        )
+
+    @staticmethod
+    def _notificar_progreso(db: Session, uuid_sesion: uuid.UUID) -> None:
+        """
+        Avisar el cambio de la sesión a todos los procesos de la API (NOTIFY, se entrega al hacer commit)
+
+        Cada proceso lo recibe con escucha_progreso y lo pasa a su
+        canal_progreso, así el websocket recibe el avance aunque la emisión
+        corra en otra réplica o en un worker externo.
+        """
+        db.execute(
+            text("SELECT pg_notify(:canal, :uuid_sesion)"),
+            {"canal": CANAL_NOTIFY, "uuid_sesion": str(uuid_sesion)}
+        )
+
+    @staticmethod
+    def _bloque_en_curso(db: Session, uuid_sesion: uuid.UUID) -> None:
+        """
+        Marcar que este worker tiene un bloque de la sesión sin guardar
+
+        Candado compartido de transacción: se suelta con el commit (o
+        rollback) del bloque. Se toma antes de reclamar las filas, así una
+        cancelación no se cierra mientras haya un bloque reclamado en curso.
+        """
+        db.execute(
+            text("SELECT pg_advisory_xact_lock_shared(hashtext('emision_bloque'), hashtext(:uuid_sesion))"),
+            {"uuid_sesion": str(uuid_sesion)}
+        )
+
+    @staticmethod
+    def _cerrar_canceladas(db: Session, uuid_sesion: Optional[uuid.UUID] = None) -> int:
+        """
+        Cerrar las sesiones canceladas que nadie va a cerrar
+
+        Al cancelar una sesión que se está renderizando la cierra su proceso
+        en el siguiente checkpoint; si ese proceso muere antes, la sesión
+        queda CANCELADA sin tiempo_fin y no se podría reanudar. Con el lease
+        vencido se cierra aquí (con workers externos, cuando ya no hay
+        bloques en curso). Lo llama el planificador en cada latido.
+        """
+        filtro = [
+            SesionEmision.estado == "CANCELADA",
+            SesionEmision.tiempo_fin.is_(None),
+            or_(SesionEmision.lease_expira.is_(None), SesionEmision.lease_expira <= func.now())
+        ]
+        if uuid_sesion is not None:
+            filtro.append(SesionEmision.uuid_sesion == uuid_sesion)
+        huerfanas = [fila[0] for fila in db.query(SesionEmision.uuid_sesion).filter(and_(*filtro)).all()]
+        db.commit()
+
+        cerradas = 0
+        for huerfana in huerfanas:
+            if EmisionService._completar_si_terminada(db, huerfana):
+                logger.info("Sesión cancelada %s cerrada tras perder su proceso", huerfana)
+                cerradas += 1
+        return cerradas
+
+    @staticmethod
+    def _completar_si_terminada(db: Session, uuid_sesion: uuid.UUID) -> bool:
+        """
+        Cerrar la sesión si ya no le quedan registros pendientes
+
+        Lo llaman los workers después de cada bloque. Las filas que otro
+        worker tiene reclamadas siguen pendientes, así que la cierra el
+        último en hacer commit; el cambio de estado es atómico y solo un
+        worker la finaliza.
+
+        Una sesión cancelada se cierra cuando ningún worker tiene un bloque
+        suyo en curso (_bloque_en_curso); si el candado exclusivo no se
+        obtiene, la cierra el worker que guarde el último bloque.
+        """
+        cancelada = db.query(SesionEmision.uuid_sesion).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                SesionEmision.estado == "CANCELADA",
+                SesionEmision.tiempo_fin.is_(None)
+            )
+        ).first() is not None
+        if cancelada:
+            libre = db.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext('emision_bloque'), hashtext(:uuid_sesion))"),
+                {"uuid_sesion": str(uuid_sesion)}
+            ).scalar()
+            if not libre:
+                db.commit()
+                return False
+
+            # El candado se suelta con el commit del cierre (condicional: solo un proceso la cierra)
+            sesion = db.query(SesionEmision).filter(SesionEmision.uuid_sesion == uuid_sesion).first()
+            return EmisionService._finalizar_sesion(db, sesion, "CANCELADA", desde=("CANCELADA",))
+
+        pendientes = db.execute(
+            text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM emision_temp
+                    WHERE uuid_sesion = :uuid_sesion AND procesado = FALSE
+                )
+            """),
+            {"uuid_sesion": str(uuid_sesion)}
+        ).scalar()
+        if pendientes:
+            db.commit()
+            return False
+
+        ganada = db.query(SesionEmision).filter(
+            and_(
+                SesionEmision.uuid_sesion == uuid_sesion,
+                SesionEmision.estado == "PROCESANDO"
+            )
+        ).update({SesionEmision.estado: "COMPLETADA"}, synchronize_session=False)
+        db.commit()
+        if not ganada:
+            return False
+
+        sesion, plantilla, definicion = EmisionService._contexto(db, uuid_sesion)
+        EmisionService._generar_volumenes(sesion, plantilla, definicion)
+        return EmisionService._finalizar_sesion(db, sesion, "COMPLETADA", desde=("COMPLETADA",))
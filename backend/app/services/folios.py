@@ -0,0 +1,75 @@
+"""
+Folios y códigos de barras únicos a partir de una secuencia de PostgreSQL
+
+El codebar anterior usaba los segundos de la época como parte única, así que
+dos documentos de la misma cuenta/visita generados en el mismo segundo (p. ej.
+por workers en paralelo) chocaban en emision_final.codebar. Aquí la parte única
+es un folio tomado de la secuencia emision_folio_seq: nextval no es
+transaccional y nunca repite, sin importar proceso ni servidor. Cada asignador
+reserva bloques de folios en un solo viaje a la BD.
+
+La prueba de estrés con varios procesos en paralelo está en tests/test_folios.py.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from collections import deque
+from typing import Deque, List
+import threading
+
+from app.core.database import engine
+from app.core.config import settings
+
+# Dígitos del folio dentro del codebar (mismo ancho que el timestamp anterior)
+DIGITOS_FOLIO = 10
+
+
+def formatear_folio(folio: int) -> str:
+    return f"{folio:0{DIGITOS_FOLIO}d}"
+
+
+def formatear_codebar(cuenta: str, folio: int, tipo_documento: str, visita: int) -> str:
+    """Misma forma que generar_codebar de la BD, con el folio en lugar del timestamp"""
+    return f"*{cuenta}{formatear_folio(folio)}{tipo_documento}{visita}*"
+
+
+class AsignadorFolios:
+    """
+    Entrega folios únicos reservando bloques de la secuencia
+
+    Una instancia por proceso (o por worker). Los folios de un bloque que no
+    se usen se pierden; eso solo deja huecos, nunca duplicados.
+    """
+
+    def __init__(self, engine: Engine, tamano_bloque: int = 1000):
+        self.engine = engine
+        self.tamano_bloque = tamano_bloque
+        self._disponibles: Deque[int] = deque()
+        self._lock = threading.Lock()
+
+    def _reservar(self, cantidad: int) -> List[int]:
+        with self.engine.connect() as conexion:
+            return [
+                fila[0] for fila in conexion.execute(
+                    text("SELECT nextval('emision_folio_seq') FROM generate_series(1, :cantidad)"),
+                    {"cantidad": cantidad}
+                )
+            ]
+
+    def siguiente(self) -> int:
+        with self._lock:
+            if not self._disponibles:
+                self._disponibles.extend(self._reservar(self.tamano_bloque))
+            return self._disponibles.popleft()
+
+    def tomar(self, cantidad: int) -> List[int]:
+        """Varios folios de una vez (rellena con bloques completos si hace falta)"""
+        with self._lock:
+            faltan = cantidad - len(self._disponibles)
+            if faltan > 0:
+                bloques = -(-faltan // self.tamano_bloque)
+                self._disponibles.extend(self._reservar(bloques * self.tamano_bloque))
+            return [self._disponibles.popleft() for _ in range(cantidad)]
+
+
+asignador_folios = AsignadorFolios(engine, settings.FOLIOS_BLOQUE)
+
@@ -0,0 +1,161 @@
+"""
+Fuentes TrueType y medidas de texto para el renderizado
+
+Las familias del editor (Calibri, Arial, ...) se buscan como archivos .ttf en
+FUENTES_DIR, nombrados <Familia>[-Regular|-Bold|-Italic|-BoldItalic].ttf.
+Cada variante se registra en reportlab una sola vez por proceso, la primera
+vez que una plantilla la usa; sin archivo se usa la familia estándar de PDF
+equivalente (ver plantilla_compiler.resolver_fuente). reportlab incrusta de
+cada TTF solo los glifos usados en cada archivo (subconjunto por documento).
+
+Las medidas (ancho de texto y partición en líneas) se memorizan por
+(texto, fuente, tamaño): valores del padrón como colonia o municipio se
+repiten en muchos registros y se miden una sola vez por proceso.
+"""
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import glob
+import logging
+import os
+import threading
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sufijo del archivo -> variante (0 normal, 1 negrita, 2 itálica, 3 negrita+itálica)
+VARIANTES = {
+    "": 0, "regular": 0, "normal": 0,
+    "bold": 1,
+    "italic": 2, "oblique": 2,
+    "bolditalic": 3, "boldoblique": 3,
+}
+
+# Si falta la variante pedida, la más parecida disponible
+ALTERNATIVAS = {0: (0, 1, 2, 3), 1: (1, 0, 3, 2), 2: (2, 0, 3, 1), 3: (3, 1, 2, 0)}
+
+
+class RegistroFuentes:
+    """
+    Catálogo de TTF disponibles y registro perezoso en reportlab
+
+    El directorio se lee una vez; para agregar fuentes hay que llamar a
+    invalidar() o reiniciar (los planes ya compilados conservan su fuente).
+    Un archivo que no se pudo registrar se recuerda (None) y no se vuelve a
+    leer en cada elemento; invalidar() también lo olvida.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self._familias: Optional[Dict[str, Dict[int, str]]] = None
+        self._registradas: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._familias = None
+            self._registradas = {
+                nombre: ruta for nombre, ruta in self._registradas.items() if ruta is not None
+            }
+
+    def _catalogo(self) -> Dict[str, Dict[int, str]]:
+        with self._lock:
+            if self._familias is None:
+                familias: Dict[str, Dict[int, str]] = {}
+                for ruta in sorted(glob.glob(os.path.join(self.directorio, "*.ttf"))):
+                    familia, _, sufijo = os.path.splitext(os.path.basename(ruta))[0].partition("-")
+                    variante = VARIANTES.get(sufijo.lower())
+                    if variante is not None:
+                        familias.setdefault(familia.lower(), {})[variante] = ruta
+                self._familias = familias
+            return self._familias
+
+    def resolver(self, familia: str, negrita: bool, italica: bool) -> Optional[str]:
+        """Nombre registrado de la variante TTF, o None si la familia no tiene archivo"""
+        variantes = self._catalogo().get((familia or "").lower())
+        if not variantes:
+            return None
+
+        pedida = (1 if negrita else 0) + (2 if italica else 0)
+        ruta = next(variantes[v] for v in ALTERNATIVAS[pedida] if v in variantes)
+        nombre = os.path.splitext(os.path.basename(ruta))[0]
+
+        with self._lock:
+            if nombre not in self._registradas:
+                try:
+                    pdfmetrics.registerFont(TTFont(nombre, ruta))
+                    self._registradas[nombre] = ruta
+                except Exception:
+                    logger.warning("No se pudo registrar la fuente %s", ruta, exc_info=True)
+                    self._registradas[nombre] = None
+            if self._registradas[nombre] is None:
+                return None
+        return nombre
+
+    def ruta(self, nombre: str) -> Optional[str]:
+        """Archivo de una fuente TTF ya registrada (para dibujar con Pillow)"""
+        return self._registradas.get(nombre)
+
+
+registro_fuentes = RegistroFuentes(settings.FUENTES_DIR)
+
+
+@lru_cache(maxsize=settings.FUENTES_CACHE_MEDIDAS)
+def ancho_texto(texto: str, fuente: str, tamano: float) -> float:
+    """Ancho en puntos (sin kerning, así que es aditivo por palabra)"""
+    return pdfmetrics.stringWidth(texto, fuente, tamano)
+
+
+def _partir_palabra(palabra: str, fuente: str, tamano: float, ancho: float) -> List[str]:
+    """Cortar por caracteres una palabra que no cabe sola en el ancho"""
+    partes, actual = [], ""
+    for caracter in palabra:
+        if actual and ancho_texto(actual + caracter, fuente, tamano) > ancho:
+            partes.append(actual)
+            actual = caracter
+        else:
+            actual += caracter
+    partes.append(actual)
+    return partes
+
+
+@lru_cache(maxsize=settings.FUENTES_CACHE_LINEAS)
+def partir_lineas(texto: str, fuente: str, tamano: float, ancho: float) -> Tuple[str, ...]:
+    """Partir el texto en líneas que quepan en el ancho (por palabras, respetando saltos)"""
+    espacio = ancho_texto(" ", fuente, tamano)
+    lineas: List[str] = []
+
+    for parrafo in texto.split("\n"):
+        linea, ancho_linea = "", 0.0
+        for palabra in parrafo.split():
+            ancho_palabra = ancho_texto(palabra, fuente, tamano)
+
+            if linea and ancho_linea + espacio + ancho_palabra <= ancho:
+                linea, ancho_linea = f"{linea} {palabra}", ancho_linea + espacio + ancho_palabra
+                continue
+
+            if linea:
+                lineas.append(linea)
+            if ancho_palabra > ancho:
+                *completas, palabra = _partir_palabra(palabra, fuente, tamano, ancho)
+                lineas.extend(completas)
+                ancho_palabra = ancho_texto(palabra, fuente, tamano)
+            linea, ancho_linea = palabra, ancho_palabra
+
+        lineas.append(linea)
+
+    return tuple(lineas)
+
+
+def lineas_texto(texto: str, fuente: str, tamano: float, ancho: float, interlineado: float) -> Tuple[str, ...]:
+    """
+    Líneas a dibujar de un texto en su caja
+
+    Sin interlineado (caja de una sola línea) el texto va completo en una
+    línea, como se ve en el editor; si no, se parte cuando no cabe.
+    """
+    if interlineado and ancho_texto(texto, fuente, tamano) > ancho:
+        return partir_lineas(texto, fuente, tamano, ancho)
+    return (texto,)
@@ -0,0 +1,169 @@
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfdoc
+from reportlab.lib.utils import ImageReader
+from reportlab.lib.boxstuff import aspectRatioFix
+from PIL import Image
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import copy
+import threading
+import io
+import os
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class ImagenPreparada:
+    """Imagen decodificada, reducida a la resolución de impresión y codificada como XObject PDF"""
+    nombre: str
+    xobject: pdfdoc.PDFImageXObject
+    smask: Optional[pdfdoc.PDFImageXObject]
+    ancho_px: int
+    alto_px: int
+    tamano_bytes: int
+
+
+def _tamano_objetivo(imagen: Image.Image, ancho_pt: float, alto_pt: float, mantener_aspecto: bool) -> Tuple[int, int]:
+    """Pixeles necesarios para imprimir la caja a IMAGEN_DPI (nunca se amplía)"""
+    ancho_max = max(1, round(ancho_pt / 72 * settings.IMAGEN_DPI))
+    alto_max = max(1, round(alto_pt / 72 * settings.IMAGEN_DPI))
+
+    if mantener_aspecto:
+        escala = min(ancho_max / imagen.width, alto_max / imagen.height, 1)
+        return max(1, round(imagen.width * escala)), max(1, round(imagen.height * escala))
+
+    return min(imagen.width, ancho_max), min(imagen.height, alto_max)
+
+
+def _preparar(ruta: str, mtime: int, ancho_pt: float, alto_pt: float, mantener_aspecto: bool) -> ImagenPreparada:
+    """Decodificar y reducir la imagen y construir su XObject una sola vez"""
+    with Image.open(ruta) as original:
+        original.load()
+        formato = original.format
+        imagen = original
+
+        destino = _tamano_objetivo(imagen, ancho_pt, alto_pt, mantener_aspecto)
+        if destino != imagen.size:
+            imagen = imagen.resize(destino, Image.LANCZOS)
+
+        if formato == "JPEG" and imagen.mode in ("RGB", "L", "CMYK"):
+            # Se conserva JPEG para que el PDF lo incruste sin recomprimir (DCTDecode)
+            buffer = io.BytesIO()
+            imagen.save(buffer, format="JPEG", quality=90)
+            buffer.seek(0)
+            lector = ImageReader(buffer)
+        else:
+            if imagen.mode not in ("RGB", "RGBA", "L", "LA"):
+                imagen = imagen.convert("RGBA" if "transparency" in imagen.info else "RGB")
+            lector = ImageReader(imagen)
+
+    firma = f"{ruta}|{mtime}|{imagen.width}x{imagen.height}|{mantener_aspecto}"
+    nombre = "img" + hashlib.md5(firma.encode("utf-8")).hexdigest()
+
+    xobject = pdfdoc.PDFImageXObject(nombre, lector, mask="auto")
+    xobject.name = nombre
+    smask = getattr(xobject, "_smask", None)
+    if smask is not None:
+        del xobject._smask
+        xobject.smask = pdfdoc.PDFObjectReference(pdfdoc.xObjectName(smask.name))
+
+    tamano = len(xobject.streamContent) + (len(smask.streamContent) if smask is not None else 0)
+
+    return ImagenPreparada(
+        nombre=nombre,
+        xobject=xobject,
+        smask=smask,
+        ancho_px=xobject.width,
+        alto_px=xobject.height,
+        tamano_bytes=tamano
+    )
+
+
+class ImagenCache:
+    """
+    Cache por proceso de imágenes listas para incrustar
+
+    Clave: (ruta, mtime, caja destino). Al cambiar el archivo (p. ej. un logo
+    re-subido con el mismo nombre) cambia el mtime y se vuelve a preparar.
+    Se expulsan las menos usadas cuando se supera el presupuesto de memoria.
+    """
+
+    def __init__(self, presupuesto_bytes: int):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._imagenes: "OrderedDict[tuple, ImagenPreparada]" = OrderedDict()
+        self._usado = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, ruta: str, ancho_pt: float, alto_pt: float, mantener_aspecto: bool = True) -> ImagenPreparada:
+        mtime = os.stat(ruta).st_mtime_ns
+        clave = (ruta, mtime, round(ancho_pt, 2), round(alto_pt, 2), mantener_aspecto)
+
+        with self._lock:
+            preparada = self._imagenes.get(clave)
+            if preparada:
+                self._imagenes.move_to_end(clave)
+                return preparada
+
+        preparada = _preparar(ruta, mtime, ancho_pt, alto_pt, mantener_aspecto)
+
+        with self._lock:
+            if clave not in self._imagenes:
+                self._imagenes[clave] = preparada
+                self._usado += preparada.tamano_bytes
+            while self._usado > self.presupuesto_bytes and len(self._imagenes) > 1:
+                _, expulsada = self._imagenes.popitem(last=False)
+                self._usado -= expulsada.tamano_bytes
+
+        return preparada
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._imagenes.clear()
+            self._usado = 0
+
+
+imagen_cache = ImagenCache(settings.IMAGENES_CACHE_MB * 1024 * 1024)
+
+
+def dibujar_imagen(
+    c: canvas.Canvas,
+    ruta: str,
+    x: float,
+    y: float,
+    ancho: float,
+    alto: float,
+    mantener_aspecto: bool = True
+) -> None:
+    """
+    Dibujar una imagen del cache
+
+    El XObject se registra una sola vez por documento; las demás páginas
+    (o formas) del mismo PDF solo lo referencian.
+    """
+    preparada = imagen_cache.obtener(ruta, ancho, alto, mantener_aspecto)
+    doc = c._doc
+    nombre_registro = doc.getXObjectName(preparada.nombre)
+
+    if nombre_registro not in doc.idToObject:
+        # Se registran copias superficiales: el documento marca el objeto al
+        # registrarlo y el original del cache se comparte entre documentos
+        if preparada.smask is not None:
+            nombre_mascara = doc.getXObjectName(preparada.smask.name)
+            if nombre_mascara not in doc.idToObject:
+                doc.Reference(copy.copy(preparada.smask), nombre_mascara)
+        doc.addForm(preparada.nombre, copy.copy(preparada.xobject))
+
+    x, y, ancho, alto, _ = aspectRatioFix(
+        mantener_aspecto, "c", x, y, ancho, alto, preparada.ancho_px, preparada.alto_px
+    )
+
+    c._currentPageHasImages = 1
+    c.saveState()
+    c.translate(x, y)
+    c.scale(ancho, alto)
+    c._code.append(f"/{nombre_registro} Do")
+    c.restoreState()
+    c._formsinuse.append(preparada.nombre)
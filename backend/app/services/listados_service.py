@@ -0,0 +1,79 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import uuid
+
+from app.models.proyecto import Proyecto
+from app.models.plantilla import Plantilla
+from app.models.padron import IdentificadorPadron
+from app.schemas.proyecto import ProyectoResponse
+from app.schemas.plantilla import PlantillaResponse
+
+
+def _columnas(modelo, esquema) -> Tuple:
+    """Columnas del modelo (incluidas las calculadas) que el esquema de respuesta necesita"""
+    return tuple(
+        getattr(modelo, campo) for campo in esquema.model_fields
+        if campo in modelo.__mapper__.column_attrs
+    )
+
+
+class ListadosService:
+    """
+    Lecturas de proyectos y plantillas para listados
+
+    Una sola consulta con JOIN a los nombres relacionados y solo las
+    columnas de la respuesta; cada fila se valida una vez al esquema.
+    """
+
+    _COLUMNAS_PROYECTO = _columnas(Proyecto, ProyectoResponse)
+    _COLUMNAS_PLANTILLA = _columnas(Plantilla, PlantillaResponse)
+
+    @staticmethod
+    def proyectos(
+        db: Session,
+        include_deleted: bool = False,
+        proyecto_uuid: Optional[uuid.UUID] = None
+    ) -> List[ProyectoResponse]:
+        """Proyectos con el nombre de su padrón"""
+
+        query = db.query(
+            *ListadosService._COLUMNAS_PROYECTO,
+            IdentificadorPadron.nombre_padron
+        ).outerjoin(
+            IdentificadorPadron,
+            IdentificadorPadron.uuid_padron == Proyecto.uuid_padron
+        )
+
+        if not include_deleted:
+            query = query.filter(Proyecto.is_deleted == False)
+        if proyecto_uuid is not None:
+            query = query.filter(Proyecto.uuid_proyecto == proyecto_uuid)
+
+        return [ProyectoResponse.model_validate(dict(fila._mapping)) for fila in query.all()]
+
+    @staticmethod
+    def plantillas(
+        db: Session,
+        proyecto_uuid: Optional[uuid.UUID] = None,
+        plantilla_uuid: Optional[uuid.UUID] = None
+    ) -> List[PlantillaResponse]:
+        """Plantillas (no eliminadas) con el nombre de su proyecto y padrón"""
+
+        query = db.query(
+            *ListadosService._COLUMNAS_PLANTILLA,
+            Proyecto.nombre_proyecto,
+            IdentificadorPadron.nombre_padron
+        ).outerjoin(
+            Proyecto,
+            Proyecto.uuid_proyecto == Plantilla.uuid_proyecto
+        ).outerjoin(
+            IdentificadorPadron,
+            IdentificadorPadron.uuid_padron == Plantilla.uuid_padron
+        ).filter(Plantilla.is_deleted == False)
+
+        if proyecto_uuid is not None:
+            query = query.filter(Plantilla.uuid_proyecto == proyecto_uuid)
+        if plantilla_uuid is not None:
+            query = query.filter(Plantilla.uuid_plantilla == plantilla_uuid)
+
+        return [PlantillaResponse.model_validate(dict(fila._mapping)) for fila in query.all()]
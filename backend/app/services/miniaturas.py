@@ -0,0 +1,219 @@
+"""
+Miniaturas PNG de plantillas
+
+Se dibujan con Pillow directamente desde el plan compilado (no hace falta un
+rasterizador de PDF): fondo, imágenes, textos (con la misma TTF y las mismas
+líneas que el PDF), nombres de los campos y los CODE128 con las mismas
+barras que el PDF. Se generan en un hilo aparte; los
+guardados seguidos de una misma plantilla se juntan en una sola miniatura.
+"""
+from PIL import Image, ImageDraw, ImageFont
+from sqlalchemy import text
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import glob
+import logging
+import os
+import threading
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.plantilla import Plantilla
+from app.services.codigo_barras import ANCHO_SIMBOLO, BARRAS_SIMBOLO, ZONA_SILENCIO, codificar_code128
+from app.services.fuentes import lineas_texto, registro_fuentes
+from app.services.plantilla_compiler import PlanRender, SlotTexto, formatear_valor, plan_de_plantilla
+
+logger = logging.getLogger(__name__)
+
+# Ancla de Pillow (horizontal + línea base) por alineación
+ANCLAS = {"left": "ls", "center": "ms", "right": "rs"}
+
+
+@lru_cache(maxsize=64)
+def _fuente(tamano_px: int, nombre: Optional[str] = None) -> ImageFont.FreeTypeFont:
+    ruta = registro_fuentes.ruta(nombre) if nombre else None
+    if ruta:
+        return ImageFont.truetype(ruta, max(tamano_px, 1))
+    return ImageFont.load_default(size=max(tamano_px, 1))
+
+
+def _rgb(color) -> Tuple[int, int, int]:
+    return tuple(int(round(v * 255)) for v in color.rgb())
+
+
+def renderizar_png(plan: PlanRender, datos: Optional[Dict[str, Any]] = None, ancho_px: int = 300) -> Image.Image:
+    """
+    Dibujar la plantilla como imagen
+
+    Sin datos, cada campo muestra su nombre entre llaves.
+    """
+    escala = ancho_px / plan.ancho
+    alto_px = max(1, round(plan.alto * escala))
+
+    fondo = _rgb(plan.color_fondo) if plan.color_fondo else (255, 255, 255)
+    imagen = Image.new("RGB", (ancho_px, alto_px), fondo)
+    dibujo = ImageDraw.Draw(imagen)
+
+    def _punto(x: float, y: float) -> Tuple[float, float]:
+        # El plan usa puntos con origen abajo; Pillow pixeles con origen arriba
+        return x * escala, (plan.alto - y) * escala
+
+    for slot in plan.imagenes:
+        if not os.path.exists(slot.ruta):
+            continue
+        with Image.open(slot.ruta) as original:
+            caja = (max(1, round(slot.ancho * escala)), max(1, round(slot.alto * escala)))
+            pegada = original.convert("RGBA")
+            if slot.mantener_aspecto:
+                pegada.thumbnail(caja, Image.LANCZOS)
+            else:
+                pegada = pegada.resize(caja, Image.LANCZOS)
+        x, y = _punto(slot.x, slot.y + slot.alto)
+        x += (caja[0] - pegada.width) / 2
+        y += (caja[1] - pegada.height) / 2
+        imagen.paste(pegada, (round(x), round(y)), pegada)
+
+    def _texto(slot: SlotTexto, contenido: str):
+        if not contenido:
+            return
+        lineas = lineas_texto(contenido, slot.fuente, slot.tamano, slot.ancho, slot.interlineado)
+        for numero, linea in enumerate(lineas):
+            dibujo.text(
+                _punto(slot.x, slot.y - numero * slot.interlineado),
+                linea,
+                fill=_rgb(slot.color),
+                font=_fuente(round(slot.tamano * escala), slot.fuente),
+                anchor=ANCLAS.get(slot.alineacion, "ls")
+            )
+
+    for slot in plan.textos_estaticos:
+        _texto(slot, slot.contenido)
+
+    for slot in plan.campos:
+        _texto(slot, formatear_valor(datos.get(slot.campo_nombre)) if datos is not None else f"{{{slot.campo_nombre}}}")
+
+    for slot in plan.codigos_barras:
+        x0, y0 = _punto(slot.x, slot.y + slot.alto)
+        x1, y1 = _punto(slot.x + slot.ancho, slot.y)
+        valor = formatear_valor(datos.get(slot.campo_nombre)) if datos is not None else ""
+
+        if slot.formato != "code128" or not valor:
+            # Sin valor (o formato raster): solo la caja
+            dibujo.rectangle((x0, y0, x1, y1), outline=(160, 160, 160))
+            continue
+
+        simbolos = codificar_code128(valor)
+        modulo = (x1 - x0) / (sum(ANCHO_SIMBOLO[s] for s in simbolos) + 2 * ZONA_SILENCIO)
+        alto_barras = y1 - y0
+        if slot.mostrar_texto:
+            alto_barras = max(alto_barras - slot.tamano_texto * 1.2 * escala, alto_barras / 2)
+
+        posicion = ZONA_SILENCIO
+        for simbolo in simbolos:
+            for desplazamiento, ancho_barra in BARRAS_SIMBOLO[simbolo]:
+                xb = x0 + (posicion + desplazamiento) * modulo
+                dibujo.rectangle((xb, y0, xb + ancho_barra * modulo, y0 + alto_barras), fill=(0, 0, 0))
+            posicion += ANCHO_SIMBOLO[simbolo]
+
+        if slot.mostrar_texto:
+            dibujo.text(
+                ((x0 + x1) / 2, y1),
+                valor,
+                fill=(0, 0, 0),
+                font=_fuente(round(slot.tamano_texto * escala)),
+                anchor="md"
+            )
+
+    return imagen
+
+
+def ruta_miniatura(uuid_plantilla: str, version: int) -> str:
+    return os.path.join(settings.UPLOAD_DIR, "plantillas", f"{uuid_plantilla}_v{version}.png")
+
+
+def generar_miniatura(uuid_plantilla: str, version: int) -> Optional[str]:
+    """
+    Generar y registrar la miniatura de una versión de la plantilla
+
+    Si mientras tanto la plantilla cambió de versión no se hace nada (ya hay
+    otra programada). thumbnail_path solo se asigna si la versión sigue
+    siendo la misma, así nunca apunta a una imagen vieja.
+    """
+    db = SessionLocal()
+    try:
+        plantilla = db.query(Plantilla).filter(
+            Plantilla.uuid_plantilla == uuid_plantilla
+        ).first()
+        if not plantilla or plantilla.is_deleted or plantilla.version != version:
+            return None
+
+        ruta = ruta_miniatura(uuid_plantilla, version)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        renderizar_png(plan_de_plantilla(plantilla), ancho_px=settings.MINIATURA_ANCHO_PX).save(ruta, optimize=True)
+
+        actualizadas = db.execute(
+            text("""
+                UPDATE plantillas SET thumbnail_path = :ruta
+                WHERE uuid_plantilla = :uuid_plantilla AND version = :version
+            """),
+            {"ruta": ruta, "uuid_plantilla": uuid_plantilla, "version": version}
+        ).rowcount
+        db.commit()
+
+        # Versiones anteriores ya no se sirven
+        patron = os.path.join(os.path.dirname(ruta), f"{uuid_plantilla}_v*.png")
+        for anterior in glob.glob(patron):
+            if anterior != ruta:
+                os.remove(anterior)
+
+        return ruta if actualizadas else None
+    finally:
+        db.close()
+
+
+class ProgramadorMiniaturas:
+    """
+    Cola de miniaturas con espera por plantilla
+
+    programar() deja la plantilla pendiente ESPERA segundos; si se vuelve a
+    guardar antes, se reemplaza la versión y se reinicia la espera. Un solo
+    hilo genera las miniaturas, una a la vez.
+    """
+
+    def __init__(self, espera_segundos: float):
+        self.espera_segundos = espera_segundos
+        self._pendientes: Dict[str, Tuple[int, float]] = {}
+        self._condicion = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+
+    def programar(self, uuid_plantilla, version: int) -> None:
+        with self._condicion:
+            self._pendientes[str(uuid_plantilla)] = (version, time.monotonic() + self.espera_segundos)
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name="miniaturas", daemon=True)
+                self._hilo.start()
+            self._condicion.notify()
+
+    def _siguiente(self) -> Tuple[str, int]:
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+                listas = [(u, v) for u, (v, vence) in self._pendientes.items() if vence <= ahora]
+                if listas:
+                    uuid_plantilla, version = listas[0]
+                    del self._pendientes[uuid_plantilla]
+                    return uuid_plantilla, version
+                proximo = min((vence for _, vence in self._pendientes.values()), default=None)
+                self._condicion.wait(None if proximo is None else proximo - ahora)
+
+    def _ciclo(self) -> None:
+        while True:
+            uuid_plantilla, version = self._siguiente()
+            try:
+                generar_miniatura(uuid_plantilla, version)
+            except Exception:
+                logger.exception("No se pudo generar la miniatura de %s v%s", uuid_plantilla, version)
+
+
+programador_miniaturas = ProgramadorMiniaturas(settings.MINIATURA_ESPERA_SEG)
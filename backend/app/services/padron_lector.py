@@ -0,0 +1,144 @@
+from sqlalchemy import text
+from typing import Dict, Iterator, List, Optional, Tuple
+import queue
+import threading
+import uuid
+
+from app.core.database import engine
+
+# Marca de fin de la cola de lectura anticipada
+_FIN = object()
+
+
+def consulta_registros(tabla_nombre: str) -> str:
+    """SELECT de los registros de emisión (sin WHERE), compartido con los workers"""
+    return f"""
+        SELECT p.*,
+               t.datos_padron -> 'detalle' AS detalle,
+               t.observaciones AS observaciones_ruta,
+               t.orden_ruta,
+               t.orden_impresion,
+               t.visita AS visita_asignada,
+               t.folio AS folio_asignado,
+               t.codebar AS codebar_asignado
+        FROM emision_temp t
+        CROSS JOIN LATERAL jsonb_populate_record(NULL::{tabla_nombre}, t.datos_padron) p
+    """
+
+
+class LectorPadron:
+    """
+    Lectura en streaming de los registros de una sesión de emisión
+
+    Usa un cursor con nombre del lado del servidor (stream_results) en una
+    conexión propia, para que los commits de avance de la emisión no lo
+    cierren. Las filas salen como tuplas; el orden de las columnas está en
+    `columnas` / `indice` y es el mismo para todas.
+
+    Se leen las filas pendientes (procesado = FALSE) de emision_temp en orden
+    de impresión, reconstruyendo las columnas del padrón desde datos_padron,
+    más detalle, observaciones_ruta, orden_ruta, orden_impresion,
+    visita_asignada, folio_asignado y codebar_asignado. Al reanudar una
+    sesión solo salen los registros que no llegaron a un checkpoint. Con
+    exitosos=True se leen en cambio los ya generados sin error (volúmenes).
+
+        with LectorPadron(tabla, uuid_sesion) as lector:
+            for lote in lector.lotes_anticipados():
+                ...
+    """
+
+    def __init__(
+        self,
+        tabla_nombre: str,
+        uuid_sesion: uuid.UUID,
+        tamano_lote: int = 2000,
+        exitosos: bool = False
+    ):
+        self.tabla_nombre = tabla_nombre
+        self.uuid_sesion = uuid_sesion
+        self.tamano_lote = tamano_lote
+        self.exitosos = exitosos
+        self.columnas: Tuple[str, ...] = ()
+        self.indice: Dict[str, int] = {}
+        self._conexion = None
+        self._resultado = None
+
+    def __enter__(self) -> "LectorPadron":
+        self._conexion = engine.connect()
+        self._resultado = self._conexion.execution_options(
+            stream_results=True,
+            max_row_buffer=self.tamano_lote
+        ).execute(*self._consulta())
+        self.columnas = tuple(self._resultado.keys())
+        self.indice = {columna: i for i, columna in enumerate(self.columnas)}
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._resultado is not None:
+            self._resultado.close()
+        if self._conexion is not None:
+            self._conexion.close()
+
+    def _consulta(self):
+        filtro = "t.procesado AND NOT t.tiene_error" if self.exitosos else "t.procesado = FALSE"
+        return text(f"""
+            {consulta_registros(self.tabla_nombre)}
+            WHERE t.uuid_sesion = :uuid_sesion
+            AND {filtro}
+            ORDER BY t.orden_impresion
+        """), {"uuid_sesion": str(self.uuid_sesion)}
+
+    def lotes(self) -> Iterator[List[tuple]]:
+        """Lotes de hasta tamano_lote filas como tuplas"""
+        for particion in self._resultado.partitions(self.tamano_lote):
+            yield [tuple(fila) for fila in particion]
+
+    def lotes_anticipados(self, max_lotes: int = 4) -> Iterator[List[tuple]]:
+        """
+        Igual que lotes(), pero leyendo en un hilo hacia una cola acotada
+
+        La lectura de BD se solapa con el consumo; si el consumidor se atrasa
+        la cola se llena y el hilo lector se bloquea (backpressure), así que
+        nunca hay más de max_lotes lotes en memoria.
+        """
+        cola: "queue.Queue" = queue.Queue(maxsize=max_lotes)
+        cancelado = threading.Event()
+        error: List[Optional[BaseException]] = [None]
+
+        def _leer():
+            try:
+                for lote in self.lotes():
+                    while not cancelado.is_set():
+                        try:
+                            cola.put(lote, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if cancelado.is_set():
+                        return
+            except BaseException as e:
+                error[0] = e
+            finally:
+                cola.put(_FIN)
+
+        hilo = threading.Thread(target=_leer, name="lector-padron", daemon=True)
+        hilo.start()
+
+        try:
+            while True:
+                lote = cola.get()
+                if lote is _FIN:
+                    break
+                yield lote
+        finally:
+            cancelado.set()
+            # Vaciar para desbloquear al hilo si quedó esperando espacio
+            while hilo.is_alive():
+                try:
+                    cola.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            hilo.join()
+
+        if error[0] is not None:
+            raise error[0]
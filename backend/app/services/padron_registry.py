@@ -0,0 +1,213 @@
+from sqlalchemy import text
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Padrón -> (tabla principal, columna que identifica la cuenta en rutas y emisiones).
+# Lo demás (columnas, tipos, llave única, tablas de detalle) se lee del catálogo.
+TABLAS_PADRON = {
+    "TLAJOMULCO_APA": ("padron_completo_tlajomulco_apa", "cuenta"),
+    "TLAJOMULCO_PREDIAL": ("padron_completo_tlajomulco_predial", "cuenta_n"),
+    "GUADALAJARA_PREDIAL": ("padron_completo_guadalajara_predial_principal", "cuenta"),
+    "GUADALAJARA_LICENCIAS": ("padron_completo_guadalajara_licencias_principal", "cvereq"),
+    "PENSIONES": ("padron_completo_pensiones", "afiliado")
+}
+
+# Columnas internas que no son datos del padrón
+COLUMNAS_INTERNAS = ("uuid_padron", "uuid_proyecto", "id_detalle")
+
+# Campos que la emisión agrega a cada registro además de las columnas del padrón
+CAMPOS_CONTROL = (
+    "codebar", "folio", "pmo", "visita", "fecha_emision", "tipo_documento",
+    "orden_impresion", "orden_ruta", "observaciones_ruta", "detalle"
+)
+
+
+class DefinicionPadronInvalida(Exception):
+    """El catálogo no permite definir el padrón sin ambigüedad"""
+
+
+@dataclass(frozen=True)
+class ColumnaPadron:
+    nombre: str
+    tipo: str
+    longitud: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class TablaDetalle:
+    tabla: str
+    orden: Tuple[str, ...]
+    columnas: Dict[str, ColumnaPadron] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class DefinicionPadron:
+    nombre_padron: str
+    tabla: str
+    columna_cuenta: str
+    llave: Tuple[str, ...]
+    columnas: Dict[str, ColumnaPadron]
+    detalle: Optional[TablaDetalle] = None
+
+    @property
+    def columnas_datos(self) -> Dict[str, ColumnaPadron]:
+        """Columnas del padrón sin las internas (uuid_padron, uuid_proyecto)"""
+        return {n: c for n, c in self.columnas.items() if n not in COLUMNAS_INTERNAS}
+
+    @property
+    def campos_plantilla(self) -> Tuple[str, ...]:
+        """Nombres válidos para campo_nombre en una plantilla (incluye las columnas del detalle)"""
+        detalle = tuple(
+            n for n in (self.detalle.columnas if self.detalle else ())
+            if n not in COLUMNAS_INTERNAS and n not in self.columnas
+        )
+        return tuple(self.columnas_datos) + detalle + CAMPOS_CONTROL
+
+
+def _elegir_llave(
+    tabla: str,
+    restricciones: List[Tuple[str, Tuple[str, ...]]],
+    preferidas: Tuple[str, ...]
+) -> Optional[Tuple[str, ...]]:
+    """
+    Restricción única que identifica los registros de la tabla
+
+    Se prefiere la que contiene todas las columnas `preferidas`; si ninguna,
+    la que contiene la primera (uuid_proyecto o uuid_padron). Si en ese
+    nivel hay más de una, la llave de ON CONFLICT / DISTINCT ON sería
+    arbitraria y se rechaza. None si ninguna sirve.
+    """
+    for requeridas in (preferidas, preferidas[:1]):
+        candidatas = [(nombre, llave) for nombre, llave in restricciones if set(requeridas) <= set(llave)]
+        if len(candidatas) > 1:
+            raise DefinicionPadronInvalida(
+                f"{tabla}: más de una restricción única puede ser la llave "
+                f"({', '.join(nombre for nombre, _ in candidatas)})"
+            )
+        if candidatas:
+            return candidatas[0][1]
+    return None
+
+
+class PadronRegistry:
+    """
+    Definición de cada padrón leída una vez del catálogo de PostgreSQL
+
+    Emisión, preview, carga de padrones y validación de plantillas la toman de
+    memoria. Si cambia el esquema de alguna tabla de padrón hay que llamar a
+    invalidar() (o reiniciar la API) para que se vuelva a leer.
+    """
+
+    def __init__(self, tablas: Dict[str, Tuple[str, str]]):
+        self.tablas = tablas
+        self._definiciones: Optional[Dict[str, DefinicionPadron]] = None
+        self._lock = threading.Lock()
+
+    def obtener(self, nombre_padron: str) -> Optional[DefinicionPadron]:
+        definiciones = self._definiciones
+        if definiciones is None:
+            definiciones = self.cargar()
+        return definiciones.get(nombre_padron)
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._definiciones = None
+
+    def precargar(self) -> None:
+        """Cargar al arrancar la API; si la BD no responde se cargará al primer uso"""
+        try:
+            self.cargar()
+        except Exception:
+            logger.warning("No se pudo precargar el registro de padrones", exc_info=True)
+
+    def cargar(self) -> Dict[str, DefinicionPadron]:
+        with self._lock:
+            if self._definiciones is None:
+                self._definiciones = self._leer_catalogo()
+            return self._definiciones
+
+    def _leer_catalogo(self) -> Dict[str, DefinicionPadron]:
+        principales = [tabla for tabla, _ in self.tablas.values()]
+
+        with engine.connect() as conexion:
+            # Tablas de detalle: las que tienen llave foránea a una tabla principal
+            detalles = dict(conexion.execute(
+                text("""
+                    SELECT c.confrelid::regclass::text, c.conrelid::regclass::text
+                    FROM pg_constraint c
+                    WHERE c.contype = 'f'
+                    AND c.confrelid::regclass::text = ANY(:tablas)
+                """),
+                {"tablas": principales}
+            ).fetchall())
+
+            todas = principales + list(detalles.values())
+
+            columnas: Dict[str, Dict[str, ColumnaPadron]] = {tabla: {} for tabla in todas}
+            for tabla, nombre, tipo, longitud in conexion.execute(
+                text("""
+                    SELECT table_name, column_name, data_type, character_maximum_length
+                    FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                    AND table_name = ANY(:tablas)
+                    ORDER BY table_name, ordinal_position
+                """),
+                {"tablas": todas}
+            ):
+                columnas[tabla][nombre] = ColumnaPadron(nombre, tipo, longitud)
+
+            unicas: Dict[str, List[Tuple[str, Tuple[str, ...]]]] = {tabla: [] for tabla in todas}
+            for tabla, nombre, llave in conexion.execute(
+                text("""
+                    SELECT c.conrelid::regclass::text, c.conname::text,
+                           array_agg(a.attname::text ORDER BY k.posicion)
+                    FROM pg_constraint c
+                    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, posicion)
+                    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+                    WHERE c.contype = 'u'
+                    AND c.conrelid::regclass::text = ANY(:tablas)
+                    GROUP BY c.oid, c.conname, c.conrelid
+                    ORDER BY c.conname
+                """),
+                {"tablas": todas}
+            ):
+                unicas[tabla].append((nombre, tuple(llave)))
+
+        definiciones = {}
+        for nombre_padron, (tabla, columna_cuenta) in self.tablas.items():
+            # Llave del padrón: la restricción única con uuid_proyecto (y de preferencia la cuenta)
+            unica = _elegir_llave(tabla, unicas.get(tabla, []), ("uuid_proyecto", columna_cuenta))
+            llave = tuple(c for c in unica or (columna_cuenta,) if c != "uuid_proyecto")
+
+            detalle = None
+            tabla_detalle = detalles.get(tabla)
+            if tabla_detalle:
+                # Orden de los renglones: su llave única sin el padre ni la cuenta
+                unica_detalle = _elegir_llave(
+                    tabla_detalle, unicas.get(tabla_detalle, []), ("uuid_padron", columna_cuenta)
+                )
+                orden = tuple(
+                    c for c in unica_detalle or ()
+                    if c not in COLUMNAS_INTERNAS and c not in llave
+                )
+                detalle = TablaDetalle(tabla_detalle, orden, columnas.get(tabla_detalle, {}))
+
+            definiciones[nombre_padron] = DefinicionPadron(
+                nombre_padron=nombre_padron,
+                tabla=tabla,
+                columna_cuenta=columna_cuenta,
+                llave=llave,
+                columnas=columnas.get(tabla, {}),
+                detalle=detalle
+            )
+
+        return definiciones
+
+
+padron_registry = PadronRegistry(TABLAS_PADRON)
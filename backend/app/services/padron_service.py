@@ -0,0 +1,296 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, text
+from fastapi import HTTPException, status, UploadFile
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+import unicodedata
+import uuid
+import io
+import os
+import re
+
+from app.models.proyecto import Proyecto
+from app.models.padron import IdentificadorPadron
+from app.models.usuario import Usuario
+from app.schemas.proyecto import PadronCargaResponse
+from app.services.bitacora_service import BitacoraService
+from app.services.padron_registry import padron_registry, ColumnaPadron
+from app.core.config import settings
+
+# Valores que se interpretan como verdadero en columnas BOOLEAN
+VALORES_VERDADEROS = {"1", "true", "t", "si", "sí", "s", "x", "yes", "y", "verdadero"}
+
+class PadronService:
+
+    @staticmethod
+    def cargar_archivo(
+        db: Session,
+        proyecto_uuid: uuid.UUID,
+        file: UploadFile,
+        usuario: Usuario,
+        ip_address: Optional[str] = None
+    ) -> PadronCargaResponse:
+        """
+        Cargar un CSV o XLSX al padrón del proyecto
+
+        El archivo se lee por bloques de PADRON_CHUNK_FILAS filas, cada bloque se
+        convierte a los tipos de la tabla y se envía con COPY a una tabla de
+        staging. Al final se hace un solo INSERT ... ON CONFLICT sobre la llave
+        única del padrón (última fila gana si la llave se repite en el archivo).
+        """
+
+        proyecto = db.query(Proyecto).filter(
+            and_(
+                Proyecto.uuid_proyecto == proyecto_uuid,
+                Proyecto.is_deleted == False
+            )
+        ).first()
+
+        if not proyecto:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Proyecto no encontrado"
+            )
+
+        if proyecto.en_emision:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No se puede cargar el padrón de un proyecto que está en emisión"
+            )
+
+        padron = db.query(IdentificadorPadron).filter(
+            IdentificadorPadron.uuid_padron == proyecto.uuid_padron
+        ).first()
+
+        definicion = padron_registry.obtener(padron.nombre_padron) if padron else None
+
+        if not definicion:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al mapear padrón"
+            )
+
+        tabla_nombre, columnas_llave = definicion.tabla, definicion.llave
+        columnas_tabla = definicion.columnas_datos
+
+        extension = os.path.splitext(file.filename or "")[1].lower()
+        if extension == ".csv":
+            bloques = PadronService._leer_csv(file.file)
+        elif extension in (".xlsx", ".xlsm"):
+            bloques = PadronService._leer_xlsx(file.file)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Solo se permiten archivos CSV o XLSX"
+            )
+
+        staging = f"staging_{tabla_nombre}"
+        leidos = 0
+        descartados = 0
+        columnas_archivo: List[str] = []
+        columnas_ignoradas: List[str] = []
+
+        # Conexión DBAPI (psycopg2) de la misma transacción para usar COPY
+        cursor = db.connection().connection.cursor()
+
+        try:
+            for bloque in bloques:
+                if not columnas_archivo:
+                    columnas_ignoradas = [c for c in bloque.columns if c not in columnas_tabla]
+                    columnas_archivo = [c for c in bloque.columns if c in columnas_tabla]
+
+                    faltantes = [c for c in columnas_llave if c not in columnas_archivo]
+                    if faltantes:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"El archivo no contiene la columna llave: {', '.join(faltantes)}"
+                        )
+
+                    lista = ", ".join(columnas_archivo)
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+                        SELECT {lista} FROM {tabla_nombre} WITH NO DATA
+                    """)
+                    cursor.execute(f"ALTER TABLE {staging} ADD COLUMN _fila BIGSERIAL")
+
+                bloque = PadronService._convertir_bloque(bloque[columnas_archivo], columnas_tabla)
+                leidos += len(bloque)
+
+                validas = bloque[list(columnas_llave)].notna().all(axis=1)
+                descartados += int((~validas).sum())
+                bloque = bloque[validas]
+
+                buffer = io.StringIO()
+                bloque.to_csv(buffer, index=False, header=False, na_rep="\\N")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {staging} ({', '.join(columnas_archivo)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                    buffer
+                )
+
+            if not columnas_archivo:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="El archivo está vacío"
+                )
+
+            insertados, actualizados = PadronService._fusionar_staging(
+                db, staging, tabla_nombre, columnas_archivo, columnas_llave, proyecto.uuid_proyecto
+            )
+            db.commit()
+
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Error al cargar el padrón: {e}"
+            )
+        finally:
+            cursor.close()
+
+        # Registrar en bitácora
+        BitacoraService.registrar(
+            db=db,
+            uuid_usuario=usuario.uuid_usuario,
+            accion="CARGAR_PADRON",
+            entidad="PROYECTO",
+            entidad_id=str(proyecto.uuid_proyecto),
+            detalles={
+                "archivo": file.filename,
+                "padron": padron.nombre_padron,
+                "leidos": leidos,
+                "insertados": insertados,
+                "actualizados": actualizados,
+                "descartados": descartados
+            },
+            ip_address=ip_address
+        )
+
+        return PadronCargaResponse(
+            nombre_padron=padron.nombre_padron,
+            registros_leidos=leidos,
+            registros_insertados=insertados,
+            registros_actualizados=actualizados,
+            registros_descartados=descartados,
+            columnas_ignoradas=columnas_ignoradas
+        )
+
+    @staticmethod
+    def _normalizar_columna(nombre) -> str:
+        """'Cuenta N°' -> 'cuenta_n'"""
+        nombre = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode("ascii")
+        return re.sub(r"[^a-z0-9]+", "_", nombre.strip().lower()).strip("_")
+
+    @staticmethod
+    def _leer_csv(archivo) -> Iterator[pd.DataFrame]:
+        """Leer un CSV por bloques, todo como texto"""
+        # Detectar separador con la primera línea (los padrones llegan con , o ;)
+        muestra = archivo.read(4096)
+        archivo.seek(0)
+        primera_linea = muestra.splitlines()[0] if muestra else b""
+        separador = max((b",", b";", b"\t", b"|"), key=primera_linea.count).decode()
+
+        lector = pd.read_csv(
+            archivo,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=settings.PADRON_CHUNK_FILAS,
+            encoding="utf-8-sig",
+            sep=separador
+        )
+        for bloque in lector:
+            bloque.columns = [PadronService._normalizar_columna(c) for c in bloque.columns]
+            yield bloque
+
+    @staticmethod
+    def _leer_xlsx(archivo) -> Iterator[pd.DataFrame]:
+        """Leer la primera hoja de un XLSX en modo read-only por bloques"""
+        from openpyxl import load_workbook
+
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.worksheets[0].iter_rows(values_only=True)
+            encabezados = next(filas, None)
+            if not encabezados:
+                return
+
+            columnas = [PadronService._normalizar_columna(c) for c in encabezados]
+            bloque = []
+            for fila in filas:
+                bloque.append(["" if v is None else v for v in fila])
+                if len(bloque) >= settings.PADRON_CHUNK_FILAS:
+                    yield pd.DataFrame(bloque, columns=columnas, dtype=object)
+                    bloque = []
+            if bloque:
+                yield pd.DataFrame(bloque, columns=columnas, dtype=object)
+        finally:
+            libro.close()
+
+    @staticmethod
+    def _convertir_bloque(bloque: pd.DataFrame, columnas_tabla: Dict[str, ColumnaPadron]) -> pd.DataFrame:
+        """Convertir cada columna al tipo de la tabla destino; lo no convertible queda NULL"""
+        convertido = {}
+        for columna in bloque.columns:
+            tipo, longitud = columnas_tabla[columna].tipo, columnas_tabla[columna].longitud
+            serie = bloque[columna]
+            texto = serie.astype(str).str.strip()
+            vacio = texto.eq("") | serie.isna()
+
+            if tipo in ("numeric", "double precision", "real"):
+                limpio = texto.str.replace(r"[$,\s]", "", regex=True)
+                valores = pd.to_numeric(limpio.mask(vacio), errors="coerce")
+            elif tipo in ("integer", "bigint", "smallint"):
+                limpio = texto.str.replace(r"[,\s]", "", regex=True)
+                valores = pd.to_numeric(limpio.mask(vacio), errors="coerce").round().astype("Int64")
+            elif tipo == "date":
+                fechas = pd.to_datetime(serie.mask(vacio), errors="coerce", dayfirst=True, format="mixed")
+                valores = fechas.dt.strftime("%Y-%m-%d")
+            elif tipo == "boolean":
+                valores = texto.str.lower().isin(VALORES_VERDADEROS).map({True: "t", False: "f"}).mask(vacio)
+            else:
+                valores = texto.mask(vacio)
+                if longitud:
+                    valores = valores.str.slice(0, longitud)
+
+            convertido[columna] = valores
+
+        return pd.DataFrame(convertido)
+
+    @staticmethod
+    def _fusionar_staging(
+        db: Session,
+        staging: str,
+        tabla_nombre: str,
+        columnas: List[str],
+        columnas_llave: Tuple[str, ...],
+        uuid_proyecto: uuid.UUID
+    ) -> Tuple[int, int]:
+        """Pasar staging al padrón con un solo upsert; devuelve (insertados, actualizados)"""
+        lista = ", ".join(columnas)
+        llave = ", ".join(columnas_llave)
+        actualizar = ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in columnas if c not in columnas_llave
+        ) or f"{columnas_llave[0]} = EXCLUDED.{columnas_llave[0]}"
+
+        result = db.execute(
+            text(f"""
+                WITH fusion AS (
+                    INSERT INTO {tabla_nombre} (uuid_proyecto, {lista})
+                    SELECT DISTINCT ON ({llave}) CAST(:uuid_proyecto AS UUID), {lista}
+                    FROM {staging}
+                    ORDER BY {llave}, _fila DESC
+                    ON CONFLICT ({llave}, uuid_proyecto) DO UPDATE SET {actualizar}
+                    RETURNING (xmax = 0) AS insertado
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE insertado),
+                    COUNT(*) FILTER (WHERE NOT insertado)
+                FROM fusion
+            """),
+            {"uuid_proyecto": str(uuid_proyecto)}
+        ).fetchone()
+
+        return int(result[0]), int(result[1])
@@ -0,0 +1,223 @@
+"""
+Planificador de sesiones de emisión con leases
+
+iniciar_sesion / reanudar_sesion dejan la sesión EN_COLA; el planificador de
+cada proceso de la API toma de la cola la siguiente sesión (menor prioridad,
+luego la más antigua) mientras tenga capacidad y el proyecto no haya llegado
+a su cuota de sesiones simultáneas, y la marca PROCESANDO con un lease a su
+nombre. Mientras la renderiza renueva el lease con latidos; si el proceso
+muere, el lease vence, el proyecto se libera solo y cualquier planificador
+retoma la sesión desde su último checkpoint; si estaba cancelada, el latido
+la cierra para que se pueda reanudar. Con workers externos el planificador
+solo prepara la sesión y entrega el lease a los workers
+(EmisionService.PROPIETARIO_WORKERS), que lo renuevan mientras la renderizan.
+
+Las sesiones de prioridad alta (rutas chicas, reimpresiones) pueden usar
+EMISION_CUPO_PRIORITARIO lugares extra, así no esperan a que termine una
+emisión grande.
+"""
+from sqlalchemy import text
+from typing import Dict, Optional
+import logging
+import os
+import socket
+import threading
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.emision_service import EmisionService
+
+logger = logging.getLogger(__name__)
+
+
+class PlanificadorEmision:
+    """
+    Cola de sesiones con prioridad, cuotas por proyecto y leases
+
+    La elección de la siguiente sesión se hace bajo un advisory lock de
+    transacción, así varios procesos (o varias réplicas de la API) nunca
+    exceden la cuota de un proyecto ni toman la misma sesión.
+    """
+
+    def __init__(
+        self,
+        capacidad: int,
+        cupo_prioritario: int,
+        cuota_proyecto: int,
+        lease_segundos: float,
+        intervalo_segundos: float
+    ):
+        self.capacidad = capacidad
+        self.cupo_prioritario = cupo_prioritario
+        self.cuota_proyecto = cuota_proyecto
+        self.lease_segundos = lease_segundos
+        self.intervalo_segundos = intervalo_segundos
+        self.propietario = f"{socket.gethostname()}:{os.getpid()}"[:100]
+        self._activas: Dict[str, threading.Thread] = {}
+        self._condicion = threading.Condition()
+        self._detener = False
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        with self._condicion:
+            if self._hilo is None:
+                self._detener = False
+                self._hilo = threading.Thread(target=self._ciclo, name="planificador-emision", daemon=True)
+                self._hilo.start()
+
+    def detener(self) -> None:
+        """Dejar de tomar sesiones; las que están en curso conservan su lease hasta que venza"""
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify()
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            hilo.join(timeout=5)
+
+    def despertar(self) -> None:
+        """Revisar la cola ya (p. ej. al encolar una sesión) sin esperar el intervalo"""
+        with self._condicion:
+            self._condicion.notify()
+
+    def _ciclo(self) -> None:
+        ultimo_latido = time.monotonic()
+        while True:
+            with self._condicion:
+                if self._detener:
+                    return
+            try:
+                if time.monotonic() - ultimo_latido >= self.lease_segundos / 3:
+                    self._latido()
+                    self._cerrar_canceladas()
+                    ultimo_latido = time.monotonic()
+                self._despachar()
+            except Exception:
+                logger.exception("Error en el planificador de emisiones")
+            with self._condicion:
+                if not self._detener:
+                    self._condicion.wait(self.intervalo_segundos)
+
+    def _despachar(self) -> None:
+        """Lanzar sesiones de la cola mientras haya capacidad"""
+        while True:
+            with self._condicion:
+                if self._detener:
+                    return
+                ocupados = len(self._activas)
+            if ocupados >= self.capacidad + self.cupo_prioritario:
+                return
+
+            # Los lugares extra solo son para prioridad alta
+            prioridad_maxima = (
+                EmisionService.PRIORIDAD_ALTA if ocupados >= self.capacidad else None
+            )
+            uuid_sesion = self._tomar_siguiente(prioridad_maxima)
+            if uuid_sesion is None:
+                return
+
+            hilo = threading.Thread(
+                target=self._ejecutar, args=(uuid_sesion,), name=f"emision-{uuid_sesion}", daemon=True
+            )
+            with self._condicion:
+                self._activas[uuid_sesion] = hilo
+            hilo.start()
+
+    def _tomar_siguiente(self, prioridad_maxima: Optional[int]) -> Optional[str]:
+        """
+        Tomar el lease de la siguiente sesión de la cola
+
+        También entran las sesiones PROCESANDO con lease vencido (su proceso
+        murió) o sin lease. La cuota cuenta las sesiones del proyecto con
+        lease vigente.
+        """
+        db = SessionLocal()
+        try:
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext('planificador_emision'))"))
+            uuid_sesion = db.execute(
+                text("""
+                    UPDATE sesiones_emision
+                    SET estado = 'PROCESANDO',
+                        lease_owner = :propietario,
+                        lease_expira = now() + make_interval(secs => :lease)
+                    WHERE uuid_sesion = (
+                        SELECT s.uuid_sesion
+                        FROM sesiones_emision s
+                        WHERE (
+                            s.estado = 'EN_COLA'
+                            OR (s.estado = 'PROCESANDO' AND (s.lease_expira IS NULL OR s.lease_expira <= now()))
+                        )
+                        AND (CAST(:prioridad_maxima AS SMALLINT) IS NULL OR s.prioridad <= :prioridad_maxima)
+                        AND (
+                            SELECT COUNT(*) FROM sesiones_emision o
+                            WHERE o.uuid_proyecto = s.uuid_proyecto
+                            AND o.uuid_sesion <> s.uuid_sesion
+                            AND o.lease_expira > now()
+                        ) < :cuota
+                        ORDER BY s.prioridad NULLS LAST, s.tiempo_inicio
+                        LIMIT 1
+                    )
+                    RETURNING uuid_sesion
+                """),
+                {
+                    "propietario": self.propietario,
+                    "lease": self.lease_segundos,
+                    "prioridad_maxima": prioridad_maxima,
+                    "cuota": self.cuota_proyecto
+                }
+            ).scalar()
+            if uuid_sesion:
+                EmisionService._notificar_progreso(db, uuid_sesion)
+            db.commit()
+            return str(uuid_sesion) if uuid_sesion else None
+        finally:
+            db.close()
+
+    def _ejecutar(self, uuid_sesion: str) -> None:
+        try:
+            EmisionService.procesar_sesion(uuid_sesion, self.propietario)
+        except Exception:
+            logger.exception("Error al procesar la sesión de emisión %s", uuid_sesion)
+        finally:
+            with self._condicion:
+                self._activas.pop(uuid_sesion, None)
+                self._condicion.notify()
+
+    def _cerrar_canceladas(self) -> None:
+        """Cerrar las sesiones canceladas cuyo proceso murió antes de cerrarlas"""
+        db = SessionLocal()
+        try:
+            EmisionService._cerrar_canceladas(db)
+        finally:
+            db.close()
+
+    def _latido(self) -> None:
+        """Renovar el lease de las sesiones que este proceso está renderizando"""
+        with self._condicion:
+            activas = list(self._activas)
+        if not activas:
+            return
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                text("""
+                    UPDATE sesiones_emision
+                    SET lease_expira = now() + make_interval(secs => :lease)
+                    WHERE uuid_sesion = ANY(CAST(:sesiones AS UUID[]))
+                    AND lease_owner = :propietario
+                """),
+                {"lease": self.lease_segundos, "sesiones": activas, "propietario": self.propietario}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+planificador_emision = PlanificadorEmision(
+    capacidad=settings.EMISION_CAPACIDAD,
+    cupo_prioritario=settings.EMISION_CUPO_PRIORITARIO,
+    cuota_proyecto=settings.EMISION_CUOTA_PROYECTO,
+    lease_segundos=settings.EMISION_LEASE_SEG,
+    intervalo_segundos=settings.EMISION_PLANIFICADOR_SEG
+)
@@ -0,0 +1,263 @@
+from reportlab.lib.units import cm
+from reportlab.lib.colors import Color, HexColor
+from reportlab.pdfbase import pdfmetrics
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from decimal import Decimal
+from datetime import date, datetime
+import threading
+import os
+
+from app.schemas.plantilla import ElementoEstilo
+from app.services.fuentes import registro_fuentes
+from app.core.config import settings
+
+# Familias estándar de PDF: (normal, negrita, itálica, negrita+itálica)
+FAMILIAS_PDF = {
+    "Helvetica": ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique"),
+    "Times": ("Times-Roman", "Times-Bold", "Times-Italic", "Times-BoldItalic"),
+    "Courier": ("Courier", "Courier-Bold", "Courier-Oblique", "Courier-BoldOblique"),
+}
+
+# Interlineado como múltiplo del tamaño de letra
+INTERLINEADO = 1.2
+
+# Fuentes del editor sin TTF en FUENTES_DIR que se sustituyen por una familia estándar
+SUSTITUTOS_FUENTE = {
+    "times": "Times",
+    "times new roman": "Times",
+    "georgia": "Times",
+    "courier": "Courier",
+    "courier new": "Courier",
+}
+
+
+def resolver_fuente(estilo: ElementoEstilo) -> str:
+    """Obtener el nombre de fuente PDF para un estilo del canvas (TTF si hay archivo)"""
+    ttf = registro_fuentes.resolver(estilo.fuente, bool(estilo.negrita), bool(estilo.italica))
+    if ttf:
+        return ttf
+
+    familia = SUSTITUTOS_FUENTE.get((estilo.fuente or "").lower(), "Helvetica")
+    variantes = FAMILIAS_PDF[familia]
+    indice = (1 if estilo.negrita else 0) + (2 if estilo.italica else 0)
+    return variantes[indice]
+
+
+def resolver_ruta_imagen(ruta_imagen: str) -> str:
+    """Convertir la ruta pública de una imagen (/uploads/...) a ruta en disco"""
+    if ruta_imagen.startswith("/uploads/"):
+        return os.path.join(settings.UPLOAD_DIR, ruta_imagen[len("/uploads/"):])
+    return ruta_imagen
+
+
+def formatear_valor(valor: Any) -> str:
+    """Convertir un valor del padrón a texto imprimible"""
+    if valor is None:
+        return ""
+    if isinstance(valor, (Decimal, float)):
+        return f"{valor:,.2f}"
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y %H:%M")
+    if isinstance(valor, date):
+        return valor.strftime("%d/%m/%Y")
+    return str(valor)
+
+
+@dataclass(frozen=True)
+class SlotTexto:
+    """
+    Texto ya posicionado: x es el punto de anclaje según la alineación, y la
+    línea base de la primera línea
+
+    Si la caja tiene alto para dos líneas o más, interlineado es la
+    distancia entre líneas y el texto se parte al ancho de la caja; en una
+    caja de una línea vale 0 y el texto no se parte.
+    """
+    x: float
+    y: float
+    fuente: str
+    tamano: float
+    color: Color
+    alineacion: str
+    contenido: str = ""
+    campo_nombre: str = ""
+    ancho: float = 0.0
+    interlineado: float = 0.0
+
+
+@dataclass(frozen=True)
+class SlotImagen:
+    ruta: str
+    x: float
+    y: float
+    ancho: float
+    alto: float
+    mantener_aspecto: bool
+
+
+@dataclass(frozen=True)
+class SlotCodigoBarras:
+    campo_nombre: str
+    x: float
+    y: float
+    ancho: float
+    alto: float
+    formato: str
+    mostrar_texto: bool
+    tamano_texto: int
+
+
+@dataclass(frozen=True)
+class PlanRender:
+    """Plantilla compilada: medidas en puntos y elementos separados en estáticos y por registro"""
+    uuid_plantilla: str
+    version: int
+    ancho: float
+    alto: float
+    color_fondo: Optional[Color]
+    textos_estaticos: Tuple[SlotTexto, ...]
+    imagenes: Tuple[SlotImagen, ...]
+    campos: Tuple[SlotTexto, ...]
+    codigos_barras: Tuple[SlotCodigoBarras, ...]
+
+    @property
+    def nombre_form(self) -> str:
+        """Nombre del form XObject con el contenido estático"""
+        return f"plantilla_{self.uuid_plantilla.replace('-', '')}_v{self.version}"
+
+
+def _caja(elemento: Dict[str, Any], alto_canvas: float) -> Tuple[float, float, float, float]:
+    """Caja del elemento en puntos con origen inferior izquierdo (el canvas usa cm desde arriba)"""
+    ancho = float(elemento.get("ancho", 0)) * cm
+    alto = float(elemento.get("alto", 0)) * cm
+    x = float(elemento.get("x", 0)) * cm
+    y = (alto_canvas - float(elemento.get("y", 0))) * cm - alto
+    return x, y, ancho, alto
+
+
+def _compilar_texto(elemento: Dict[str, Any], alto_canvas: float) -> SlotTexto:
+    estilo = ElementoEstilo(**(elemento.get("estilo") or {}))
+    fuente = resolver_fuente(estilo)
+    tamano = estilo.tamano or 11
+    x, y, ancho, alto = _caja(elemento, alto_canvas)
+    alineacion = estilo.alineacion if estilo.alineacion in ("center", "right") else "left"
+
+    if alineacion == "center":
+        x += ancho / 2
+    elif alineacion == "right":
+        x += ancho
+
+    return SlotTexto(
+        x=x,
+        y=y + alto - pdfmetrics.getAscent(fuente, tamano),
+        fuente=fuente,
+        tamano=tamano,
+        color=HexColor(estilo.color or "#000000"),
+        alineacion=alineacion,
+        contenido=elemento.get("contenido", "") or "",
+        campo_nombre=elemento.get("campo_nombre", "") or "",
+        ancho=ancho,
+        interlineado=tamano * INTERLINEADO if alto >= 2 * tamano * INTERLINEADO else 0.0
+    )
+
+
+def compilar_plantilla(
+    uuid_plantilla: str,
+    version: int,
+    canvas_config: Dict[str, Any],
+    ancho_canvas: float,
+    alto_canvas: float
+) -> PlanRender:
+    """Convertir canvas_config en un plan de renderizado inmutable"""
+    textos_estaticos, imagenes, campos, codigos_barras = [], [], [], []
+
+    for elemento in canvas_config.get("elementos", []):
+        tipo = elemento.get("tipo")
+
+        if tipo == "texto_plano":
+            slot = _compilar_texto(elemento, alto_canvas)
+            if slot.contenido:
+                textos_estaticos.append(slot)
+
+        elif tipo == "campo_bd":
+            campos.append(_compilar_texto(elemento, alto_canvas))
+
+        elif tipo == "imagen":
+            ruta = resolver_ruta_imagen(elemento.get("ruta_imagen", "") or "")
+            if ruta and os.path.exists(ruta):
+                x, y, ancho, alto = _caja(elemento, alto_canvas)
+                imagenes.append(SlotImagen(
+                    ruta=ruta, x=x, y=y, ancho=ancho, alto=alto,
+                    mantener_aspecto=elemento.get("mantener_aspecto", True)
+                ))
+
+        elif tipo == "codigo_barras":
+            estilo = elemento.get("estilo") or {}
+            x, y, ancho, alto = _caja(elemento, alto_canvas)
+            codigos_barras.append(SlotCodigoBarras(
+                campo_nombre=elemento.get("campo_nombre", ""),
+                x=x, y=y, ancho=ancho, alto=alto,
+                formato=estilo.get("formato", "CODE128").lower(),
+                mostrar_texto=estilo.get("mostrar_texto", True),
+                tamano_texto=estilo.get("tamano_texto", 10)
+            ))
+
+    config_global = canvas_config.get("configuracion_global") or {}
+    color_fondo = config_global.get("color_fondo")
+
+    return PlanRender(
+        uuid_plantilla=str(uuid_plantilla),
+        version=int(version or 1),
+        ancho=ancho_canvas * cm,
+        alto=alto_canvas * cm,
+        color_fondo=HexColor(color_fondo) if color_fondo and color_fondo.upper() != "#FFFFFF" else None,
+        textos_estaticos=tuple(textos_estaticos),
+        imagenes=tuple(imagenes),
+        campos=tuple(campos),
+        codigos_barras=tuple(codigos_barras)
+    )
+
+
+# Cache LRU de planes por proceso, clave (uuid_plantilla, version)
+_planes: "OrderedDict[Tuple[str, int], PlanRender]" = OrderedDict()
+_planes_lock = threading.Lock()
+
+
+def obtener_plan(
+    uuid_plantilla: str,
+    version: int,
+    canvas_config: Dict[str, Any],
+    ancho_canvas: float,
+    alto_canvas: float
+) -> PlanRender:
+    """Obtener el plan compilado de una plantilla, compilándolo si no está en cache"""
+    clave = (str(uuid_plantilla), int(version or 1))
+
+    with _planes_lock:
+        plan = _planes.get(clave)
+        if plan:
+            _planes.move_to_end(clave)
+            return plan
+
+    plan = compilar_plantilla(uuid_plantilla, version, canvas_config, ancho_canvas, alto_canvas)
+
+    with _planes_lock:
+        _planes[clave] = plan
+        _planes.move_to_end(clave)
+        while len(_planes) > settings.PLANES_CACHE_MAX:
+            _planes.popitem(last=False)
+
+    return plan
+
+
+def plan_de_plantilla(plantilla) -> PlanRender:
+    """Atajo para obtener el plan a partir del modelo Plantilla"""
+    return obtener_plan(
+        plantilla.uuid_plantilla,
+        plantilla.version,
+        plantilla.canvas_config,
+        float(plantilla.ancho_canvas),
+        float(plantilla.alto_canvas)
+    )
@@ -1,9 +1,10 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, text
 from fastapi import HTTPException, status
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import date
+import io
 import uuid
-import random
 
 from app.models.plantilla import Plantilla
 from app.models.proyecto import Proyecto
@@ -14,6 +15,12 @@ from app.schemas.plantilla import (
     CamposPadronResponse, PreviewDataResponse
 )
 from app.services.bitacora_service import BitacoraService
+from app.services.listados_service import ListadosService
+from app.services.padron_registry import padron_registry
+from app.services.miniaturas import programador_miniaturas, renderizar_png
+from app.services.folios import formatear_codebar, formatear_folio
+from app.services.plantilla_compiler import formatear_valor, plan_de_plantilla
+from app.services.render_service import renderizar_documento
 
 class PlantillaService:
     
@@ -21,63 +28,21 @@ class PlantillaService:
     def get_all_by_proyecto(db: Session, proyecto_uuid: uuid.UUID) -> List[PlantillaResponse]:
         """Obtener todas las plantillas de un proyecto"""
         
-        plantillas = db.query(Plantilla).filter(
-            and_(
-                Plantilla.uuid_proyecto == proyecto_uuid,
-                Plantilla.is_deleted == False
-            )
-        ).all()
-        
-        result = []
-        for plantilla in plantillas:
-            # Obtener info del proyecto y padrón
-            proyecto = db.query(Proyecto).filter(
-                Proyecto.uuid_proyecto == plantilla.uuid_proyecto
-            ).first()
-            
-            padron = db.query(IdentificadorPadron).filter(
-                IdentificadorPadron.uuid_padron == plantilla.uuid_padron
-            ).first()
-            
-            plantilla_dict = PlantillaResponse.model_validate(plantilla).__dict__
-            plantilla_dict['nombre_proyecto'] = proyecto.nombre_proyecto if proyecto else None
-            plantilla_dict['nombre_padron'] = padron.nombre_padron if padron else None
-            
-            result.append(PlantillaResponse(**plantilla_dict))
-        
-        return result
+        return ListadosService.plantillas(db, proyecto_uuid=proyecto_uuid)
     
     @staticmethod
     def get_by_uuid(db: Session, plantilla_uuid: uuid.UUID) -> PlantillaResponse:
         """Obtener plantilla por UUID"""
         
-        plantilla = db.query(Plantilla).filter(
-            and_(
-                Plantilla.uuid_plantilla == plantilla_uuid,
-                Plantilla.is_deleted == False
-            )
-        ).first()
+        plantillas = ListadosService.plantillas(db, plantilla_uuid=plantilla_uuid)
         
-        if not plantilla:
+        if not plantillas:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Plantilla no encontrada"
             )
         
-        # Obtener info del proyecto y padrón
-        proyecto = db.query(Proyecto).filter(
-            Proyecto.uuid_proyecto == plantilla.uuid_proyecto
-        ).first()
-        
-        padron = db.query(IdentificadorPadron).filter(
-            IdentificadorPadron.uuid_padron == plantilla.uuid_padron
-        ).first()
-        
-        plantilla_dict = PlantillaResponse.model_validate(plantilla).__dict__
-        plantilla_dict['nombre_proyecto'] = proyecto.nombre_proyecto if proyecto else None
-        plantilla_dict['nombre_padron'] = padron.nombre_padron if padron else None
-        
-        return PlantillaResponse(**plantilla_dict)
+        return plantillas[0]
     
     @staticmethod
     def create(
@@ -113,6 +78,8 @@ class PlantillaService:
                 detail="Padrón no encontrado"
             )
         
+        PlantillaService._validar_campos(padron.nombre_padron, plantilla_data.canvas_config.model_dump())
+        
         # Verificar que no exista una plantilla con el mismo nombre en el proyecto
         existing = db.query(Plantilla).filter(
             and_(
@@ -145,6 +112,8 @@ class PlantillaService:
         db.commit()
         db.refresh(nueva_plantilla)
         
+        programador_miniaturas.programar(nueva_plantilla.uuid_plantilla, nueva_plantilla.version)
+        
         # Registrar en bitácora
         BitacoraService.registrar(
             db=db,
@@ -159,11 +128,7 @@ class PlantillaService:
             ip_address=ip_address
         )
         
-        plantilla_dict = PlantillaResponse.model_validate(nueva_plantilla).__dict__
-        plantilla_dict['nombre_proyecto'] = proyecto.nombre_proyecto
-        plantilla_dict['nombre_padron'] = padron.nombre_padron
-        
-        return PlantillaResponse(**plantilla_dict)
+        return PlantillaService.get_by_uuid(db, nueva_plantilla.uuid_plantilla)
     
     @staticmethod
     def update(
@@ -191,17 +156,33 @@ class PlantillaService:
         # Actualizar campos
         update_data = plantilla_data.model_dump(exclude_unset=True)
         
-        # Si se actualiza canvas_config, incrementar versión
+        # Si cambia el diseño (canvas_config o medidas), incrementar versión
+        cambia_diseno = bool({'canvas_config', 'ancho_canvas', 'alto_canvas'} & update_data.keys())
+        
         if 'canvas_config' in update_data:
-            plantilla.version += 1
+            padron = db.query(IdentificadorPadron).filter(
+                IdentificadorPadron.uuid_padron == plantilla.uuid_padron
+            ).first()
+            PlantillaService._validar_campos(
+                padron.nombre_padron if padron else None,
+                update_data['canvas_config']
+            )
             #update_data['canvas_config'] = update_data['canvas_config'].model_dump()
         
+        if cambia_diseno:
+            plantilla.version += 1
+            # La miniatura anterior ya no corresponde; se genera otra en segundo plano
+            plantilla.thumbnail_path = None
+        
         for field, value in update_data.items():
             setattr(plantilla, field, value)
         
         db.commit()
         db.refresh(plantilla)
         
+        if cambia_diseno:
+            programador_miniaturas.programar(plantilla.uuid_plantilla, plantilla.version)
+        
         # Registrar en bitácora
         BitacoraService.registrar(
             db=db,
@@ -254,50 +235,74 @@ class PlantillaService:
         
         return {"message": "Plantilla eliminada exitosamente"}
     
+    @staticmethod
+    def _validar_campos(nombre_padron: Optional[str], canvas_config: Dict[str, Any]):
+        """
+        Verificar que los campo_nombre de la plantilla existan en el padrón
+
+        Se aceptan las columnas del padrón y de su tabla de detalle y los
+        campos de control; un campo sin nombre (recién agregado en el editor)
+        no se valida.
+        """
+        
+        definicion = padron_registry.obtener(nombre_padron) if nombre_padron else None
+        if not definicion:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al mapear padrón"
+            )
+        
+        validos = set(definicion.campos_plantilla)
+        desconocidos = sorted({
+            elemento.get("campo_nombre")
+            for elemento in canvas_config.get("elementos", [])
+            if elemento.get("tipo") in ("campo_bd", "codigo_barras")
+            and elemento.get("campo_nombre")
+            and elemento.get("campo_nombre") not in validos
+        }, key=str)
+        
+        if desconocidos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campos que no existen en el padrón {nombre_padron}: {', '.join(map(str, desconocidos))}"
+            )
+    
     @staticmethod
     def get_campos_padron(db: Session, nombre_padron: str) -> List[CamposPadronResponse]:
         """Obtener columnas disponibles de un padrón"""
         
-        # Mapear nombre de padrón a nombre de tabla
-        tabla_map = {
-            "TLAJOMULCO_APA": "padron_completo_tlajomulco_apa",
-            "TLAJOMULCO_PREDIAL": "padron_completo_tlajomulco_predial",
-            "GUADALAJARA_PREDIAL": "padron_completo_guadalajara_predial_principal",
-            "GUADALAJARA_LICENCIAS": "padron_completo_guadalajara_licencias_principal",
-            "PENSIONES": "padron_completo_pensiones"
-        }
+        definicion = padron_registry.obtener(nombre_padron)
         
-        tabla_nombre = tabla_map.get(nombre_padron)
-        
-        if not tabla_nombre:
+        if not definicion:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Padrón no reconocido: {nombre_padron}"
             )
         
-        # Obtener columnas de la tabla
-        query = text("""
-            SELECT column_name, data_type
-            FROM information_schema.columns
-            WHERE table_name = :tabla_nombre
-            AND column_name NOT IN ('uuid_padron', 'uuid_proyecto', 'id_proyecto')
-            ORDER BY ordinal_position
-        """)
-        
-        result = db.execute(query, {"tabla_nombre": tabla_nombre})
-        columnas = result.fetchall()
-        
         return [
-            CamposPadronResponse(nombre_columna=col[0], tipo_dato=col[1])
-            for col in columnas
+            CamposPadronResponse(nombre_columna=columna.nombre, tipo_dato=columna.tipo)
+            for columna in definicion.columnas_datos.values()
         ]
     
     @staticmethod
-    def get_preview_data(
+    def _registro_preview(
         db: Session,
-        plantilla_uuid: uuid.UUID
-    ) -> PreviewDataResponse:
-        """Obtener datos aleatorios del padrón para preview"""
+        plantilla_uuid: uuid.UUID,
+        cuenta: Optional[str] = None,
+        desde: Optional[uuid.UUID] = None,
+        direccion: str = "siguiente"
+    ):
+        """
+        Buscar la plantilla y un registro de su padrón
+        
+        Sin parámetros se toma uno al azar: se elige un uuid_padron aleatorio
+        (los uuid_padron son v4, uniformes) y se busca el primero a partir de
+        él con el índice (uuid_proyecto, uuid_padron), sin ordenar el padrón.
+        Con desde se navega al siguiente / anterior en ese mismo orden, y con
+        cuenta se busca esa cuenta. Todo son búsquedas por índice.
+        
+        Devuelve (plantilla, definición del padrón, fila o None).
+        """
         
         plantilla = db.query(Plantilla).filter(
             Plantilla.uuid_plantilla == plantilla_uuid
@@ -320,39 +325,69 @@ class PlantillaService:
                 detail="Padrón no encontrado"
             )
         
-        # Mapear a tabla
-        tabla_map = {
-            "TLAJOMULCO_APA": "padron_completo_tlajomulco_apa",
-            "TLAJOMULCO_PREDIAL": "padron_completo_tlajomulco_predial",
-            "GUADALAJARA_PREDIAL": "padron_completo_guadalajara_predial_principal",
-            "GUADALAJARA_LICENCIAS": "padron_completo_guadalajara_licencias_principal",
-            "PENSIONES": "padron_completo_pensiones"
-        }
-        
-        tabla_nombre = tabla_map.get(padron.nombre_padron)
+        definicion = padron_registry.obtener(padron.nombre_padron)
         
-        if not tabla_nombre:
+        if not definicion:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error al mapear padrón"
             )
         
-        # Obtener registro aleatorio
-        query = text(f"""
-            SELECT *
-            FROM {tabla_nombre}
-            WHERE uuid_proyecto = :uuid_proyecto
-            ORDER BY RANDOM()
-            LIMIT 1
-        """)
+        tabla_nombre = definicion.tabla
+        
+        parametros = {"uuid_proyecto": str(plantilla.uuid_proyecto)}
+        
+        if cuenta:
+            condicion, orden = f"{definicion.columna_cuenta} = :cuenta", "uuid_padron"
+            parametros["cuenta"] = cuenta
+        elif desde and direccion == "anterior":
+            condicion, orden = "uuid_padron < :desde", "uuid_padron DESC"
+            parametros["desde"] = str(desde)
+        elif desde:
+            condicion, orden = "uuid_padron > :desde", "uuid_padron"
+            parametros["desde"] = str(desde)
+        else:
+            condicion, orden = "uuid_padron >= :desde", "uuid_padron"
+            parametros["desde"] = str(uuid.uuid4())
+        
+        def _buscar(condicion: str):
+            return db.execute(
+                text(f"""
+                    SELECT *
+                    FROM {tabla_nombre}
+                    WHERE uuid_proyecto = :uuid_proyecto
+                    AND {condicion}
+                    ORDER BY {orden}
+                    LIMIT 1
+                """),
+                parametros
+            ).fetchone()
+        
+        row = _buscar(condicion)
+        
+        # Al pasar del último (o antes del primero) se da la vuelta
+        if not row and not cuenta:
+            row = _buscar("TRUE")
+        
+        return plantilla, definicion, row
+    
+    @staticmethod
+    def get_preview_data(
+        db: Session,
+        plantilla_uuid: uuid.UUID,
+        cuenta: Optional[str] = None,
+        desde: Optional[uuid.UUID] = None,
+        direccion: str = "siguiente"
+    ) -> PreviewDataResponse:
+        """Obtener un registro del padrón para preview (ver _registro_preview)"""
         
-        result = db.execute(query, {"uuid_proyecto": str(plantilla.uuid_proyecto)})
-        row = result.fetchone()
+        _, _, row = PlantillaService._registro_preview(db, plantilla_uuid, cuenta, desde, direccion)
         
         if not row:
             return PreviewDataResponse(
                 datos={},
-                mensaje="No hay datos en el padrón para este proyecto"
+                mensaje=f"No se encontró la cuenta {cuenta}" if cuenta
+                else "No hay datos en el padrón para este proyecto"
             )
         
         # Convertir a diccionario
@@ -365,4 +400,48 @@ class PlantillaService:
             elif hasattr(value, 'isoformat'):
                 datos[key] = value.isoformat()
         
-        return PreviewDataResponse(datos=datos)
\ No newline at end of file
+        return PreviewDataResponse(datos=datos)
+    
+    @staticmethod
+    def render_preview(
+        db: Session,
+        plantilla_uuid: uuid.UUID,
+        cuenta: Optional[str] = None,
+        formato: str = "pdf",
+        ancho_px: int = 800
+    ) -> Tuple[bytes, str]:
+        """
+        Renderizar un registro con la plantilla, en memoria
+        
+        Usa el mismo plan compilado que la emisión (cache por uuid y versión,
+        que la miniatura ya deja caliente al guardar) y el cache de imágenes
+        del proceso, así que solo se dibujan los campos del registro.
+        Los campos de control llevan valores de muestra (folio 0, visita 1).
+        Devuelve (contenido, media type).
+        """
+        
+        plantilla, definicion, row = PlantillaService._registro_preview(db, plantilla_uuid, cuenta)
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No se encontró la cuenta {cuenta}" if cuenta
+                else "No hay datos en el padrón para este proyecto"
+            )
+        
+        datos = dict(row._mapping)
+        cuenta_registro = formatear_valor(datos.get(definicion.columna_cuenta))
+        datos.setdefault("visita", 1)
+        datos.setdefault("folio", formatear_folio(0))
+        datos.setdefault("codebar", formatear_codebar(cuenta_registro, 0, "N", 1))
+        datos.setdefault("fecha_emision", date.today())
+        
+        plan = plan_de_plantilla(plantilla)
+        salida = io.BytesIO()
+        
+        if formato == "png":
+            renderizar_png(plan, datos, ancho_px).save(salida, format="PNG")
+            return salida.getvalue(), "image/png"
+        
+        renderizar_documento(plan, datos, salida)
+        return salida.getvalue(), "application/pdf"
@@ -0,0 +1,56 @@
+"""
+Cache de usuarios autenticados (principales) por username
+
+get_current_user consultaba usuarios en cada petición, incluido el sondeo
+del progreso de emisión. Aquí se guarda el usuario (desprendido de su
+sesión) unos segundos por proceso. El estado que autoriza la petición
+(is_active, is_deleted, bloqueado_hasta) se revisa sobre la copia en cada
+llamada; quien cambie ese estado debe llamar a invalidar(). En despliegues
+con varios procesos, los demás lo verán al vencer el TTL.
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+import threading
+import time
+
+from app.core.config import settings
+from app.models.usuario import Usuario
+
+
+class CachePrincipales:
+
+    def __init__(self, ttl_segundos: float, maximo: int):
+        self.ttl_segundos = ttl_segundos
+        self.maximo = maximo
+        self._usuarios: "OrderedDict[str, Tuple[Usuario, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, username: str) -> Optional[Usuario]:
+        with self._lock:
+            entrada = self._usuarios.get(username)
+            if entrada is None:
+                return None
+            usuario, vence = entrada
+            if vence <= time.monotonic():
+                del self._usuarios[username]
+                return None
+            self._usuarios.move_to_end(username)
+            return usuario
+
+    def guardar(self, usuario: Usuario) -> None:
+        with self._lock:
+            self._usuarios[usuario.username] = (usuario, time.monotonic() + self.ttl_segundos)
+            self._usuarios.move_to_end(usuario.username)
+            while len(self._usuarios) > self.maximo:
+                self._usuarios.popitem(last=False)
+
+    def invalidar(self, username: str) -> None:
+        with self._lock:
+            self._usuarios.pop(username, None)
+
+    def invalidar_todo(self) -> None:
+        with self._lock:
+            self._usuarios.clear()
+
+
+cache_principales = CachePrincipales(settings.PRINCIPALES_CACHE_TTL_SEG, settings.PRINCIPALES_CACHE_MAX)
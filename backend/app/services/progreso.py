@@ -0,0 +1,234 @@
+"""
+Canal en proceso para el avance de las sesiones de emisión
+
+La emisión publica el estado de la sesión (contadores y estado) cada vez que
+guarda un lote; el canal guarda solo el último por sesión, le agrega la
+velocidad (registros/s con promedio exponencial) y el tiempo restante, y
+avisa a los suscriptores (websockets). Cada suscriptor envía a lo más un
+mensaje por intervalo con el último estado, así una emisión grande no
+satura a los clientes y nadie consulta la tabla en ciclo.
+
+La emisión puede correr en otro proceso (otra réplica de la API o los
+workers de app.workers.emision): cada cambio de la sesión hace NOTIFY en
+CANAL_NOTIFY y EscuchaProgreso, en cada proceso de la API, lee los
+contadores y los publica en el mismo canal.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import logging
+import math
+import select
+import threading
+import time
+
+from app.core.config import settings
+from app.core.database import engine
+from app.schemas.emision import ProgresoEmision
+
+logger = logging.getLogger(__name__)
+
+# Estados en los que la sesión ya no avanza
+ESTADOS_FINALES = ("COMPLETADA", "ERROR", "CANCELADA")
+
+# Últimos eventos finales que se conservan para quien se conecte tarde
+MAX_FINALES = 100
+
+# Canal de LISTEN/NOTIFY por el que los workers externos avisan su avance
+CANAL_NOTIFY = "emision_progreso"
+
+
+@dataclass
+class _Avance:
+    evento: Dict[str, Any]
+    procesados: int = 0
+    momento: float = field(default_factory=time.monotonic)
+    velocidad: Optional[float] = None
+
+
+class CanalProgreso:
+    """
+    Último evento de cada sesión y sus suscriptores
+
+    publicar() se llama desde el hilo de la emisión; los suscriptores son
+    asyncio.Event de los websockets y se activan con call_soon_threadsafe.
+    """
+
+    def __init__(self, vida_media_segundos: float):
+        # Vida media del promedio: una medición pesa la mitad tras ese tiempo
+        self.tau = vida_media_segundos / math.log(2)
+        self._avances: Dict[str, _Avance] = {}
+        self._finales: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._suscriptores: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def publicar(self, uuid_sesion, evento: Dict[str, Any]) -> None:
+        """Publicar el estado de una sesión (se puede llamar desde cualquier hilo)"""
+        clave = str(uuid_sesion)
+        ahora = time.monotonic()
+        procesados = evento.get("registros_procesados") or 0
+
+        with self._lock:
+            avance = self._avances.get(clave)
+            estado = evento.get("estado")
+            final = self._finales.get(clave)
+            if avance is None and final and (final["estado"], final.get("registros_procesados")) == (estado, procesados):
+                # El mismo cierre llega también por NOTIFY (escucha_progreso): se conserva el primero
+                return
+            if avance is None or (
+                estado not in ESTADOS_FINALES and not estado == avance.evento.get("estado") == "PROCESANDO"
+            ):
+                # Al empezar (o reanudar) a procesar la velocidad se vuelve a medir; la cola no cuenta
+                avance = self._avances[clave] = _Avance(evento=evento, procesados=procesados, momento=ahora)
+            elif procesados > avance.procesados and ahora > avance.momento:
+                transcurrido = ahora - avance.momento
+                instantanea = (procesados - avance.procesados) / transcurrido
+                if avance.velocidad is None:
+                    avance.velocidad = instantanea
+                else:
+                    peso = 1 - math.exp(-transcurrido / self.tau)
+                    avance.velocidad += peso * (instantanea - avance.velocidad)
+                avance.procesados, avance.momento = procesados, ahora
+
+            total = evento.get("total_registros")
+            velocidad = avance.velocidad
+            avance.evento = {
+                **evento,
+                "registros_por_segundo": round(velocidad, 1) if velocidad else None,
+                "eta_segundos": (
+                    round(max(total - procesados, 0) / velocidad)
+                    if velocidad and total is not None and estado not in ESTADOS_FINALES
+                    else None
+                ),
+                "momento": datetime.utcnow().isoformat()
+            }
+
+            if estado in ESTADOS_FINALES:
+                del self._avances[clave]
+                self._finales[clave] = avance.evento
+                while len(self._finales) > MAX_FINALES:
+                    self._finales.popitem(last=False)
+
+            suscriptores = list(self._suscriptores.get(clave, ()))
+
+        for loop, aviso in suscriptores:
+            loop.call_soon_threadsafe(aviso.set)
+
+    def ultimo(self, uuid_sesion) -> Optional[Dict[str, Any]]:
+        """Último evento publicado de la sesión (None si no está corriendo en este proceso)"""
+        clave = str(uuid_sesion)
+        with self._lock:
+            avance = self._avances.get(clave)
+            if avance:
+                return avance.evento
+            return self._finales.get(clave)
+
+    def olvidar(self, uuid_sesion) -> None:
+        """Descartar el avance de una sesión que este proceso dejó de renderizar (sin evento final)"""
+        with self._lock:
+            self._avances.pop(str(uuid_sesion), None)
+
+    def suscribir(self, uuid_sesion) -> asyncio.Event:
+        """Registrar un suscriptor del event loop actual; el evento se activa con cada publicación"""
+        aviso = asyncio.Event()
+        with self._lock:
+            self._suscriptores.setdefault(str(uuid_sesion), []).append((asyncio.get_running_loop(), aviso))
+        return aviso
+
+    def desuscribir(self, uuid_sesion, aviso: asyncio.Event) -> None:
+        clave = str(uuid_sesion)
+        with self._lock:
+            restantes = [s for s in self._suscriptores.get(clave, ()) if s[1] is not aviso]
+            if restantes:
+                self._suscriptores[clave] = restantes
+            else:
+                self._suscriptores.pop(clave, None)
+
+
+class EscuchaProgreso:
+    """
+    LISTEN de los avisos de avance de otros procesos hacia canal_progreso
+
+    Un hilo con una conexión propia en autocommit espera los NOTIFY con
+    select(); los avisos de un intervalo se juntan y los contadores de todas
+    las sesiones avisadas se leen en una sola consulta. Si la conexión se
+    pierde se vuelve a abrir.
+    """
+
+    def __init__(self, canal: CanalProgreso, intervalo_segundos: float):
+        self.canal = canal
+        self.intervalo_segundos = intervalo_segundos
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="escucha-progreso", daemon=True)
+            self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+    def _ciclo(self) -> None:
+        while not self._detener.is_set():
+            try:
+                self._escuchar()
+            except Exception:
+                logger.warning("Se perdió la escucha de avance de emisión; reintentando", exc_info=True)
+                self._detener.wait(5)
+
+    def _escuchar(self) -> None:
+        # Fuera del pool: la conexión queda tomada mientras viva el hilo
+        conexion = engine.raw_connection()
+        conexion.detach()
+        try:
+            driver = conexion.driver_connection
+            driver.rollback()
+            driver.autocommit = True
+            cursor = driver.cursor()
+            cursor.execute(f"LISTEN {CANAL_NOTIFY}")
+
+            avisadas: Set[str] = set()
+            ultimo = 0.0
+            while not self._detener.is_set():
+                restante = self.intervalo_segundos - (time.monotonic() - ultimo)
+                espera = max(restante, 0) if avisadas else self.intervalo_segundos
+                if select.select([driver], [], [], espera)[0]:
+                    driver.poll()
+                    while driver.notifies:
+                        avisadas.add(driver.notifies.pop(0).payload)
+
+                if avisadas and time.monotonic() - ultimo >= self.intervalo_segundos:
+                    self._publicar(cursor, avisadas)
+                    avisadas = set()
+                    ultimo = time.monotonic()
+        finally:
+            conexion.close()
+
+    def _publicar(self, cursor, sesiones: Set[str]) -> None:
+        cursor.execute(
+            """
+            SELECT uuid_sesion, estado, total_registros, registros_procesados,
+                   registros_exitosos, registros_con_error
+            FROM sesiones_emision
+            WHERE uuid_sesion = ANY(%s::uuid[])
+            """,
+            (list(sesiones),)
+        )
+        columnas = [d[0] for d in cursor.description]
+        for fila in cursor.fetchall():
+            evento = ProgresoEmision.model_validate(dict(zip(columnas, fila)))
+            self.canal.publicar(
+                evento.uuid_sesion,
+                evento.model_dump(mode="json", exclude={"registros_por_segundo", "eta_segundos", "momento"})
+            )
+
+
+canal_progreso = CanalProgreso(settings.PROGRESO_VIDA_MEDIA_SEG)
+escucha_progreso = EscuchaProgreso(canal_progreso, settings.PROGRESO_INTERVALO_SEG)
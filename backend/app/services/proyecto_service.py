@@ -12,6 +12,7 @@ from app.models.padron import IdentificadorPadron
 from app.models.usuario import Usuario
 from app.schemas.proyecto import ProyectoCreate, ProyectoUpdate, ProyectoResponse, PadronResponse
 from app.services.bitacora_service import BitacoraService
+from app.services.listados_service import ListadosService
 from app.core.config import settings
 
 class ProyectoService:
@@ -20,52 +21,21 @@ class ProyectoService:
     def get_all_proyectos(db: Session, usuario_uuid: uuid.UUID, include_deleted: bool = False) -> List[ProyectoResponse]:
         """Obtener todos los proyectos"""
         
-        query = db.query(Proyecto).join(IdentificadorPadron)
-        
-        if not include_deleted:
-            query = query.filter(Proyecto.is_deleted == False)
-        
-        proyectos = query.all()
-        
-        # Mapear con nombre de padrón
-        result = []
-        for proyecto in proyectos:
-            padron = db.query(IdentificadorPadron).filter(
-                IdentificadorPadron.uuid_padron == proyecto.uuid_padron
-            ).first()
-            
-            proyecto_dict = ProyectoResponse.model_validate(proyecto).__dict__
-            proyecto_dict['nombre_padron'] = padron.nombre_padron if padron else None
-            result.append(ProyectoResponse(**proyecto_dict))
-        
-        return result
+        return ListadosService.proyectos(db, include_deleted=include_deleted)
     
     @staticmethod
     def get_proyecto_by_uuid(db: Session, proyecto_uuid: uuid.UUID) -> ProyectoResponse:
         """Obtener proyecto por UUID"""
         
-        proyecto = db.query(Proyecto).filter(
-            and_(
-                Proyecto.uuid_proyecto == proyecto_uuid,
-                Proyecto.is_deleted == False
-            )
-        ).first()
+        proyectos = ListadosService.proyectos(db, proyecto_uuid=proyecto_uuid)
         
-        if not proyecto:
+        if not proyectos:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Proyecto no encontrado"
             )
         
-        # Obtener nombre del padrón
-        padron = db.query(IdentificadorPadron).filter(
-            IdentificadorPadron.uuid_padron == proyecto.uuid_padron
-        ).first()
-        
-        proyecto_dict = ProyectoResponse.model_validate(proyecto).__dict__
-        proyecto_dict['nombre_padron'] = padron.nombre_padron if padron else None
-        
-        return ProyectoResponse(**proyecto_dict)
+        return proyectos[0]
     
     @staticmethod
     def create_proyecto(
@@ -107,7 +77,6 @@ class ProyectoService:
             descripcion=proyecto_data.descripcion,
             uuid_padron=proyecto_data.uuid_padron,
             usuario_creador=usuario.uuid_usuario,
-            en_emision=False,
             is_deleted=False
         )
         
@@ -129,10 +98,7 @@ class ProyectoService:
             ip_address=ip_address
         )
         
-        proyecto_dict = ProyectoResponse.model_validate(nuevo_proyecto).__dict__
-        proyecto_dict['nombre_padron'] = padron.nombre_padron
-        
-        return ProyectoResponse(**proyecto_dict)
+        return ProyectoService.get_proyecto_by_uuid(db, nuevo_proyecto.uuid_proyecto)
     
     @staticmethod
     def update_proyecto(
@@ -184,14 +150,7 @@ class ProyectoService:
             ip_address=ip_address
         )
         
-        padron = db.query(IdentificadorPadron).filter(
-            IdentificadorPadron.uuid_padron == proyecto.uuid_padron
-        ).first()
-        
-        proyecto_dict = ProyectoResponse.model_validate(proyecto).__dict__
-        proyecto_dict['nombre_padron'] = padron.nombre_padron if padron else None
-        
-        return ProyectoResponse(**proyecto_dict)
+        return ProyectoService.get_proyecto_by_uuid(db, proyecto.uuid_proyecto)
     
     @staticmethod
     def delete_proyecto(
@@ -240,7 +199,7 @@ class ProyectoService:
         return {"message": "Proyecto eliminado exitosamente"}
     
     @staticmethod
-    async def upload_logo(
+    def upload_logo(
         db: Session,
         proyecto_uuid: uuid.UUID,
         file: UploadFile,
@@ -312,14 +271,7 @@ class ProyectoService:
             detalles={"filename": new_filename}
         )
         
-        padron = db.query(IdentificadorPadron).filter(
-            IdentificadorPadron.uuid_padron == proyecto.uuid_padron
-        ).first()
-        
-        proyecto_dict = ProyectoResponse.model_validate(proyecto).__dict__
-        proyecto_dict['nombre_padron'] = padron.nombre_padron if padron else None
-        
-        return ProyectoResponse(**proyecto_dict)
+        return ProyectoService.get_proyecto_by_uuid(db, proyecto.uuid_proyecto)
     
     @staticmethod
     def get_all_padrones(db: Session) -> List[PadronResponse]:
@@ -0,0 +1,189 @@
+from reportlab.pdfgen import canvas
+from reportlab.lib.utils import ImageReader
+from barcode import get_barcode_class
+from barcode.writer import ImageWriter
+from typing import BinaryIO, Dict, Any, List, Optional, Sequence, Tuple, Union
+import time
+
+from app.services.codigo_barras import dibujar_code128
+from app.services.fuentes import ancho_texto, lineas_texto
+from app.services.imagen_cache import dibujar_imagen
+from app.services.plantilla_compiler import (
+    PlanRender, SlotTexto, SlotCodigoBarras, obtener_plan, formatear_valor
+)
+
+# Estado del proceso worker (se asigna en inicializar_worker): plan,
+# índice de columnas del padrón y campos de control comunes a la sesión
+_plan_worker: Dict[str, Any] = {}
+
+
+class Registro:
+    """
+    Vista de solo lectura sobre una fila del padrón
+
+    La fila llega como tupla; los nombres se resuelven con el índice de
+    columnas compartido del worker, sin crear un dict por registro.
+    """
+    __slots__ = ("valores", "extras", "indice", "constantes")
+
+    def __init__(
+        self,
+        valores: Sequence[Any],
+        extras: Dict[str, Any],
+        indice: Dict[str, int],
+        constantes: Dict[str, Any]
+    ):
+        self.valores = valores
+        self.extras = extras
+        self.indice = indice
+        self.constantes = constantes
+
+    def get(self, campo: Optional[str], default: Any = None) -> Any:
+        if campo in self.extras:
+            return self.extras[campo]
+        posicion = self.indice.get(campo)
+        if posicion is not None:
+            return self.valores[posicion]
+        return self.constantes.get(campo, default)
+
+
+def _dibujar_texto(c: canvas.Canvas, slot: SlotTexto, texto: str):
+    """Dibujar texto en un slot ya posicionado (partido en líneas si la caja lo permite)"""
+    if not texto:
+        return
+
+    c.setFont(slot.fuente, slot.tamano)
+    c.setFillColor(slot.color)
+
+    y = slot.y
+    for linea in lineas_texto(texto, slot.fuente, slot.tamano, slot.ancho, slot.interlineado):
+        x = slot.x
+        if slot.alineacion != "left":
+            # Ancho memorizado en lugar de drawCentredString / drawRightString
+            ancho = ancho_texto(linea, slot.fuente, slot.tamano)
+            x -= ancho / 2 if slot.alineacion == "center" else ancho
+        c.drawString(x, y, linea)
+        y -= slot.interlineado
+
+
+def _dibujar_codigo_barras(c: canvas.Canvas, slot: SlotCodigoBarras, valor: str):
+    if not valor:
+        return
+
+    if slot.formato == "code128":
+        dibujar_code128(
+            c, valor, slot.x, slot.y, slot.ancho, slot.alto,
+            mostrar_texto=slot.mostrar_texto, tamano_texto=slot.tamano_texto
+        )
+        return
+
+    # Otros formatos: imagen generada con python-barcode
+    imagen = get_barcode_class(slot.formato)(valor, writer=ImageWriter()).render({
+        "write_text": slot.mostrar_texto,
+        "font_size": slot.tamano_texto,
+        "quiet_zone": 1,
+    })
+    c.drawImage(ImageReader(imagen), slot.x, slot.y, width=slot.ancho, height=slot.alto)
+
+
+def _definir_estaticos(c: canvas.Canvas, plan: PlanRender):
+    """Dibujar fondo, textos fijos e imágenes una sola vez como form XObject del documento"""
+    c.beginForm(plan.nombre_form, 0, 0, plan.ancho, plan.alto)
+
+    if plan.color_fondo:
+        c.setFillColor(plan.color_fondo)
+        c.rect(0, 0, plan.ancho, plan.alto, stroke=0, fill=1)
+
+    for imagen in plan.imagenes:
+        dibujar_imagen(c, imagen.ruta, imagen.x, imagen.y, imagen.ancho, imagen.alto, imagen.mantener_aspecto)
+
+    for slot in plan.textos_estaticos:
+        _dibujar_texto(c, slot, slot.contenido)
+
+    c.endForm()
+
+
+def dibujar_pagina(c: canvas.Canvas, plan: PlanRender, datos: Union[Dict[str, Any], Registro]):
+    """Dibujar un registro en la página actual: form estático + campos variables"""
+    if not c.hasForm(plan.nombre_form):
+        _definir_estaticos(c, plan)
+    c.doForm(plan.nombre_form)
+
+    for slot in plan.campos:
+        _dibujar_texto(c, slot, formatear_valor(datos.get(slot.campo_nombre)))
+
+    for slot in plan.codigos_barras:
+        _dibujar_codigo_barras(c, slot, formatear_valor(datos.get(slot.campo_nombre)))
+
+
+def renderizar_documento(
+    plan: PlanRender,
+    datos: Union[Dict[str, Any], Registro],
+    ruta_pdf: Union[str, BinaryIO]
+) -> None:
+    """Generar el PDF de un registro (en un archivo o en un buffer en memoria)"""
+    c = canvas.Canvas(ruta_pdf, pagesize=(plan.ancho, plan.alto))
+    dibujar_pagina(c, plan, datos)
+    c.showPage()
+    c.save()
+
+
+def inicializar_worker(
+    uuid_plantilla: str,
+    version: int,
+    canvas_config: Dict[str, Any],
+    ancho_canvas: float,
+    alto_canvas: float,
+    columnas: Sequence[str] = (),
+    constantes: Optional[Dict[str, Any]] = None
+):
+    """
+    Inicializador del pool: compila (o toma del cache) la plantilla de este proceso
+
+    columnas es el orden de las tuplas del padrón que llegarán en las tareas;
+    constantes son los campos de control iguales para toda la sesión.
+    """
+    _plan_worker["plan"] = obtener_plan(uuid_plantilla, version, canvas_config, ancho_canvas, alto_canvas)
+    _plan_worker["indice"] = {columna: i for i, columna in enumerate(columnas)}
+    _plan_worker["constantes"] = dict(constantes or {})
+
+
+def renderizar_registro(tarea: Tuple[int, str, str, int, str, str, Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Renderizar un registro en el proceso worker y reportar el resultado
+
+    tarea: (orden_impresion, cuenta, codebar, visita, folio, ruta_pdf, fila del padrón)
+    """
+    orden, cuenta, codebar, visita, folio, ruta_pdf, valores = tarea
+    inicio = time.perf_counter()
+    resultado = {
+        "orden_impresion": orden,
+        "cuenta": cuenta,
+        "codebar": codebar,
+        "visita": visita,
+        "folio": folio,
+        "ruta_pdf": ruta_pdf,
+        "exitoso": True,
+        "mensaje_error": None,
+    }
+
+    datos = Registro(
+        valores,
+        {"codebar": codebar, "visita": visita, "folio": folio, "orden_impresion": orden},
+        _plan_worker["indice"],
+        _plan_worker["constantes"]
+    )
+
+    try:
+        renderizar_documento(_plan_worker["plan"], datos, ruta_pdf)
+    except Exception as e:
+        resultado["exitoso"] = False
+        resultado["mensaje_error"] = str(e)
+
+    resultado["tiempo_ms"] = int((time.perf_counter() - inicio) * 1000)
+    return resultado
+
+
+def renderizar_lote(tareas: List[tuple]) -> List[Dict[str, Any]]:
+    """Renderizar varias tareas en un solo envío al worker"""
+    return [renderizar_registro(tarea) for tarea in tareas]
@@ -0,0 +1,197 @@
+"""
+Volúmenes de impresión de una sesión de emisión
+
+La imprenta recibe pocos PDFs grandes en orden de ruta en vez de un archivo
+por cuenta. Los registros generados sin error se leen en streaming en orden
+de impresión y cada uno se dibuja como una página del volumen en curso; el
+fondo, las imágenes y los textos fijos se definen una sola vez por volumen
+(form XObject), igual que las fuentes. Un volumen se cierra al llegar a
+VOLUMEN_MAX_PAGINAS o a VOLUMEN_MAX_MB, así la memoria queda acotada por ese
+límite y no por el tamaño de la sesión.
+
+manifiesto.csv relaciona cada codebar con su volumen y página.
+"""
+from reportlab.pdfgen import canvas
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import csv
+import glob
+import os
+import uuid
+
+from app.core.config import settings
+from app.services.padron_lector import LectorPadron
+from app.services.plantilla_compiler import PlanRender
+from app.services.render_service import Registro, dibujar_pagina
+
+DIRECTORIO_VOLUMENES = "volumenes"
+ARCHIVO_MANIFIESTO = "manifiesto.csv"
+COLUMNAS_MANIFIESTO = ("orden_impresion", "codebar", "cuenta", "volumen", "pagina")
+
+
+def directorio_volumenes(ruta_salida: str) -> str:
+    return os.path.join(ruta_salida, DIRECTORIO_VOLUMENES)
+
+
+def nombre_volumen(numero: int) -> str:
+    return f"volumen_{numero:03d}.pdf"
+
+
+@dataclass
+class Volumen:
+    numero: int
+    archivo: str
+    paginas: int
+    bytes: int
+    primer_orden: int
+    ultimo_orden: int
+
+
+class EscritorVolumenes:
+    """
+    Páginas en orden hacia volúmenes PDF, cortando por páginas o tamaño
+
+    reportlab guarda el documento en memoria hasta save(); por eso el
+    volumen se cierra en cuanto llega al límite. El tamaño se estima con el
+    contenido de cada página sin comprimir (cota superior de lo que ocupa
+    ya comprimida); los recursos compartidos se cuentan una vez.
+    """
+
+    def __init__(self, directorio: str, plan: PlanRender, max_paginas: int, max_bytes: int):
+        self.directorio = directorio
+        self.plan = plan
+        self.max_paginas = max_paginas
+        self.max_bytes = max_bytes
+        self.volumenes: List[Volumen] = []
+        self._canvas: Optional[canvas.Canvas] = None
+        self._paginas = 0
+        self._bytes = 0
+        self._primer_orden = 0
+        self._ultimo_orden = 0
+        self._archivo_manifiesto = None
+        self._manifiesto = None
+
+    def __enter__(self) -> "EscritorVolumenes":
+        os.makedirs(self.directorio, exist_ok=True)
+        self._archivo_manifiesto = open(
+            os.path.join(self.directorio, ARCHIVO_MANIFIESTO + ".tmp"), "w", newline="", encoding="utf-8"
+        )
+        self._manifiesto = csv.writer(self._archivo_manifiesto)
+        self._manifiesto.writerow(COLUMNAS_MANIFIESTO)
+        return self
+
+    def __exit__(self, tipo, *exc) -> None:
+        self._archivo_manifiesto.close()
+        if tipo is not None:
+            # Sin volúmenes a medias: se borran los temporales
+            for temporal in glob.glob(os.path.join(self.directorio, "*.tmp")):
+                os.remove(temporal)
+
+    def agregar(self, datos: Registro, orden: int, codebar: str, cuenta: str) -> None:
+        if self._canvas is None:
+            self._abrir(orden)
+
+        dibujar_pagina(self._canvas, self.plan, datos)
+        self._bytes += sum(len(operacion) for operacion in self._canvas._code)
+        self._canvas.showPage()
+        self._paginas += 1
+        self._ultimo_orden = orden
+
+        self._manifiesto.writerow((orden, codebar, cuenta, len(self.volumenes) + 1, self._paginas))
+
+        if self._paginas >= self.max_paginas or self._bytes >= self.max_bytes:
+            self._cerrar_volumen()
+
+    def cerrar(self) -> List[Volumen]:
+        """Guardar el último volumen y publicar el manifiesto"""
+        if self._canvas is not None:
+            self._cerrar_volumen()
+        self._archivo_manifiesto.close()
+        os.replace(
+            os.path.join(self.directorio, ARCHIVO_MANIFIESTO + ".tmp"),
+            os.path.join(self.directorio, ARCHIVO_MANIFIESTO)
+        )
+        return self.volumenes
+
+    def _abrir(self, orden: int) -> None:
+        ruta = os.path.join(self.directorio, nombre_volumen(len(self.volumenes) + 1) + ".tmp")
+        self._canvas = canvas.Canvas(ruta, pagesize=(self.plan.ancho, self.plan.alto))
+        self._paginas = 0
+        self._bytes = 0
+        self._primer_orden = orden
+
+    def _cerrar_volumen(self) -> None:
+        self._canvas.save()
+        numero = len(self.volumenes) + 1
+        archivo = nombre_volumen(numero)
+        ruta = os.path.join(self.directorio, archivo)
+        os.replace(ruta + ".tmp", ruta)
+        self.volumenes.append(Volumen(
+            numero=numero,
+            archivo=archivo,
+            paginas=self._paginas,
+            bytes=os.path.getsize(ruta),
+            primer_orden=self._primer_orden,
+            ultimo_orden=self._ultimo_orden
+        ))
+        self._canvas = None
+
+
+def generar_volumenes(
+    uuid_sesion: uuid.UUID,
+    ruta_salida: str,
+    plan: PlanRender,
+    tabla_nombre: str,
+    columna_cuenta: str,
+    constantes: Dict[str, Any]
+) -> List[Volumen]:
+    """
+    (Re)generar los volúmenes y el manifiesto de una sesión
+
+    Se leen con LectorPadron los registros generados sin error, en orden de
+    impresión; los volúmenes anteriores de la sesión se reemplazan.
+    """
+    directorio = directorio_volumenes(ruta_salida)
+    anteriores = glob.glob(os.path.join(directorio, "volumen_*.pdf"))
+    anteriores += glob.glob(os.path.join(directorio, ARCHIVO_MANIFIESTO))
+    for anterior in anteriores:
+        os.remove(anterior)
+
+    lector = LectorPadron(
+        tabla_nombre,
+        uuid_sesion,
+        tamano_lote=settings.EMISION_LOTE_LECTURA,
+        exitosos=True
+    )
+    escritor = EscritorVolumenes(
+        directorio,
+        plan,
+        max_paginas=settings.VOLUMEN_MAX_PAGINAS,
+        max_bytes=settings.VOLUMEN_MAX_MB * 1024 * 1024
+    )
+
+    with lector, escritor:
+        indice = lector.indice
+        posicion_cuenta = indice[columna_cuenta]
+        posicion_codebar = indice["codebar_asignado"]
+        posicion_visita = indice["visita_asignada"]
+        posicion_folio = indice["folio_asignado"]
+        posicion_orden = indice["orden_impresion"]
+
+        for lote in lector.lotes_anticipados(settings.EMISION_COLA_LOTES):
+            for fila in lote:
+                codebar, orden = fila[posicion_codebar], fila[posicion_orden]
+                datos = Registro(
+                    fila,
+                    {
+                        "codebar": codebar,
+                        "visita": fila[posicion_visita],
+                        "folio": fila[posicion_folio],
+                        "orden_impresion": orden
+                    },
+                    indice,
+                    constantes
+                )
+                escritor.agregar(datos, orden, codebar, str(fila[posicion_cuenta]))
+
+        return escritor.cerrar()
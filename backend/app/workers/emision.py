@@ -0,0 +1,321 @@
+"""
+Worker de emisión independiente de la API
+
+Con EMISION_WORKERS_EXTERNOS la API solo prepara la sesión (emision_temp con
+visita, codebar y orden de impresión asignados) y la deja en PROCESANDO con
+el lease a nombre de EmisionService.PROPIETARIO_WORKERS; los registros los
+renderizan estos procesos, en la misma máquina o en otras que lleguen a la
+base de datos y a OUTPUT_DIR (almacenamiento compartido):
+
+    python -m app.workers.emision --procesos 4
+
+Cada worker reclama un bloque de registros pendientes con
+SELECT ... FOR UPDATE SKIP LOCKED, los renderiza y en la misma transacción
+guarda documentos, marcas de procesado y contadores. Si el worker se cae
+antes del commit, el bloque se libera y lo toma otro; los documentos se
+insertan con ON CONFLICT (codebar) DO NOTHING, así que nunca se duplican.
+Mientras haya workers vivos renuevan el lease de sus sesiones; si todos se
+caen, el lease vence y el planificador de la API la vuelve a entregar.
+El último worker en terminar cierra la sesión y libera el proyecto; si se
+cancela, la cierra cuando ya no queda ningún bloque reclamado en curso.
+
+Para revisar una sesión (documentos faltantes o duplicados):
+
+    python -m app.workers.emision --verificar <uuid_sesion>
+"""
+from sqlalchemy import and_, func, or_, text
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import timedelta
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.emision import SesionEmision
+from app.models.plantilla import Plantilla
+from app.services import render_service
+from app.services.emision_service import EmisionService, LeasePerdido
+from app.services.padron_lector import consulta_registros
+from app.services.padron_registry import DefinicionPadron
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerEmision:
+    """
+    Ciclo de un proceso worker
+
+    Usa una sola sesión de BD durante toda su vida. La sesión de emisión,
+    la plantilla y la definición del padrón se guardan por sesión (no
+    cambian mientras se procesa); el plan compilado se prepara una vez por
+    sesión con render_service.inicializar_worker, igual que en el pool local.
+    """
+
+    def __init__(self, tamano_bloque: int, espera_segundos: float):
+        self.tamano_bloque = tamano_bloque
+        self.espera_segundos = espera_segundos
+        self.db = SessionLocal()
+        self._contextos: Dict[uuid.UUID, Tuple[SesionEmision, Plantilla, DefinicionPadron]] = {}
+        self._inicializado: Optional[Tuple[uuid.UUID, Tuple[str, ...]]] = None
+
+    def cerrar(self) -> None:
+        self.db.close()
+
+    def _sesiones(self) -> List[uuid.UUID]:
+        """
+        Sesiones listas para renderizar, por prioridad y la más antigua primero
+
+        Incluye las canceladas que aún no se cierran: si el worker que tenía
+        el último bloque falló antes de cerrarla, la cierra el siguiente.
+        """
+        sesiones = [
+            fila[0] for fila in self.db.query(SesionEmision.uuid_sesion).filter(
+                or_(
+                    and_(
+                        SesionEmision.estado == "PROCESANDO",
+                        SesionEmision.lease_owner == EmisionService.PROPIETARIO_WORKERS
+                    ),
+                    and_(
+                        SesionEmision.estado == "CANCELADA",
+                        SesionEmision.tiempo_fin.is_(None)
+                    )
+                )
+            ).order_by(SesionEmision.prioridad, SesionEmision.tiempo_inicio).all()
+        ]
+        self.db.commit()
+
+        # Olvidar las sesiones que ya terminaron
+        for terminada in set(self._contextos) - set(sesiones):
+            del self._contextos[terminada]
+        return sesiones
+
+    def _contexto(self, uuid_sesion: uuid.UUID) -> Optional[Tuple[SesionEmision, Plantilla, DefinicionPadron]]:
+        contexto = self._contextos.get(uuid_sesion)
+        if contexto is None:
+            contexto = EmisionService._contexto(self.db, uuid_sesion)
+            if contexto is None:
+                return None
+            sesion, plantilla, _ = contexto
+            # Copias desligadas: los commits de cada bloque no las expiran
+            self.db.expunge(sesion)
+            self.db.expunge(plantilla)
+            os.makedirs(sesion.ruta_salida, exist_ok=True)
+            self._contextos[uuid_sesion] = contexto
+        return contexto
+
+    def procesar_bloque(self, uuid_sesion: uuid.UUID) -> int:
+        """
+        Reclamar, renderizar y guardar un bloque de la sesión
+
+        Devuelve cuántos registros procesó (0 si no quedaba nada libre).
+        """
+        contexto = self._contexto(uuid_sesion)
+        if contexto is None:
+            return 0
+        sesion, plantilla, definicion = contexto
+
+        # Los bloqueos se mantienen hasta el commit de _guardar_resultados
+        EmisionService._bloque_en_curso(self.db, uuid_sesion)
+        resultado = self.db.execute(
+            text(f"""
+                {consulta_registros(definicion.tabla)}
+                WHERE t.uuid_sesion = :uuid_sesion
+                AND t.procesado = FALSE
+                AND EXISTS (
+                    SELECT 1 FROM sesiones_emision s
+                    WHERE s.uuid_sesion = t.uuid_sesion AND s.estado = 'PROCESANDO'
+                    AND s.lease_owner = :workers
+                )
+                ORDER BY t.orden_impresion
+                LIMIT :limite
+                FOR UPDATE OF t SKIP LOCKED
+            """),
+            {
+                "uuid_sesion": str(uuid_sesion),
+                "workers": EmisionService.PROPIETARIO_WORKERS,
+                "limite": self.tamano_bloque
+            }
+        )
+        columnas = tuple(resultado.keys())
+        filas = [tuple(fila) for fila in resultado]
+
+        if not filas:
+            self.db.commit()
+            EmisionService._completar_si_terminada(self.db, uuid_sesion)
+            return 0
+
+        if self._inicializado != (uuid_sesion, columnas):
+            render_service.inicializar_worker(
+                str(plantilla.uuid_plantilla),
+                plantilla.version,
+                plantilla.canvas_config,
+                float(plantilla.ancho_canvas),
+                float(plantilla.alto_canvas),
+                columnas,
+                EmisionService._constantes(sesion)
+            )
+            self._inicializado = (uuid_sesion, columnas)
+
+        posiciones = EmisionService._posiciones(
+            {columna: i for i, columna in enumerate(columnas)},
+            definicion.columna_cuenta
+        )
+        resultados = render_service.renderizar_lote([
+            EmisionService._crear_tarea(sesion, fila, posiciones) for fila in filas
+        ])
+
+        EmisionService._guardar_resultados(
+            self.db, sesion, plantilla, resultados, EmisionService.PROPIETARIO_WORKERS
+        )
+        EmisionService._completar_si_terminada(self.db, uuid_sesion)
+        return len(filas)
+
+    def _latido(self) -> None:
+        """Renovar el lease de las sesiones entregadas a los workers (así el planificador no las retoma)"""
+        self.db.query(SesionEmision).filter(
+            SesionEmision.estado == "PROCESANDO",
+            SesionEmision.lease_owner == EmisionService.PROPIETARIO_WORKERS
+        ).update({
+            SesionEmision.lease_expira: func.now() + timedelta(seconds=settings.EMISION_LEASE_SEG)
+        }, synchronize_session=False)
+        self.db.commit()
+
+    def ejecutar(self) -> None:
+        """Procesar bloques mientras haya; sin trabajo, esperar y volver a buscar"""
+        logger.info("Worker de emisión %s iniciado", os.getpid())
+        ultimo_latido = 0.0
+        while True:
+            procesados = 0
+            try:
+                if time.monotonic() - ultimo_latido >= settings.EMISION_LEASE_SEG / 3:
+                    self._latido()
+                    ultimo_latido = time.monotonic()
+                for uuid_sesion in self._sesiones():
+                    procesados = self.procesar_bloque(uuid_sesion)
+                    if procesados:
+                        break
+            except LeasePerdido:
+                # El planificador retomó la sesión (los workers estuvieron caídos); el bloque se repite
+                self.db.rollback()
+                logger.info("Se perdió el lease de una sesión de emisión; se descarta el bloque")
+            except Exception:
+                # El rollback libera el bloque; otro worker (o este) lo reintenta
+                self.db.rollback()
+                logger.exception("Error al procesar un bloque de emisión")
+            if not procesados:
+                time.sleep(self.espera_segundos)
+
+
+def verificar_sesion(uuid_sesion: uuid.UUID) -> Dict[str, Any]:
+    """Contar documentos faltantes o duplicados de una sesión ya procesada"""
+    db = SessionLocal()
+    try:
+        parametros = {"uuid_sesion": str(uuid_sesion)}
+        conteos = db.execute(
+            text("""
+                SELECT
+                    COUNT(*),
+                    COUNT(*) FILTER (WHERE NOT t.procesado),
+                    COUNT(*) FILTER (WHERE t.procesado AND t.tiene_error),
+                    COUNT(*) FILTER (
+                        WHERE t.procesado AND NOT t.tiene_error
+                        AND NOT EXISTS (SELECT 1 FROM emision_final f WHERE f.codebar = t.codebar)
+                    ),
+                    COUNT(*) - COUNT(DISTINCT t.orden_impresion)
+                FROM emision_temp t
+                WHERE t.uuid_sesion = :uuid_sesion
+            """),
+            parametros
+        ).one()
+        documentos, ordenes_repetidos = db.execute(
+            text("""
+                SELECT COUNT(*), COUNT(*) - COUNT(DISTINCT orden_impresion)
+                FROM emision_final
+                WHERE uuid_sesion = :uuid_sesion
+            """),
+            parametros
+        ).one()
+        archivos_faltantes = sum(
+            1 for (ruta,) in db.execute(
+                text("SELECT ruta_pdf FROM emision_acumulada WHERE uuid_sesion = :uuid_sesion"),
+                parametros
+            )
+            if not os.path.exists(ruta)
+        )
+        sesion = db.query(SesionEmision).filter(SesionEmision.uuid_sesion == uuid_sesion).first()
+    finally:
+        db.close()
+
+    registros, pendientes, con_error, sin_documento, ordenes_temp_repetidos = conteos
+    return {
+        "estado": sesion.estado if sesion else None,
+        "registros": registros,
+        "pendientes": pendientes,
+        "con_error": con_error,
+        "documentos": documentos,
+        "sin_documento": sin_documento,
+        "orden_impresion_repetido": ordenes_temp_repetidos + ordenes_repetidos,
+        "archivos_faltantes": archivos_faltantes,
+        "contadores_ok": bool(sesion) and sesion.registros_exitosos == documentos,
+        "ok": (
+            pendientes == 0 and sin_documento == 0 and archivos_faltantes == 0
+            and ordenes_temp_repetidos + ordenes_repetidos == 0
+            and documentos == registros - con_error
+        )
+    }
+
+
+def _ejecutar_worker(tamano_bloque: int, espera_segundos: float) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    worker = WorkerEmision(tamano_bloque, espera_segundos)
+    try:
+        worker.ejecutar()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.cerrar()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker de emisión (SKIP LOCKED)")
+    parser.add_argument("--procesos", type=int, default=1, help="workers a lanzar en esta máquina")
+    parser.add_argument("--bloque", type=int, default=settings.EMISION_BLOQUE_WORKER)
+    parser.add_argument("--espera", type=float, default=settings.EMISION_WORKER_ESPERA_SEG)
+    parser.add_argument("--verificar", metavar="UUID_SESION", help="revisar una sesión y salir")
+    args = parser.parse_args()
+
+    if args.verificar:
+        reporte = verificar_sesion(uuid.UUID(args.verificar))
+        print(json.dumps(reporte, indent=2))
+        raise SystemExit(0 if reporte["ok"] else 1)
+
+    if not settings.EMISION_WORKERS_EXTERNOS:
+        # Sin la bandera la API renderiza en su propio pool y competirían por las sesiones
+        parser.error("EMISION_WORKERS_EXTERNOS debe estar activo (en la API y en los workers)")
+
+    if args.procesos <= 1:
+        _ejecutar_worker(args.bloque, args.espera)
+        return
+
+    contexto = multiprocessing.get_context("spawn")
+    procesos = [
+        contexto.Process(target=_ejecutar_worker, args=(args.bloque, args.espera), name=f"emision-{i}")
+        for i in range(args.procesos)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    try:
+        for proceso in procesos:
+            proceso.join()
+    except KeyboardInterrupt:
+        for proceso in procesos:
+            proceso.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Descarga de archivos con Range (respuesta_archivo)
+"""
+import asyncio
+
+import pytest
+
+from app.services.descarga_service import respuesta_archivo
+
+CONTENIDO = b"0123456789"
+
+
+@pytest.fixture
+def archivo(tmp_path):
+    ruta = tmp_path / "volumen.pdf"
+    ruta.write_bytes(CONTENIDO)
+    return str(ruta)
+
+
+async def _cuerpo(respuesta) -> bytes:
+    if not hasattr(respuesta, "body_iterator"):
+        return respuesta.body
+    return b"".join([parte async for parte in respuesta.body_iterator])
+
+
+def _descargar(ruta, rango=None, if_range=None):
+    respuesta = respuesta_archivo(ruta, "application/pdf", "volumen.pdf", rango, if_range)
+    return respuesta, asyncio.run(_cuerpo(respuesta))
+
+
+@pytest.mark.parametrize("rango, esperado, content_range", [
+    ("bytes=2-4", b"234", "bytes 2-4/10"),
+    ("bytes=7-", b"789", "bytes 7-9/10"),
+    ("bytes=8-50", b"89", "bytes 8-9/10"),
+    ("bytes=-3", b"789", "bytes 7-9/10"),
+    ("bytes=-50", CONTENIDO, "bytes 0-9/10"),
+])
+def test_rango_parcial(archivo, rango, esperado, content_range):
+    respuesta, cuerpo = _descargar(archivo, rango)
+    assert respuesta.status_code == 206
+    assert cuerpo == esperado
+    assert respuesta.headers["content-range"] == content_range
+    assert respuesta.headers["content-length"] == str(len(esperado))
+
+
+@pytest.mark.parametrize("rango", ["bytes=5-3", "bytes=-", "bytes=0-1,4-5", "items=0-1"])
+def test_rango_invalido_envia_todo(archivo, rango):
+    respuesta, cuerpo = _descargar(archivo, rango)
+    assert respuesta.status_code == 200
+    assert cuerpo == CONTENIDO
+    assert "content-range" not in respuesta.headers
+
+
+@pytest.mark.parametrize("rango", ["bytes=10-", "bytes=10-20", "bytes=-0"])
+def test_rango_fuera_del_archivo(archivo, rango):
+    respuesta, _ = _descargar(archivo, rango)
+    assert respuesta.status_code == 416
+    assert respuesta.headers["content-range"] == "bytes */10"
+
+
+def test_if_range_con_otra_version(archivo):
+    respuesta, cuerpo = _descargar(archivo, "bytes=2-4", if_range='"otra"')
+    assert respuesta.status_code == 200
+    assert cuerpo == CONTENIDO
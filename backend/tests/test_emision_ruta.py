@@ -0,0 +1,249 @@
+"""
+Emisión de una sesión con ruta cargada: cargar_ruta llena total_registros
+antes de asignar visitas y folios, y procesar_sesion debe asignarlos igual.
+También con workers externos: entrega del lease, renderizado y cancelación.
+"""
+import io
+import os
+from datetime import date
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.models.emision import SesionEmision
+from app.models.plantilla import Plantilla
+from app.schemas.emision import EmisionCreate
+from app.services.emision_service import EmisionService, LeasePerdido
+from app.services.planificador import planificador_emision
+from app.workers.emision import WorkerEmision
+
+# Orden de ruta distinto del orden por cuenta
+CUENTAS_RUTA = ("A-003", "A-001", "A-002")
+
+
+@pytest.fixture
+def plantilla(bd, crear_proyecto):
+    proyecto = crear_proyecto("TLAJOMULCO_APA")
+    bd.execute(
+        text("""
+            INSERT INTO padron_completo_tlajomulco_apa (uuid_proyecto, cuenta, propietario)
+            SELECT CAST(:uuid_proyecto AS UUID), cuenta, 'Propietario ' || cuenta
+            FROM unnest(CAST(:cuentas AS VARCHAR[])) AS cuenta
+        """),
+        {"uuid_proyecto": str(proyecto.uuid_proyecto), "cuentas": [*CUENTAS_RUTA, "A-999"]}
+    )
+    plantilla = Plantilla(
+        nombre_plantilla="Recibo",
+        uuid_proyecto=proyecto.uuid_proyecto,
+        uuid_padron=proyecto.uuid_padron,
+        canvas_config={"elementos": [
+            {"tipo": "campo_bd", "campo_nombre": "propietario", "x": 1, "y": 1, "ancho": 10, "alto": 0.6},
+            {"tipo": "campo_bd", "campo_nombre": "codebar", "x": 1, "y": 2, "ancho": 10, "alto": 0.6}
+        ]},
+        ancho_canvas=21.59,
+        alto_canvas=27.94,
+        version=1,
+        is_deleted=False
+    )
+    bd.add(plantilla)
+    bd.commit()
+    return plantilla
+
+
+def _crear_con_ruta(bd, usuario, plantilla) -> SesionEmision:
+    """Crear la sesión, cargar la ruta y dejarla PROCESANDO con el lease del planificador"""
+    sesion = EmisionService.crear_sesion(bd, EmisionCreate(
+        uuid_plantilla=plantilla.uuid_plantilla,
+        pmo_inicial=1,
+        visita_inicial=1,
+        fecha_emision=date(2025, 1, 15),
+        tipo_documento="N"
+    ), usuario)
+
+    ruta = "cuenta,orden_ruta\n" + "".join(
+        f"{cuenta},{orden}\n" for orden, cuenta in enumerate([*CUENTAS_RUTA, "NO-EXISTE"], start=1)
+    )
+    reporte = EmisionService.cargar_ruta(
+        bd, sesion.uuid_sesion, UploadFile(io.BytesIO(ruta.encode()), filename="ruta.csv"), usuario
+    )
+    assert (reporte.registros_preparados, reporte.cuentas_no_encontradas) == (3, 1)
+
+    EmisionService.iniciar_sesion(bd, sesion.uuid_sesion)
+    assert planificador_emision._tomar_siguiente(None) == str(sesion.uuid_sesion)
+    return sesion
+
+
+def _procesar_con_ruta(bd, usuario, plantilla) -> SesionEmision:
+    """Crear la sesión, cargar la ruta y procesarla como lo hace el planificador"""
+    sesion = _crear_con_ruta(bd, usuario, plantilla)
+    EmisionService.procesar_sesion(sesion.uuid_sesion, planificador_emision.propietario)
+    return _sesion(bd, sesion.uuid_sesion)
+
+
+def _sesion(bd, uuid_sesion) -> SesionEmision:
+    bd.expire_all()
+    return bd.query(SesionEmision).filter(SesionEmision.uuid_sesion == uuid_sesion).one()
+
+
+def test_sesion_con_ruta(bd, usuario, plantilla, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMISION_WORKERS", 1)
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", False)
+
+    final = _procesar_con_ruta(bd, usuario, plantilla)
+    assert final.estado == "COMPLETADA"
+    assert (final.total_registros, final.registros_exitosos, final.registros_con_error) == (3, 3, 0)
+    assert final.lease_owner is None
+    # Sin desfase por la zona horaria del servidor
+    assert 0 <= final.duracion_segundos < 60
+
+    parametros = {"uuid_sesion": str(final.uuid_sesion)}
+    asignados = bd.execute(
+        text("""
+            SELECT cuenta, orden_impresion, visita, folio, codebar FROM emision_temp
+            WHERE uuid_sesion = :uuid_sesion ORDER BY orden_impresion
+        """),
+        parametros
+    ).fetchall()
+    assert [fila.cuenta for fila in asignados] == list(CUENTAS_RUTA)
+    assert [fila.orden_impresion for fila in asignados] == [1, 2, 3]
+    assert all(fila.visita == 1 and fila.folio and fila.codebar for fila in asignados)
+
+    pdfs = bd.execute(
+        text("SELECT ruta_pdf FROM emision_acumulada WHERE uuid_sesion = :uuid_sesion ORDER BY orden_impresion"),
+        parametros
+    ).scalars().all()
+    assert len(pdfs) == 3 and all(os.path.exists(ruta_pdf) for ruta_pdf in pdfs)
+
+
+def test_workers_externos(bd, usuario, plantilla, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", True)
+
+    # El planificador solo prepara y entrega el lease a los workers
+    sesion = _procesar_con_ruta(bd, usuario, plantilla)
+    assert sesion.estado == "PROCESANDO"
+    assert sesion.lease_owner == EmisionService.PROPIETARIO_WORKERS
+    assert planificador_emision._tomar_siguiente(None) is None
+
+    # El planificador ya no es dueño del lease: su checkpoint se deshace
+    with pytest.raises(LeasePerdido):
+        EmisionService._guardar_resultados(
+            bd, sesion, plantilla,
+            [{"exitoso": False, "codebar": "X", "mensaje_error": "tarde"}],
+            planificador_emision.propietario
+        )
+    assert _sesion(bd, sesion.uuid_sesion).registros_procesados == 0
+
+    worker = WorkerEmision(tamano_bloque=2, espera_segundos=0)
+    try:
+        assert sesion.uuid_sesion in worker._sesiones()
+        assert [worker.procesar_bloque(sesion.uuid_sesion) for _ in range(3)] == [2, 1, 0]
+    finally:
+        worker.cerrar()
+
+    final = _sesion(bd, sesion.uuid_sesion)
+    assert final.estado == "COMPLETADA"
+    assert (final.registros_procesados, final.registros_exitosos) == (3, 3)
+    assert final.lease_owner is None
+
+
+def test_cancelar_con_bloque_en_curso(bd, usuario, plantilla, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", True)
+    sesion = _procesar_con_ruta(bd, usuario, plantilla)
+
+    worker = WorkerEmision(tamano_bloque=2, espera_segundos=0)
+    try:
+        # Un worker tiene un bloque reclamado sin guardar: la sesión no se cierra todavía
+        EmisionService._bloque_en_curso(worker.db, sesion.uuid_sesion)
+        EmisionService.cancelar_sesion(bd, sesion.uuid_sesion, usuario)
+        pendiente = _sesion(bd, sesion.uuid_sesion)
+        assert pendiente.estado == "CANCELADA" and pendiente.tiempo_fin is None
+        worker.db.commit()
+
+        # El siguiente paso de un worker la cierra sin reclamar más registros
+        assert sesion.uuid_sesion in worker._sesiones()
+        assert worker.procesar_bloque(sesion.uuid_sesion) == 0
+    finally:
+        worker.cerrar()
+
+    final = _sesion(bd, sesion.uuid_sesion)
+    assert final.estado == "CANCELADA"
+    assert final.tiempo_fin is not None and final.lease_owner is None
+    assert final.registros_procesados == 0
+
+
+def test_cancelada_sin_proceso_se_puede_reanudar(bd, usuario, plantilla, monkeypatch):
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", False)
+    sesion = _crear_con_ruta(bd, usuario, plantilla)
+
+    # El proceso que la renderiza la cerraría en su siguiente checkpoint...
+    EmisionService.cancelar_sesion(bd, sesion.uuid_sesion, usuario)
+    assert _sesion(bd, sesion.uuid_sesion).tiempo_fin is None
+    assert EmisionService._cerrar_canceladas(bd, sesion.uuid_sesion) == 0
+
+    # ...pero muere antes: el lease vence y el latido del planificador la cierra
+    bd.execute(
+        text("UPDATE sesiones_emision SET lease_expira = now() - interval '1 second' WHERE uuid_sesion = :uuid_sesion"),
+        {"uuid_sesion": str(sesion.uuid_sesion)}
+    )
+    bd.commit()
+    planificador_emision._cerrar_canceladas()
+    cerrada = _sesion(bd, sesion.uuid_sesion)
+    assert cerrada.estado == "CANCELADA"
+    assert cerrada.tiempo_fin is not None and cerrada.lease_owner is None
+
+    EmisionService.reanudar_sesion(bd, sesion.uuid_sesion, usuario)
+    assert _sesion(bd, sesion.uuid_sesion).estado == "EN_COLA"
+
+
+def test_cancelar_durante_el_ultimo_lote(bd, usuario, plantilla, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMISION_WORKERS", 1)
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", False)
+    sesion = _crear_con_ruta(bd, usuario, plantilla)
+
+    # La ruta es más chica que un lote: la cancelación llega antes del único guardado
+    guardar = EmisionService._guardar_resultados
+    volumenes = []
+
+    def cancelar_y_guardar(db, *args, **kwargs):
+        EmisionService.cancelar_sesion(bd, sesion.uuid_sesion, usuario)
+        guardar(db, *args, **kwargs)
+
+    monkeypatch.setattr(EmisionService, "_guardar_resultados", staticmethod(cancelar_y_guardar))
+    monkeypatch.setattr(EmisionService, "_generar_volumenes", staticmethod(lambda *args: volumenes.append(args)))
+    EmisionService.procesar_sesion(sesion.uuid_sesion, planificador_emision.propietario)
+
+    final = _sesion(bd, sesion.uuid_sesion)
+    assert final.estado == "CANCELADA"
+    assert final.tiempo_fin is not None and final.lease_owner is None
+    assert final.registros_procesados == 3
+    assert volumenes == []
+
+
+def test_error_despues_de_perder_el_lease(bd, usuario, plantilla, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "EMISION_WORKERS", 1)
+    monkeypatch.setattr(settings, "EMISION_WORKERS_EXTERNOS", False)
+    sesion = _crear_con_ruta(bd, usuario, plantilla)
+
+    # Otro proceso retomó la sesión y el proceso viejo falla después
+    bd.execute(
+        text("UPDATE sesiones_emision SET lease_owner = 'otro:1' WHERE uuid_sesion = :uuid_sesion"),
+        {"uuid_sesion": str(sesion.uuid_sesion)}
+    )
+    bd.commit()
+
+    def fallar(*args):
+        raise RuntimeError("se cayó el pool")
+
+    monkeypatch.setattr(EmisionService, "_crear_tarea", staticmethod(fallar))
+    EmisionService.procesar_sesion(sesion.uuid_sesion, planificador_emision.propietario)
+
+    viva = _sesion(bd, sesion.uuid_sesion)
+    assert viva.estado == "PROCESANDO"
+    assert viva.lease_owner == "otro:1" and viva.lease_expira is not None
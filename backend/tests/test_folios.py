@@ -0,0 +1,54 @@
+"""
+Folios y codebars únicos con varios procesos e hilos pidiendo a la vez
+(secuencia emision_folio_seq)
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.folios import AsignadorFolios, formatear_codebar
+
+PROCESOS = 4
+POR_PROCESO = 5000
+BLOQUE = 500
+
+
+def _trabajar(argumentos):
+    """Un proceso con su propio asignador: mezcla de peticiones sueltas y por lote, como en la emisión"""
+    from app.core.database import engine
+
+    cantidad, bloque = argumentos
+    asignador = AsignadorFolios(engine, bloque)
+    folios = [asignador.siguiente() for _ in range(cantidad // 2)]
+    folios.extend(asignador.tomar(cantidad - len(folios)))
+    return [formatear_codebar("0001", folio, "N", 1) for folio in folios]
+
+
+def test_procesos_en_paralelo(bd):
+    # spawn: los procesos abren sus propias conexiones (y usan el esquema de pruebas por DATABASE_URL)
+    with ProcessPoolExecutor(max_workers=PROCESOS, mp_context=multiprocessing.get_context("spawn")) as pool:
+        resultados = list(pool.map(_trabajar, [(POR_PROCESO, BLOQUE)] * PROCESOS))
+
+    codebars = [codebar for lote in resultados for codebar in lote]
+    assert len(codebars) == PROCESOS * POR_PROCESO
+    assert len(set(codebars)) == len(codebars)
+
+
+def test_hilos_con_un_asignador(bd_engine):
+    asignador = AsignadorFolios(bd_engine, tamano_bloque=50)
+    folios = []
+    lock = threading.Lock()
+
+    def pedir():
+        propios = [asignador.siguiente() for _ in range(100)] + asignador.tomar(120)
+        with lock:
+            folios.extend(propios)
+
+    hilos = [threading.Thread(target=pedir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(folios) == 8 * 220
+    assert len(set(folios)) == len(folios)
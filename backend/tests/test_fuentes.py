@@ -0,0 +1,28 @@
+"""
+Registro perezoso de fuentes TTF (RegistroFuentes)
+"""
+from app.services import fuentes
+from app.services.fuentes import RegistroFuentes
+
+
+def test_fuente_danada_se_intenta_una_vez(tmp_path, monkeypatch):
+    (tmp_path / "Danada-Bold.ttf").write_bytes(b"no es un ttf")
+    intentos = []
+    original = fuentes.TTFont
+
+    def ttfont(nombre, ruta):
+        intentos.append(ruta)
+        return original(nombre, ruta)
+
+    monkeypatch.setattr(fuentes, "TTFont", ttfont)
+    registro = RegistroFuentes(str(tmp_path))
+
+    assert [registro.resolver("Danada", True, False) for _ in range(3)] == [None, None, None]
+    assert registro.resolver("Danada", False, False) is None
+    assert len(intentos) == 1
+    assert registro.ruta("Danada-Bold") is None
+
+    # Al invalidar (p. ej. tras reemplazar el archivo) se vuelve a intentar
+    registro.invalidar()
+    assert registro.resolver("Danada", True, False) is None
+    assert len(intentos) == 2
@@ -0,0 +1,80 @@
+"""
+imagen_cache registra en el documento de reportlab el XObject ya preparado
+(c._doc, idToObject, addForm, _code, _formsinuse, _smask) en lugar de usar
+drawImage, que vuelve a codificar la imagen en cada PDF (de 5 a 15 veces más
+lento por documento). Son internos de reportlab: estas pruebas fallan si
+cambian al actualizar la versión fijada en requirements.txt.
+"""
+import io
+import re
+
+import pytest
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfgen import canvas
+
+from app.services.imagen_cache import dibujar_imagen, imagen_cache
+
+
+@pytest.fixture
+def logo(tmp_path):
+    """PNG con transparencia (genera imagen y máscara SMask)"""
+    ruta = tmp_path / "logo.png"
+    imagen = Image.new("RGBA", (400, 200), (255, 255, 255, 0))
+    imagen.paste((200, 30, 30, 255), (50, 50, 350, 150))
+    imagen.save(ruta)
+    yield str(ruta)
+    imagen_cache.limpiar()
+
+
+def _pdf(ruta: str, paginas: int, dibujar=dibujar_imagen) -> bytes:
+    salida = io.BytesIO()
+    c = canvas.Canvas(salida, pagesize=(300, 200), pageCompression=0)
+    for _ in range(paginas):
+        dibujar(c, ruta, 10, 10, 150, 75)
+        dibujar(c, ruta, 10, 100, 150, 75)
+        c.showPage()
+    c.save()
+    return salida.getvalue()
+
+
+def test_internos_del_canvas():
+    c = canvas.Canvas(io.BytesIO())
+    for atributo in ("_doc", "_code", "_formsinuse", "_currentPageHasImages"):
+        assert hasattr(c, atributo)
+
+    doc = c._doc
+    assert isinstance(doc.idToObject, dict)
+    for metodo in ("getXObjectName", "Reference", "addForm"):
+        assert callable(getattr(doc, metodo))
+    assert callable(pdfdoc.xObjectName)
+    assert callable(pdfdoc.PDFObjectReference)
+
+
+def test_mascara_del_xobject():
+    imagen = Image.new("RGBA", (4, 4), (0, 0, 0, 128))
+    xobject = pdfdoc.PDFImageXObject("prueba", ImageReader(imagen), mask="auto")
+    assert isinstance(getattr(xobject, "_smask", None), pdfdoc.PDFImageXObject)
+    assert xobject.width == 4 and xobject.height == 4
+    assert isinstance(xobject.streamContent, (bytes, str))
+
+
+def test_una_imagen_por_documento(logo):
+    # Dos documentos con el mismo XObject del cache: cada uno lo incrusta una vez
+    for _ in range(2):
+        pdf = _pdf(logo, paginas=3)
+        assert pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF")
+        assert pdf.count(b"/Subtype /Image") == 2
+        assert pdf.count(b"/SMask") == 1
+
+
+def test_misma_posicion_que_draw_image(logo):
+    def con_draw_image(c, ruta, x, y, ancho, alto):
+        c.drawImage(ruta, x, y, ancho, alto, mask="auto", preserveAspectRatio=True)
+
+    # Solo cambia la resolución incrustada, no dónde ni de qué tamaño se dibuja
+    transformaciones = re.compile(rb"[-\d. ]+ cm")
+    esperadas = transformaciones.findall(_pdf(logo, 1, con_draw_image))
+    assert b"150 0 0 75 10 100 cm" in esperadas
+    assert transformaciones.findall(_pdf(logo, 1)) == esperadas
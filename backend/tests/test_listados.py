@@ -0,0 +1,90 @@
+"""
+Los listados de proyectos y plantillas hacen un número fijo de consultas,
+sin importar cuántos registros devuelven
+"""
+import io
+import uuid
+
+from fastapi import UploadFile
+from sqlalchemy import event
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.models.plantilla import Plantilla
+from app.services.listados_service import ListadosService
+from app.services.proyecto_service import ProyectoService
+from app.services.plantilla_service import PlantillaService
+
+
+def _consultas(engine, funcion) -> int:
+    """Sentencias que ejecuta `funcion` en el engine"""
+    sentencias = []
+
+    def contar(conexion, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", contar)
+    try:
+        funcion()
+    finally:
+        event.remove(engine, "before_cursor_execute", contar)
+    return len(sentencias)
+
+
+def _agregar(bd, crear_proyecto, cantidad: int):
+    for _ in range(cantidad):
+        proyecto = crear_proyecto()
+        bd.add(Plantilla(
+            nombre_plantilla=f"Plantilla {uuid.uuid4().hex[:8]}",
+            uuid_proyecto=proyecto.uuid_proyecto,
+            uuid_padron=proyecto.uuid_padron,
+            canvas_config={"elementos": []},
+            version=1,
+            is_deleted=False
+        ))
+    bd.commit()
+
+
+def test_consultas_constantes(bd, bd_engine, crear_proyecto, usuario):
+    listados = {
+        "proyectos": lambda: ListadosService.proyectos(bd),
+        "api_proyectos": lambda: ProyectoService.get_all_proyectos(bd, usuario.uuid_usuario),
+        "plantillas": lambda: ListadosService.plantillas(bd),
+    }
+
+    _agregar(bd, crear_proyecto, 1)
+    con_uno = {nombre: _consultas(bd_engine, listar) for nombre, listar in listados.items()}
+
+    _agregar(bd, crear_proyecto, 19)
+    con_veinte = {nombre: _consultas(bd_engine, listar) for nombre, listar in listados.items()}
+
+    assert con_uno == con_veinte
+    assert all(cantidad == 1 for cantidad in con_veinte.values())
+    assert len(ListadosService.proyectos(bd)) >= 20
+
+
+def test_respuestas_con_nombres(bd, crear_proyecto):
+    _agregar(bd, crear_proyecto, 1)
+    uuid_proyecto = bd.query(Plantilla.uuid_proyecto).order_by(Plantilla.id_plantilla.desc()).first()[0]
+
+    proyecto = ProyectoService.get_proyecto_by_uuid(bd, uuid_proyecto)
+    assert proyecto.nombre_padron == "TLAJOMULCO_APA"
+
+    plantillas = PlantillaService.get_all_by_proyecto(bd, uuid_proyecto)
+    assert [p.nombre_proyecto for p in plantillas] == [proyecto.nombre_proyecto]
+    assert [p.nombre_padron for p in plantillas] == ["TLAJOMULCO_APA"]
+
+
+def test_subir_logo(bd, crear_proyecto, usuario, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    proyecto = crear_proyecto()
+    archivo = UploadFile(
+        io.BytesIO(b"\x89PNG\r\n\x1a\n"),
+        filename="logo.png",
+        headers=Headers({"content-type": "image/png"})
+    )
+
+    respuesta = ProyectoService.upload_logo(bd, proyecto.uuid_proyecto, archivo, usuario)
+
+    assert respuesta.nombre_padron == "TLAJOMULCO_APA"
+    assert respuesta.logo_proyecto == str(tmp_path / "proyectos" / f"{proyecto.uuid_proyecto}.png")
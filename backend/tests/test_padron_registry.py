@@ -0,0 +1,42 @@
+"""
+Elección de la llave de un padrón entre sus restricciones únicas
+"""
+import pytest
+
+from app.services.padron_registry import DefinicionPadronInvalida, _elegir_llave
+
+PREFERIDAS = ("uuid_proyecto", "cuenta")
+
+
+def test_prefiere_la_que_tiene_proyecto_y_cuenta():
+    restricciones = [
+        ("uk_a_folio_interno", ("folio_interno",)),
+        ("uk_b_clave_proyecto", ("clave_catastral", "uuid_proyecto")),
+        ("uk_c_cuenta_proyecto", ("cuenta", "uuid_proyecto")),
+    ]
+    assert _elegir_llave("padron", restricciones, PREFERIDAS) == ("cuenta", "uuid_proyecto")
+    # El orden del catálogo no cambia la elección
+    assert _elegir_llave("padron", restricciones[::-1], PREFERIDAS) == ("cuenta", "uuid_proyecto")
+
+
+def test_sin_la_cuenta_usa_la_del_proyecto():
+    # Como GUADALAJARA_PREDIAL: la cuenta es "cuenta" pero la llave es control_req
+    restricciones = [
+        ("uk_a_folio_interno", ("folio_interno",)),
+        ("uk_gdl_pred_control_proyecto", ("control_req", "uuid_proyecto")),
+    ]
+    assert _elegir_llave("padron", restricciones, PREFERIDAS) == ("control_req", "uuid_proyecto")
+
+
+def test_rechaza_llave_ambigua():
+    restricciones = [
+        ("uk_a_clave_proyecto", ("clave_catastral", "uuid_proyecto")),
+        ("uk_b_control_proyecto", ("control_req", "uuid_proyecto")),
+    ]
+    with pytest.raises(DefinicionPadronInvalida, match="uk_a_clave_proyecto, uk_b_control_proyecto"):
+        _elegir_llave("padron", restricciones, PREFERIDAS)
+
+
+def test_sin_restriccion_util():
+    assert _elegir_llave("padron", [("uk_folio", ("folio_interno",))], PREFERIDAS) is None
+    assert _elegir_llave("padron", [], PREFERIDAS) is None
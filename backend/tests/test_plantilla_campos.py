@@ -0,0 +1,67 @@
+"""
+Validación de campo_nombre al guardar una plantilla
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.services.padron_registry import ColumnaPadron, DefinicionPadron, TablaDetalle, padron_registry
+from app.services.plantilla_service import PlantillaService
+
+
+def _columnas(*nombres):
+    return {nombre: ColumnaPadron(nombre, "character varying") for nombre in nombres}
+
+
+@pytest.fixture
+def padron_con_detalle(monkeypatch):
+    definicion = DefinicionPadron(
+        nombre_padron="GUADALAJARA_PREDIAL",
+        tabla="padron_completo_guadalajara_predial_principal",
+        columna_cuenta="cuenta",
+        llave=("cuenta",),
+        columnas=_columnas("uuid_padron", "uuid_proyecto", "cuenta", "propietario"),
+        detalle=TablaDetalle(
+            tabla="padron_completo_guadalajara_predial_detalle",
+            orden=("anio",),
+            columnas=_columnas("id_detalle", "uuid_padron", "anio", "impuesto")
+        )
+    )
+    monkeypatch.setattr(
+        padron_registry, "obtener",
+        lambda nombre: definicion if nombre == definicion.nombre_padron else None
+    )
+    return definicion
+
+
+def _canvas(*elementos):
+    return {"elementos": [{"tipo": tipo, "campo_nombre": nombre} for tipo, nombre in elementos]}
+
+
+def test_acepta_columnas_del_detalle(padron_con_detalle):
+    PlantillaService._validar_campos("GUADALAJARA_PREDIAL", _canvas(
+        ("campo_bd", "propietario"),
+        ("campo_bd", "anio"),
+        ("campo_bd", "impuesto"),
+        ("campo_bd", "detalle"),
+        ("codigo_barras", "codebar")
+    ))
+
+
+def test_ignora_campos_sin_nombre(padron_con_detalle):
+    PlantillaService._validar_campos("GUADALAJARA_PREDIAL", _canvas(
+        ("campo_bd", ""),
+        ("campo_bd", None),
+        ("texto_plano", "no_existe")
+    ))
+
+
+def test_rechaza_campos_desconocidos(padron_con_detalle):
+    with pytest.raises(HTTPException) as error:
+        PlantillaService._validar_campos("GUADALAJARA_PREDIAL", _canvas(
+            ("campo_bd", "impuesto"),
+            ("campo_bd", "no_existe"),
+            ("campo_bd", "id_detalle")
+        ))
+
+    assert error.value.status_code == 400
+    assert "id_detalle, no_existe" in error.value.detail
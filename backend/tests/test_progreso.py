@@ -0,0 +1,71 @@
+"""
+Velocidad y tiempo restante que canal_progreso agrega a cada evento
+"""
+from app.services import progreso
+from app.services.progreso import CanalProgreso
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def _evento(estado, procesados, total=100):
+    return {"estado": estado, "registros_procesados": procesados, "total_registros": total}
+
+
+def test_reanudar_no_cuenta_la_pausa(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(progreso.time, "monotonic", reloj)
+    canal = CanalProgreso(vida_media_segundos=5)
+
+    canal.publicar("s", _evento("PROCESANDO", 0))
+    reloj.ahora += 1
+    canal.publicar("s", _evento("PROCESANDO", 10))
+    assert canal.ultimo("s")["registros_por_segundo"] == 10
+    assert canal.ultimo("s")["eta_segundos"] == 9
+
+    canal.publicar("s", _evento("CANCELADA", 10))
+    assert canal.ultimo("s")["eta_segundos"] is None
+
+    # Una hora en pausa y un rato en cola antes de volver a procesar
+    reloj.ahora += 3600
+    canal.publicar("s", _evento("EN_COLA", 10))
+    assert canal.ultimo("s")["estado"] == "EN_COLA"
+    assert canal.ultimo("s")["registros_por_segundo"] is None
+
+    reloj.ahora += 30
+    canal.publicar("s", _evento("PROCESANDO", 10))
+    reloj.ahora += 1
+    canal.publicar("s", _evento("PROCESANDO", 20))
+    assert canal.ultimo("s")["registros_por_segundo"] == 10
+    assert canal.ultimo("s")["eta_segundos"] == 8
+
+
+def test_olvidar_sin_perder_finales():
+    canal = CanalProgreso(vida_media_segundos=5)
+    canal.publicar("viva", _evento("PROCESANDO", 10))
+    canal.publicar("cerrada", _evento("COMPLETADA", 100))
+
+    canal.olvidar("viva")
+    canal.olvidar("cerrada")
+
+    assert canal.ultimo("viva") is None
+    assert canal.ultimo("cerrada")["estado"] == "COMPLETADA"
+
+
+def test_cierre_repetido_por_notify(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(progreso.time, "monotonic", reloj)
+    canal = CanalProgreso(vida_media_segundos=5)
+
+    canal.publicar("s", _evento("PROCESANDO", 0))
+    reloj.ahora += 1
+    canal.publicar("s", _evento("COMPLETADA", 100))
+    # escucha_progreso vuelve a publicar el mismo cierre leído de la BD
+    canal.publicar("s", _evento("COMPLETADA", 100))
+
+    assert canal.ultimo("s")["registros_por_segundo"] == 100
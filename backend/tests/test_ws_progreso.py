@@ -0,0 +1,84 @@
+"""
+WebSocket de avance: un cliente que se va no deja la suscripción colgada
+aunque la sesión no vuelva a publicar
+"""
+import asyncio
+import json
+import uuid
+
+from fastapi import FastAPI
+
+from app.api.v1 import ws
+from app.services.progreso import canal_progreso
+
+
+def _conversar(uuid_sesion, al_recibir):
+    """
+    Conectar por ASGI al endpoint; al_recibir(evento) devuelve el siguiente
+    mensaje del cliente (o None para solo escuchar)
+    """
+    app = FastAPI()
+    app.include_router(ws.router)
+    scope = {
+        "type": "websocket",
+        "asgi": {"version": "3.0"},
+        "scheme": "ws",
+        "path": f"/ws/emisiones/{uuid_sesion}",
+        "root_path": "",
+        "query_string": b"token=prueba",
+        "headers": [],
+        "server": ("prueba", 80),
+        "client": ("cliente", 1234),
+        "subprotocols": []
+    }
+
+    async def _ejecutar():
+        entrada: asyncio.Queue = asyncio.Queue()
+        enviados = []
+
+        async def send(mensaje):
+            enviados.append(mensaje)
+            if mensaje["type"] == "websocket.send":
+                respuesta = al_recibir(json.loads(mensaje["text"]))
+                if respuesta:
+                    await entrada.put(respuesta)
+
+        await entrada.put({"type": "websocket.connect"})
+        await asyncio.wait_for(app(scope, entrada.get, send), timeout=5)
+        return enviados
+
+    return asyncio.run(_ejecutar())
+
+
+def test_desconexion_libera_la_suscripcion(monkeypatch):
+    uuid_sesion = uuid.uuid4()
+    monkeypatch.setattr(
+        ws, "_estado_inicial", lambda token, uuid_sesion: {"uuid_sesion": str(uuid_sesion), "estado": "PROCESANDO"}
+    )
+
+    # El cliente se va después del primer evento; la sesión nunca vuelve a publicar
+    enviados = _conversar(uuid_sesion, lambda evento: {"type": "websocket.disconnect", "code": 1001})
+
+    assert [m["type"] for m in enviados] == ["websocket.accept", "websocket.send"]
+    assert str(uuid_sesion) not in canal_progreso._suscriptores
+
+
+def test_cierra_al_terminar(monkeypatch):
+    uuid_sesion = uuid.uuid4()
+    monkeypatch.setattr(ws.settings, "PROGRESO_INTERVALO_SEG", 0)
+    monkeypatch.setattr(
+        ws, "_estado_inicial", lambda token, uuid_sesion: {"uuid_sesion": str(uuid_sesion), "estado": "PROCESANDO"}
+    )
+
+    def al_recibir(evento):
+        if evento["estado"] == "PROCESANDO":
+            canal_progreso.publicar(uuid_sesion, {**evento, "estado": "COMPLETADA"})
+        return None
+
+    enviados = _conversar(uuid_sesion, al_recibir)
+
+    assert [m["type"] for m in enviados] == [
+        "websocket.accept", "websocket.send", "websocket.send", "websocket.close"
+    ]
+    assert json.loads(enviados[2]["text"])["estado"] == "COMPLETADA"
+    assert str(uuid_sesion) not in canal_progreso._suscriptores
@@ -67,7 +67,6 @@ CREATE TABLE proyectos (
     logo_proyecto VARCHAR(500), -- Ruta del archivo de logo
     uuid_padron UUID NOT NULL REFERENCES identificador_padron(uuid_padron),
     usuario_creador UUID NOT NULL REFERENCES usuarios(uuid_usuario),
-    en_emision BOOLEAN DEFAULT FALSE, -- Lock para evitar modificar durante emisión
     created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_deleted BOOLEAN DEFAULT FALSE
@@ -77,9 +76,6 @@ CREATE INDEX idx_proyectos_uuid ON proyectos(uuid_proyecto);
 CREATE INDEX idx_proyectos_padron ON proyectos(uuid_padron);
 CREATE INDEX idx_proyectos_active ON proyectos(is_deleted);
 CREATE INDEX idx_proyectos_usuario ON proyectos(usuario_creador);
-CREATE INDEX idx_proyectos_en_emision ON proyectos(en_emision);
-
-COMMENT ON COLUMN proyectos.en_emision IS 'TRUE si hay una emisión activa, previene modificaciones';
 
 -- =====================================================
 -- TABLA: PLANTILLAS
@@ -207,7 +203,7 @@ CREATE TABLE sesiones_emision (
     ruta_salida VARCHAR(500) NOT NULL,
     
     -- Estado y métricas
-    estado VARCHAR(20) DEFAULT 'INICIADA' CHECK (estado IN ('INICIADA', 'PROCESANDO', 'COMPLETADA', 'ERROR', 'CANCELADA')),
+    estado VARCHAR(20) DEFAULT 'INICIADA' CHECK (estado IN ('INICIADA', 'EN_COLA', 'PROCESANDO', 'COMPLETADA', 'ERROR', 'CANCELADA')),
     total_registros INTEGER,
     registros_procesados INTEGER DEFAULT 0,
     registros_exitosos INTEGER DEFAULT 0,
@@ -218,6 +214,11 @@ CREATE TABLE sesiones_emision (
     tiempo_fin TIMESTAMP,
     duracion_segundos INTEGER,
     
+    -- Planificación (la asigna el planificador de emisiones)
+    prioridad SMALLINT, -- 0 = más urgente
+    lease_owner VARCHAR(100), -- Proceso que la está renderizando
+    lease_expira TIMESTAMPTZ, -- Se renueva con cada latido; vencido, otro proceso la retoma
+    
     created_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -226,9 +227,12 @@ CREATE INDEX idx_sesiones_proyecto ON sesiones_emision(uuid_proyecto);
 CREATE INDEX idx_sesiones_usuario ON sesiones_emision(uuid_usuario);
 CREATE INDEX idx_sesiones_estado ON sesiones_emision(estado);
 CREATE INDEX idx_sesiones_fecha ON sesiones_emision(fecha_emision);
+CREATE INDEX idx_sesiones_cola ON sesiones_emision(prioridad, tiempo_inicio) WHERE estado IN ('EN_COLA', 'PROCESANDO');
+CREATE INDEX idx_sesiones_lease_proyecto ON sesiones_emision(uuid_proyecto, lease_expira) WHERE lease_expira IS NOT NULL;
 
 COMMENT ON TABLE sesiones_emision IS 'Control de sesiones de emisión para concurrencia y trazabilidad';
 COMMENT ON COLUMN sesiones_emision.tipo_documento IS 'CI=Carta Invitación, N=Notificación, A=Apercibimiento, E=Embargo';
+COMMENT ON COLUMN sesiones_emision.lease_expira IS 'Mientras no venza, la sesión bloquea su proyecto y cuenta para la cuota por proyecto';
 
 -- =====================================================
 -- TABLAS DE PADRONES
@@ -278,7 +282,7 @@ CREATE TABLE padron_completo_tlajomulco_apa (
     CONSTRAINT uk_tlaj_apa_cuenta_proyecto UNIQUE (cuenta, uuid_proyecto)
 );
 
-CREATE INDEX idx_tlaj_apa_proyecto ON padron_completo_tlajomulco_apa(uuid_proyecto);
+CREATE INDEX idx_tlaj_apa_proyecto ON padron_completo_tlajomulco_apa(uuid_proyecto, uuid_padron);
 CREATE INDEX idx_tlaj_apa_cuenta ON padron_completo_tlajomulco_apa(cuenta);
 CREATE INDEX idx_tlaj_apa_clave ON padron_completo_tlajomulco_apa(clave_apa);
 
@@ -318,7 +322,7 @@ CREATE TABLE padron_completo_tlajomulco_predial (
     CONSTRAINT uk_tlaj_pred_cuenta_proyecto UNIQUE (cuenta_n, uuid_proyecto)
 );
 
-CREATE INDEX idx_tlaj_predial_proyecto ON padron_completo_tlajomulco_predial(uuid_proyecto);
+CREATE INDEX idx_tlaj_predial_proyecto ON padron_completo_tlajomulco_predial(uuid_proyecto, uuid_padron);
 CREATE INDEX idx_tlaj_predial_cuenta ON padron_completo_tlajomulco_predial(cuenta_n);
 CREATE INDEX idx_tlaj_predial_catastral ON padron_completo_tlajomulco_predial(clavecatastral);
 
@@ -392,7 +396,7 @@ CREATE TABLE padron_completo_guadalajara_predial_principal (
     CONSTRAINT uk_gdl_pred_control_proyecto UNIQUE (control_req, uuid_proyecto)
 );
 
-CREATE INDEX idx_gdl_pred_prin_proyecto ON padron_completo_guadalajara_predial_principal(uuid_proyecto);
+CREATE INDEX idx_gdl_pred_prin_proyecto ON padron_completo_guadalajara_predial_principal(uuid_proyecto, uuid_padron);
 CREATE INDEX idx_gdl_pred_prin_cuenta ON padron_completo_guadalajara_predial_principal(cuenta);
 CREATE INDEX idx_gdl_pred_prin_control ON padron_completo_guadalajara_predial_principal(control_req);
 
@@ -468,7 +472,7 @@ CREATE TABLE padron_completo_pensiones (
     CONSTRAINT uk_pens_afiliado_proyecto UNIQUE (afiliado, uuid_proyecto)
 );
 
-CREATE INDEX idx_pensiones_proyecto ON padron_completo_pensiones(uuid_proyecto);
+CREATE INDEX idx_pensiones_proyecto ON padron_completo_pensiones(uuid_proyecto, uuid_padron);
 CREATE INDEX idx_pensiones_afiliado ON padron_completo_pensiones(afiliado);
 CREATE INDEX idx_pensiones_nombre ON padron_completo_pensiones(nombre);
 
@@ -514,7 +518,7 @@ CREATE TABLE padron_completo_guadalajara_licencias_principal (
     CONSTRAINT uk_gdl_lic_cvereq_proyecto UNIQUE (cvereq, uuid_proyecto)
 );
 
-CREATE INDEX idx_gdl_lic_prin_proyecto ON padron_completo_guadalajara_licencias_principal(uuid_proyecto);
+CREATE INDEX idx_gdl_lic_prin_proyecto ON padron_completo_guadalajara_licencias_principal(uuid_proyecto, uuid_padron);
 CREATE INDEX idx_gdl_lic_prin_cvereq ON padron_completo_guadalajara_licencias_principal(cvereq);
 CREATE INDEX idx_gdl_lic_prin_licencia ON padron_completo_guadalajara_licencias_principal(id_licencia);
 
@@ -558,6 +562,13 @@ CREATE TABLE emision_temp (
     -- Datos mapeados del padrón
     datos_padron JSONB,
     
+    -- Asignados en bloque al iniciar la emisión
+    pmo INTEGER,
+    visita INTEGER,
+    folio VARCHAR(100),
+    codebar VARCHAR(255),
+    orden_impresion INTEGER,
+    
     -- Control de procesamiento
     procesado BOOLEAN DEFAULT FALSE,
     tiene_error BOOLEAN DEFAULT FALSE,
@@ -569,6 +580,9 @@ CREATE TABLE emision_temp (
 CREATE INDEX idx_emision_temp_sesion ON emision_temp(uuid_sesion);
 CREATE INDEX idx_emision_temp_cuenta ON emision_temp(cuenta);
 CREATE INDEX idx_emision_temp_procesado ON emision_temp(procesado);
+-- Checkpoint por codebar y lectura de lo pendiente al reanudar
+CREATE INDEX idx_emision_temp_sesion_codebar ON emision_temp(uuid_sesion, codebar);
+CREATE INDEX idx_emision_temp_pendientes ON emision_temp(uuid_sesion, orden_impresion) WHERE procesado = FALSE;
 
 -- =====================================================
 -- TABLA: EMISION_FINAL
@@ -804,8 +818,10 @@ CREATE TABLE emision_acumulada (
 );
 
 CREATE INDEX idx_emision_acum_sesion ON emision_acumulada(uuid_sesion);
+CREATE UNIQUE INDEX idx_emision_acum_codebar ON emision_acumulada(codebar);
 CREATE INDEX idx_emision_acum_cuenta ON emision_acumulada(cuenta);
 CREATE INDEX idx_emision_acum_proyecto ON emision_acumulada(uuid_proyecto);
+CREATE INDEX idx_emision_acum_proyecto_cuenta ON emision_acumulada(uuid_proyecto, cuenta, visita);
 CREATE INDEX idx_emision_acum_usuario ON emision_acumulada(uuid_usuario);
 CREATE INDEX idx_emision_acum_fecha_emision ON emision_acumulada(fecha_emision);
 
@@ -896,6 +912,9 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Folios de emisión (parte única del codebar)
+CREATE SEQUENCE IF NOT EXISTS emision_folio_seq;
+
 -- Generar CODEBAR
 CREATE OR REPLACE FUNCTION generar_codebar(
     p_cuenta VARCHAR,
@@ -904,11 +923,12 @@ CREATE OR REPLACE FUNCTION generar_codebar(
 )
 RETURNS VARCHAR AS $$
 DECLARE
-    v_timestamp BIGINT;
+    v_folio BIGINT;
     v_codebar VARCHAR;
 BEGIN
-    v_timestamp := EXTRACT(EPOCH FROM CURRENT_TIMESTAMP)::BIGINT;
-    v_codebar := '*' || p_cuenta || v_timestamp || p_tipo_documento || p_visita || '*';
+    -- Folio de secuencia (único entre procesos) en lugar del timestamp
+    v_folio := nextval('emision_folio_seq');
+    v_codebar := '*' || p_cuenta || lpad(v_folio::TEXT, 10, '0') || p_tipo_documento || p_visita || '*';
     RETURN v_codebar;
 END;
 $$ LANGUAGE plpgsql;
@@ -981,38 +1001,37 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Manejar intento de login fallido
-CREATE OR REPLACE FUNCTION manejar_intento_login_fallido(p_username VARCHAR)
-RETURNS void AS $$
-DECLARE
-    v_intentos INTEGER;
-BEGIN
+-- Un solo UPDATE: incrementa el contador y bloquea al llegar a 5, sin
+-- carreras entre intentos simultáneos. Devuelve bloqueado_hasta (UTC).
+DROP FUNCTION IF EXISTS manejar_intento_login_fallido(VARCHAR);
+CREATE FUNCTION manejar_intento_login_fallido(p_username VARCHAR)
+RETURNS TIMESTAMP AS $$
     UPDATE usuarios 
     SET intentos_login_fallidos = intentos_login_fallidos + 1,
-        ultimo_intento_login = CURRENT_TIMESTAMP
+        ultimo_intento_login = timezone('utc', now()),
+        bloqueado_hasta = CASE
+            WHEN intentos_login_fallidos + 1 >= 5 THEN timezone('utc', now()) + INTERVAL '15 minutes'
+            ELSE bloqueado_hasta
+        END
     WHERE username = p_username
-    RETURNING intentos_login_fallidos INTO v_intentos;
-    
-    IF v_intentos >= 5 THEN
-        UPDATE usuarios
-        SET bloqueado_hasta = CURRENT_TIMESTAMP + INTERVAL '15 minutes'
-        WHERE username = p_username;
-    END IF;
-END;
-$$ LANGUAGE plpgsql;
+    RETURNING bloqueado_hasta;
+$$ LANGUAGE sql;
 
--- Resetear intentos de login
-CREATE OR REPLACE FUNCTION resetear_intentos_login(p_username VARCHAR)
-RETURNS void AS $$
-BEGIN
+-- Resetear intentos de login (login exitoso). Devuelve last_login (UTC).
+DROP FUNCTION IF EXISTS resetear_intentos_login(VARCHAR);
+CREATE FUNCTION resetear_intentos_login(p_username VARCHAR)
+RETURNS TIMESTAMP AS $$
     UPDATE usuarios 
     SET intentos_login_fallidos = 0,
         bloqueado_hasta = NULL,
-        last_login = CURRENT_TIMESTAMP
-    WHERE username = p_username;
-END;
-$$ LANGUAGE plpgsql;
+        last_login = timezone('utc', now())
+    WHERE username = p_username
+    RETURNING last_login;
+$$ LANGUAGE sql;
 
 -- Obtener columnas disponibles de un padrón
+-- La API toma esto de PadronRegistry (app/services/padron_registry.py);
+-- se conserva para consultas manuales
 CREATE OR REPLACE FUNCTION obtener_columnas_padron(p_nombre_padron VARCHAR)
 RETURNS TABLE(nombre_columna VARCHAR, tipo_dato VARCHAR) AS $$
 DECLARE